@@ -10,23 +10,76 @@ PROJECT_ROOT = Path(__file__).resolve().parent.parent
 # Logging: set LOG_LEVEL=DEBUG for verbose logs (e.g. MIDI notes, OSC, WS traffic)
 LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO").upper()
 LOG_LEVEL_VALUE = getattr(logging, LOG_LEVEL, logging.INFO)
+# Logs are written by a background thread (backend/log_setup.py); LOG_ASYNC=0 writes on the calling thread
+LOG_ASYNC = os.environ.get("LOG_ASYNC", "1") not in ("0", "false", "no")
+# "text" (LEVEL:logger:message key=value) or "json" (one object per line)
+LOG_FORMAT = os.environ.get("LOG_FORMAT", "text").lower()
+# Runtime profile (backend/runtime.py): "default" or "lowlatency" (uvloop, httptools, no access
+# log, logging written by a background thread)
+RUNTIME_PROFILE = os.environ.get("RUNTIME_PROFILE", "default").lower()
 
 # Data paths
 DATA_DIR = PROJECT_ROOT / "data"
 LESSON_DEFINITIONS_PATH = DATA_DIR / "lesson_definitions.json"
 DEVICE_CONFIGS_PATH = DATA_DIR / "device_configs.json"
+# Device config saves are coalesced: one write at most this long after the first change
+DEVICE_CONFIGS_SAVE_DELAY_SEC = 0.5
+
+# Lesson catalog hot reload: poll lesson_definitions.json mtime; 0 disables the watcher
+LESSON_RELOAD_POLL_INTERVAL = float(os.environ.get("LESSON_RELOAD_POLL_INTERVAL", "1.0"))
+# Largest interval (semitones from root) accepted in a definition: two octaves
+LESSON_INTERVAL_MAX = 24
 
 # SuperCollider (SC_HOST for Docker: set to host.docker.internal so container reaches host scsynth)
 SC_HOST = os.environ.get("SC_HOST", "127.0.0.1")
 SC_PORT = int(os.environ.get("SC_PORT", "57110"))  # scsynth default
+# Upper bound on waiting for a freshly started scsynth; readiness is polled with /status
 SC_BOOT_TIMEOUT_SEC = 5.0
+# Startup probe: short /status check so an already-running scsynth is found in milliseconds
+SC_STARTUP_PROBE_TIMEOUT_SEC = 0.25
+# Remote scsynth (Docker) not answering the startup probe: one longer probe during warm-up
+SC_REMOTE_PROBE_TIMEOUT_SEC = 2.0
+# Audio path (backend/synth_backends.py): "osc" (scsynth), "inprocess" (Rhodes in NumPy),
+# "midi" (pass notes to MIDI_OUT_PORT, e.g. a DAW) or "null" (recording sink, no audio)
+SYNTH_BACKEND = os.environ.get("SYNTH_BACKEND", "osc").lower()
+MIDI_OUT_PORT = os.environ.get("MIDI_OUT_PORT") or None
+RECORDING_SINK_MAXLEN = 100_000
+
+# In-process Rhodes (backend/rhodes_engine.py) used when scsynth is unreachable: "inprocess" or "none"
+SYNTH_FALLBACK = os.environ.get("SYNTH_FALLBACK", "inprocess").lower()
+INPROCESS_SAMPLE_RATE = int(os.environ.get("INPROCESS_SAMPLE_RATE", "44100"))
+INPROCESS_BLOCK_SIZE = int(os.environ.get("INPROCESS_BLOCK_SIZE", "128"))
+INPROCESS_VOICES = 24
+# Write the in-process synth to this WAV file instead of a sound device (e.g. in Docker)
+INPROCESS_WAV_PATH = os.environ.get("INPROCESS_WAV_PATH") or None
+# The WAV file is rotated after this many minutes: it is renamed to <name>.1.wav (replacing the
+# previous one) and a new file is started, so at most two files exist. Capped below 4 GiB (RIFF limit).
+INPROCESS_WAV_MAX_MINUTES = float(os.environ.get("INPROCESS_WAV_MAX_MINUTES", "60"))
 SC_PROGRAMS_DIR = PROJECT_ROOT / "sc_programs"
 SC_BOOTSTRAP_SCRIPT = SC_PROGRAMS_DIR / "bootstrap.scd"
 
+# MIDI queue between the input callback and the UI consumer (backend/midi_queue.py): bounded;
+# note_ons older than MIDI_NOTE_MAX_AGE_MS when dequeued are not shown (0 = always show)
+MIDI_QUEUE_CAPACITY = int(os.environ.get("MIDI_QUEUE_CAPACITY", "512"))
+MIDI_NOTE_MAX_AGE_MS = float(os.environ.get("MIDI_NOTE_MAX_AGE_MS", "250"))
+
 # Backend
 WS_HTTP_PORT = 8765
 WS_HOST = "0.0.0.0"
 
+# Device calibration: exponent of the velocity curve captured in the init workflow
+# (<1 = lighter touch sounds louder, >1 = heavier touch needed)
+VELOCITY_CURVE_GAMMA = 1.0
+
+# Metronome (backend/metronome.py): clicks are sent up to LOOKAHEAD ahead with their play time;
+# the scheduler wakes every SCHEDULE_INTERVAL, which must be well below LOOKAHEAD
+METRONOME_DEFAULT_BPM = 80.0
+METRONOME_BPM_MIN = 20.0
+METRONOME_BPM_MAX = 300.0
+METRONOME_BEATS_PER_BAR = 4
+METRONOME_LOOKAHEAD_SEC = 0.1
+METRONOME_SCHEDULE_INTERVAL_SEC = 0.025
+
 # Default volume (0-1); scaled with frontend value
 DEFAULT_VOLUME = 0.8
 
@@ -0,0 +1,141 @@
+"""Device config store: in-memory per-device records, persisted atomically and debounced by a worker thread."""
+
+from __future__ import annotations
+
+import copy
+import json
+import logging
+import threading
+from pathlib import Path
+from typing import Any
+
+from backend.config import DEVICE_CONFIGS_PATH, DEVICE_CONFIGS_SAVE_DELAY_SEC
+from backend.lesson_loader import load_device_configs, write_json_atomic
+
+logger = logging.getLogger(__name__)
+
+
+class DeviceConfigStore:
+    """
+    device_id -> record ({ lowNote, highNote, keyCount, ... }) kept in memory; reads never touch disk.
+
+    put() only updates memory and wakes a background writer, so it is safe to call from the
+    MIDI consumer on the event loop. The writer waits save_delay seconds so a burst of updates
+    becomes one write, then saves a snapshot with write_json_atomic (temp file, fsync, rename):
+    a crash leaves either the old or the new file, never a truncated one.
+
+    The file may be edited by hand while the backend runs (e.g. transpose). Before each save,
+    and on refresh(), a file whose mtime or size changed since it was last read or written is
+    merged in: the file's records win, except for the fields put() changed since the last save.
+    An unreadable or invalid file is logged and left to be overwritten by the next save.
+    """
+
+    def __init__(self, path: Path | None = None, save_delay: float = DEVICE_CONFIGS_SAVE_DELAY_SEC):
+        self.path = path or DEVICE_CONFIGS_PATH
+        self.save_delay = save_delay
+        try:
+            self._records: dict[str, dict[str, Any]] = load_device_configs(self.path)
+        except Exception:
+            self._records = {}
+        # The file as last read or written: its (mtime_ns, size), its records, and the devices
+        # put() since then (their changed fields override hand edits when merging)
+        self._stamp = self._file_stamp()
+        self._base = copy.deepcopy(self._records)
+        self._changed: set[str] = set()
+        self._lock = threading.Lock()
+        self._wake = threading.Condition(self._lock)
+        self._dirty = False
+        self._closed = False
+        self.writes = 0  # completed saves, for diagnostics
+        self._thread = threading.Thread(target=self._run, name="device-config-writer", daemon=True)
+        self._thread.start()
+
+    def get(self, device_id: str) -> dict[str, Any] | None:
+        return self._records.get(device_id)
+
+    def all(self) -> dict[str, dict[str, Any]]:
+        """Shallow copy of all records."""
+        return dict(self._records)
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def put(self, device_id: str, record: dict[str, Any], persist: bool = True) -> None:
+        """Store a device record; with persist, schedule a (coalesced) save."""
+        with self._lock:
+            self._records = {**self._records, device_id: record}
+            self._changed.add(device_id)
+            if persist:
+                self._dirty = True
+                self._wake.notify()
+
+    def refresh(self) -> bool:
+        """Merge hand edits of the file into memory if it changed; True if it was reloaded."""
+        stamp = self._file_stamp()
+        if stamp is None or stamp == self._stamp:
+            return False
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                disk = json.load(f)
+            if not isinstance(disk, dict):
+                raise ValueError("not a JSON object")
+        except (OSError, ValueError) as e:
+            logger.warning("DeviceConfigStore: %s changed but cannot be read, keeping memory: %s", self.path, e)
+            return False
+        with self._lock:
+            merged = dict(disk)
+            for device_id in self._changed:
+                ours = self._records.get(device_id)
+                if ours is None:
+                    continue
+                base = self._base.get(device_id, {})
+                edits = {k: v for k, v in ours.items() if base.get(k) != v}
+                merged[device_id] = {**disk.get(device_id, {}), **edits}
+            self._records = merged
+            self._base = disk
+            self._stamp = stamp
+        logger.info("DeviceConfigStore: merged hand edits from %s (%d device(s))", self.path, len(disk))
+        return True
+
+    def _file_stamp(self) -> tuple[int, int] | None:
+        try:
+            st = self.path.stat()
+        except OSError:
+            return None
+        return st.st_mtime_ns, st.st_size
+
+    def flush(self, timeout: float = 5.0) -> None:
+        """Write pending changes now (e.g. at shutdown) and stop the writer thread."""
+        with self._lock:
+            self._closed = True
+            self._wake.notify()
+        self._thread.join(timeout=timeout)
+
+    def _run(self) -> None:
+        while True:
+            with self._lock:
+                while not self._dirty and not self._closed:
+                    self._wake.wait()
+                if not self._dirty and self._closed:
+                    return
+            # Coalesce: let further puts land before snapshotting (skipped when closing)
+            if not self._closed and self.save_delay > 0:
+                with self._lock:
+                    self._wake.wait_for(lambda: self._closed, timeout=self.save_delay)
+            self.refresh()
+            with self._lock:
+                snapshot = copy.deepcopy(self._records)
+                changed, self._changed = self._changed, set()
+                self._dirty = False
+            try:
+                write_json_atomic(self.path, snapshot)
+                with self._lock:
+                    self._stamp = self._file_stamp()
+                    self._base = snapshot
+                self.writes += 1
+                logger.debug("DeviceConfigStore: saved %d device(s) to %s", len(snapshot), self.path)
+            except (OSError, TypeError, ValueError) as e:
+                # e.g. read-only mount in container; keep serving from memory
+                logger.warning("DeviceConfigStore: save to %s failed: %s", self.path, e)
+                with self._lock:
+                    self._changed |= changed
@@ -21,7 +21,7 @@ def pick_random_lesson(
 ) -> dict[str, Any] | None:
     """
     Pick a random lesson type, definition, and key; compute note names and MIDI notes.
-    Returns a dict for the frontend: type, key, name, intervals, noteNames, midiNotes, historicalBlurb.
+    Returns a dict for the frontend: type, key, id, name, intervals, noteNames, midiNotes, historicalBlurb.
     """
     keys = keys or KEYS
     types_with_defs = [
@@ -39,6 +39,7 @@ def pick_random_lesson(
         "type": lesson_type,
         "key": key,
         "octave": octave,
+        "id": lesson.id,
         "name": lesson.name,
         "intervals": lesson.intervals,
         "intervalLabels": semitones_to_scale_degrees(lesson.intervals, lesson.id),
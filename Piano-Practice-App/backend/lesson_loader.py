@@ -4,10 +4,12 @@ from __future__ import annotations
 
 import json
 import logging
+import os
+import tempfile
 from pathlib import Path
 from typing import Any
 
-from backend.config import DEVICE_CONFIGS_PATH, LESSON_DEFINITIONS_PATH
+from backend.config import DEVICE_CONFIGS_PATH, LESSON_DEFINITIONS_PATH, LESSON_INTERVAL_MAX
 from backend.lesson_notes import LessonDefinition, lesson_from_json_entry
 
 logger = logging.getLogger(__name__)
@@ -26,6 +28,13 @@ def load_lesson_definitions(path: Path | None = None) -> dict[str, list[LessonDe
     except (OSError, PermissionError, json.JSONDecodeError) as e:
         logger.warning("load_lesson_definitions: failed to load %s: %s", path, e)
         return empty
+    result = _catalog_from_json(data)
+    logger.info("load_lesson_definitions: loaded from %s chords=%d scales=%d arpeggios=%d",
+                path, len(result["chords"]), len(result["scales"]), len(result["arpeggios"]))
+    return result
+
+
+def _catalog_from_json(data: dict) -> dict[str, list[LessonDefinition]]:
     result: dict[str, list[LessonDefinition]] = {
         "chords": [],
         "scales": [],
@@ -34,11 +43,64 @@ def load_lesson_definitions(path: Path | None = None) -> dict[str, list[LessonDe
     for key in result:
         for entry in data.get(key, []):
             result[key].append(lesson_from_json_entry(entry, key[:-1]))  # "chords" -> "chord"
-    logger.info("load_lesson_definitions: loaded from %s chords=%d scales=%d arpeggios=%d",
-                path, len(result["chords"]), len(result["scales"]), len(result["arpeggios"]))
     return result
 
 
+def validate_lesson_definitions(data: Any) -> list[str]:
+    """
+    Check lesson_definitions.json content against the schema (see docs/IMPLEMENTATION.md).
+    Returns a list of error strings; empty means valid.
+    """
+    if not isinstance(data, dict):
+        return ["top level must be an object"]
+    errors: list[str] = []
+    for section in ("chords", "scales", "arpeggios"):
+        entries = data.get(section, [])
+        if not isinstance(entries, list):
+            errors.append(f"{section}: must be a list")
+            continue
+        seen: set[str] = set()
+        for i, entry in enumerate(entries):
+            where = f"{section}[{i}]"
+            if not isinstance(entry, dict):
+                errors.append(f"{where}: must be an object")
+                continue
+            lesson_id = entry.get("id")
+            if not isinstance(lesson_id, str) or not lesson_id:
+                errors.append(f"{where}: missing id")
+            elif lesson_id in seen:
+                errors.append(f"{where}: duplicate id {lesson_id!r}")
+            else:
+                seen.add(lesson_id)
+            if not isinstance(entry.get("name"), str) or not entry.get("name"):
+                errors.append(f"{where}: missing name")
+            intervals = entry.get("intervals")
+            if not isinstance(intervals, list) or not intervals:
+                errors.append(f"{where}: intervals must be a non-empty list")
+                continue
+            for n in intervals:
+                if isinstance(n, bool) or not isinstance(n, int) or not 0 <= n <= LESSON_INTERVAL_MAX:
+                    errors.append(f"{where}: interval {n!r} not an integer in 0-{LESSON_INTERVAL_MAX}")
+    return errors
+
+
+def read_lesson_definitions(path: Path | None = None) -> tuple[dict[str, list[LessonDefinition]] | None, list[str]]:
+    """
+    Strict variant of load_lesson_definitions for hot reload: returns (catalog, []) when the
+    file parses and validates, else (None, errors) so the caller can keep the current catalog.
+    """
+    path = path or LESSON_DEFINITIONS_PATH
+    try:
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, PermissionError, json.JSONDecodeError) as e:
+        return None, [str(e)]
+    errors = validate_lesson_definitions(data)
+    if errors:
+        return None, errors
+    return _catalog_from_json(data), []
+
+
 def load_device_configs(path: Path | None = None) -> dict[str, dict[str, Any]]:
     """Load device_configs.json; return { device_id: { lowNote, highNote, keyCount }, ... }."""
     path = path or DEVICE_CONFIGS_PATH
@@ -55,12 +117,42 @@ def load_device_configs(path: Path | None = None) -> dict[str, dict[str, Any]]:
         return {}
 
 
+def write_json_atomic(path: Path, data: Any) -> None:
+    """
+    Write JSON so readers (and a crash) see either the old or the new file: write a temp file
+    in the same directory, fsync it, rename it over path, then fsync the directory.
+    Raises OSError on failure; the temp file is removed.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(prefix=f".{path.name}.", suffix=".tmp", dir=path.parent)
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+    try:
+        dir_fd = os.open(path.parent, os.O_RDONLY)
+    except OSError:
+        return  # e.g. Windows: directories cannot be opened
+    try:
+        os.fsync(dir_fd)
+    except OSError:
+        pass
+    finally:
+        os.close(dir_fd)
+
+
 def save_device_configs(configs: dict[str, dict[str, Any]], path: Path | None = None) -> None:
-    """Save device configs to JSON."""
+    """Save device configs to JSON atomically (blocking; the backend uses DeviceConfigStore)."""
     path = path or DEVICE_CONFIGS_PATH
     try:
-        path.parent.mkdir(parents=True, exist_ok=True)
-        with open(path, "w", encoding="utf-8") as f:
-            json.dump(configs, f, indent=2)
-    except (OSError, PermissionError):
-        pass  # e.g. read-only mount in container
+        write_json_atomic(path, configs)
+    except (OSError, PermissionError) as e:
+        logger.warning("save_device_configs: failed to save %s: %s", path, e)  # e.g. read-only mount in container
@@ -5,6 +5,11 @@ Lesson definitions store only intervals (semitones from root). This module compu
 note names (A, B, C, D, sharps/flats) and MIDI numbers on the fly for any key and octave,
 using standard interval notation (semitones from root).
 
+Note names are spelled for the key: the letter comes from the scale degree and the
+accidental (including double sharps/flats) from the pitch, so Eb major reads
+Eb, F, G, Ab, Bb, C, D rather than D#, F, G, G#. LessonNoteGenerator.precompute_spellings
+builds a (lesson, key) -> names table at load time.
+
 Scale-degree display: intervals (semitones) are converted to scale-degree labels
 (1, 2, ♭3, 4, 5, 6, ♭7, 8) using flats for lowered degrees per standard theory:
 - Major chord = 1, 3, 5; minor = 1, ♭3, 5.
@@ -37,6 +42,13 @@ KEY_TO_SEMITONE: dict[str, int] = {
     "A#": 10, "Bb": 10, "B": 11, "Cb": 11, "B#": 0,
 }
 
+# Natural letters in order and their pitch classes (used for key-aware spelling)
+LETTERS: Tuple[str, ...] = ("C", "D", "E", "F", "G", "A", "B")
+LETTER_TO_SEMITONE: dict[str, int] = {"C": 0, "D": 2, "E": 4, "F": 5, "G": 7, "A": 9, "B": 11}
+
+# Accidental offset (semitones from natural) -> suffix; double accidentals included
+ACCIDENTAL_SUFFIX: dict[int, str] = {-2: "bb", -1: "b", 0: "", 1: "#", 2: "##"}
+
 
 def _parse_key(key: str) -> int:
     """Return semitone 0-11 for the given key name (e.g. 'C', 'F#', 'Bb')."""
@@ -53,6 +65,66 @@ def _parse_key(key: str) -> int:
     raise ValueError(f"Unknown key: {key!r}")
 
 
+def _split_key(key: str) -> Tuple[str, int]:
+    """Return (letter, accidental offset) for a key name, e.g. 'Bb' -> ('B', -1)."""
+    k = key.strip()
+    if not k:
+        raise ValueError("Key cannot be empty")
+    letter = k[0].upper()
+    if letter not in LETTER_TO_SEMITONE:
+        raise ValueError(f"Unknown key: {key!r}")
+    offset = 0
+    for ch in k[1:]:
+        if ch in ("#", "♯"):
+            offset += 1
+        elif ch in ("b", "♭"):
+            offset -= 1
+        else:
+            raise ValueError(f"Unknown key: {key!r}")
+    return letter, offset
+
+
+def _degree_number(label: str) -> int:
+    """Scale-degree label ('1', '♭3', '♯5', '8') -> degree number (1-8)."""
+    return int(label.lstrip("♭♯"))
+
+
+def spell_intervals(intervals: List[int], key: str, lesson_id: str = "") -> List[str]:
+    """
+    Spell each interval above the key with the correct letter name.
+
+    The letter comes from the scale degree (see semitones_to_scale_degrees), so a
+    third is always spelled on the third letter above the root; the accidental is
+    whatever makes that letter land on the right pitch class. Eb major -> Eb, F, G,
+    Ab, Bb, C, D; G# augmented -> G#, B#, D##.
+    """
+    root_letter, root_offset = _split_key(key)
+    root_pc = (LETTER_TO_SEMITONE[root_letter] + root_offset) % 12
+    root_index = LETTERS.index(root_letter)
+    names: List[str] = []
+    for semitones, label in zip(intervals, semitones_to_scale_degrees(intervals, lesson_id)):
+        letter = LETTERS[(root_index + _degree_number(label) - 1) % 7]
+        target_pc = (root_pc + semitones) % 12
+        # Smallest signed distance from the natural letter to the target pitch class
+        offset = (target_pc - LETTER_TO_SEMITONE[letter] + 6) % 12 - 6
+        suffix = ACCIDENTAL_SUFFIX.get(offset)
+        if suffix is None:
+            # Beyond a double accidental: fall back to the plain sharp spelling
+            names.append(PITCH_CLASS_NAMES_SHARP[target_pc])
+        else:
+            names.append(letter + suffix)
+    return names
+
+
+def _name_with_octave(name: str, midi: int) -> str:
+    """Append the octave for a spelled name; B#3 and Cb4 keep their letter's octave."""
+    natural = LETTER_TO_SEMITONE.get(name[0])
+    if natural is None:
+        return f"{name}{(midi // 12) - 1}"
+    offset = (midi % 12 - natural + 6) % 12 - 6
+    return f"{name}{((midi - offset) // 12) - 1}"
+
+
 def midi_to_note_name(midi: int, include_octave: bool = False) -> str:
     """
     Map a MIDI note number to a note name (pitch class, optionally with octave).
@@ -93,6 +165,62 @@ class LessonNoteGenerator:
         reference_midi_c4: MIDI number for C4 (default 60 per standard).
         """
         self.reference_midi_c4 = reference_midi_c4
+        # (lesson_type, lesson id, key) -> spelled pitch-class names; see precompute_spellings
+        self._spellings: dict[Tuple[str, str, str], Tuple[str, ...]] = {}
+
+    def precompute_spellings(
+        self,
+        catalog: dict[str, List[LessonDefinition]],
+        keys: List[str],
+    ) -> int:
+        """
+        Spell every definition in the catalog in every key and store the result,
+        so notes_and_midi is a table read per lesson. Returns the number of entries.
+        """
+        table: dict[Tuple[str, str, str], Tuple[str, ...]] = {}
+        for defs in catalog.values():
+            for lesson in defs:
+                for key in keys:
+                    table[(lesson.lesson_type, lesson.id, key)] = tuple(
+                        spell_intervals(lesson.intervals, key, lesson.id)
+                    )
+        self._spellings = table
+        return len(table)
+
+    def update_spellings(
+        self,
+        old_catalog: dict[str, List[LessonDefinition]],
+        new_catalog: dict[str, List[LessonDefinition]],
+        keys: List[str],
+    ) -> int:
+        """
+        Rebuild the spelling table for a reloaded catalog, respelling only definitions
+        that are new or whose intervals changed; removed definitions are dropped. The new
+        table replaces the old one in a single assignment. Returns definitions respelled.
+        """
+        old_intervals = {
+            (d.lesson_type, d.id): d.intervals for defs in old_catalog.values() for d in defs
+        }
+        table: dict[Tuple[str, str, str], Tuple[str, ...]] = {}
+        respelled = 0
+        for defs in new_catalog.values():
+            for lesson in defs:
+                ident = (lesson.lesson_type, lesson.id)
+                reuse = old_intervals.get(ident) == lesson.intervals
+                if not reuse:
+                    respelled += 1
+                for key in keys:
+                    cached = self._spellings.get((*ident, key)) if reuse else None
+                    table[(*ident, key)] = cached or tuple(spell_intervals(lesson.intervals, key, lesson.id))
+        self._spellings = table
+        return respelled
+
+    def spelled_names(self, lesson: LessonDefinition, key: str) -> List[str]:
+        """Key-aware pitch-class names for the lesson (table read; computed if not precomputed)."""
+        names = self._spellings.get((lesson.lesson_type, lesson.id, key))
+        if names is None:
+            return spell_intervals(lesson.intervals, key, lesson.id)
+        return list(names)
 
     def root_midi(self, key: str, octave: int | None = None) -> int:
         """
@@ -122,20 +250,23 @@ class LessonNoteGenerator:
         - lesson: definition with .intervals (semitones from root)
         - key: root key name (e.g. "C", "F#", "Bb")
         - octave: reference octave for the root (default 4)
-        - clamp_midi: if True, clamp MIDI values to 0-127
+        - clamp_midi: if True, drop notes outside MIDI 0-127 (clamping them would change
+          their pitch class, so the name and the MIDI number would no longer agree)
         - include_octave_in_names: if True, note names include octave (e.g. "C4")
 
-        Returns (note_names, midi_notes). Both lists have the same length and
-        correspond 1:1 (note_names[i] is the name for midi_notes[i]).
+        Note names are spelled for the key (Eb major -> Eb, F, G, Ab, ...), see
+        spell_intervals. Returns (note_names, midi_notes). Both lists have the same
+        length and correspond 1:1 (note_names[i] is the name for midi_notes[i]).
         """
         root = self.root_midi(key, octave)
         midi_notes = [root + interval for interval in lesson.intervals]
+        note_names = self.spelled_names(lesson, key)
         if clamp_midi:
-            midi_notes = [max(0, min(127, n)) for n in midi_notes]
-        note_names = [
-            midi_to_note_name(m, include_octave=include_octave_in_names)
-            for m in midi_notes
-        ]
+            in_range = [(n, m) for n, m in zip(note_names, midi_notes) if 0 <= m <= 127]
+            note_names = [n for n, _ in in_range]
+            midi_notes = [m for _, m in in_range]
+        if include_octave_in_names:
+            note_names = [_name_with_octave(n, m) for n, m in zip(note_names, midi_notes)]
         return note_names, midi_notes
 
     def midi_only(
@@ -147,12 +278,13 @@ class LessonNoteGenerator:
     ) -> List[int]:
         """
         Return only MIDI note numbers for the given intervals, key, and octave.
-        Convenience when note names are not needed.
+        Convenience when note names are not needed. With clamp_midi, notes outside
+        0-127 are dropped as in notes_and_midi.
         """
         root = self.root_midi(key, octave)
         midi_notes = [root + i for i in intervals]
         if clamp_midi:
-            midi_notes = [max(0, min(127, n)) for n in midi_notes]
+            midi_notes = [n for n in midi_notes if 0 <= n <= 127]
         return midi_notes
 
 
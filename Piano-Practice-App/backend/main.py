@@ -7,35 +7,43 @@ from __future__ import annotations
 import asyncio
 import json
 import logging
-import sys
 from contextlib import asynccontextmanager
 from pathlib import Path
 
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect
+from fastapi.responses import PlainTextResponse
 
 from backend import config
 from backend.lesson_generator import pick_random_lesson
-from backend.lesson_loader import load_lesson_definitions, load_device_configs
+from backend.lesson_loader import load_lesson_definitions, load_device_configs, read_lesson_definitions
 from backend.lesson_notes import LessonNoteGenerator
-from backend.midi_handler import MIDIHandler
-from backend.sc_manager import SCClient, check_sc_running, start_sc
-from backend.validator import is_note_in_lesson
+from backend.log_setup import THROTTLE
+from backend.metronome import Metronome
+from backend.metrics import STAGE_DEQUEUE, STAGE_WS_SEND, latency_metrics, now_ns, render_queue_prometheus
+from backend.midi_handler import MIDIHandler, ensure_mido_backend
+from backend import rhodes_engine, runtime
+from backend.sc_manager import check_sc_running, start_sc, wait_for_sc
+from backend.synth_backends import BACKEND_INPROCESS, BACKEND_OSC, SynthBackend, make_synth_backend
+from backend.validator import beat_timing, is_note_in_lesson
 
-logging.basicConfig(
-    level=config.LOG_LEVEL_VALUE,
-    format="%(levelname)s:%(name)s:%(message)s",
+runtime.configure_logging(
+    config.RUNTIME_PROFILE, config.LOG_LEVEL_VALUE, queued=config.LOG_ASYNC, json_lines=config.LOG_FORMAT == "json"
 )
 logger = logging.getLogger(__name__)
 
 # --- State (set in lifespan) ---
 lesson_catalog: dict = {}
 device_configs: dict = {}
-sc_client: SCClient | None = None
+# Audio path, selected by config.SYNTH_BACKEND (see backend/synth_backends.py)
+synth: SynthBackend | None = None
 midi_handler: MIDIHandler | None = None
 note_generator: LessonNoteGenerator | None = None
 current_lesson: dict | None = None
 active_ws: WebSocket | None = None
 volume: float = config.DEFAULT_VOLUME
+metronome: Metronome | None = None
+# "warming_up" until the mido backend is loaded and scsynth answers, then "ready"
+backend_state: str = "warming_up"
 # For MIDI device change detection: last list we sent to the client (or None)
 _last_midi_devices_sent: list[str] | None = None
 MIDI_DEVICE_POLL_INTERVAL = 3.0  # seconds
@@ -51,15 +59,67 @@ async def _midi_device_poller() -> None:
             logger.warning("MIDI device poll: midi_handler is None, skip")
             continue
         current = midi_handler.list_devices()
-        # Log every poll with the device list so we can see what the system reports
-        logger.info("MIDI device poll: %d device(s) %s", len(current), current)
+        # Throttled: an unchanged device list is logged once per log_setup.REPEAT_WINDOW_SEC
+        logger.info("MIDI device poll: %d device(s) %s", len(current), current, extra=THROTTLE)
         if current != _last_midi_devices_sent:
             logger.info("MIDI device list changed: %s -> %s, pushing to client", _last_midi_devices_sent, current)
             _last_midi_devices_sent = current
             if active_ws is not None:
                 await send_ws({"type": "midi_devices", "devices": current})
         elif active_ws is None:
-            logger.info("MIDI device poll: no WebSocket client connected, not pushing")
+            logger.info("MIDI device poll: no WebSocket client connected, not pushing", extra=THROTTLE)
+
+
+def _lesson_file_stamp() -> tuple[float, int] | None:
+    try:
+        st = config.LESSON_DEFINITIONS_PATH.stat()
+    except OSError:
+        return None
+    return st.st_mtime, st.st_size
+
+
+async def _lesson_catalog_watcher() -> None:
+    """
+    Hot reload lesson_definitions.json: when its mtime/size changes, reparse and validate it
+    off the event loop, respell only changed definitions, then swap the catalog and notify
+    the client. An invalid file is logged and the current catalog stays in use.
+    """
+    global lesson_catalog, current_lesson
+    interval = config.LESSON_RELOAD_POLL_INTERVAL
+    logger.info("Lesson catalog watcher started (interval=%.1fs)", interval)
+    loop = asyncio.get_running_loop()
+    last_stamp = _lesson_file_stamp()
+    while True:
+        await asyncio.sleep(interval)
+        stamp = _lesson_file_stamp()
+        if stamp is None or stamp == last_stamp:
+            continue
+        last_stamp = stamp
+        new_catalog, errors = await loop.run_in_executor(None, read_lesson_definitions)
+        if new_catalog is None:
+            logger.warning("Lesson catalog reload rejected, keeping current catalog: %s", "; ".join(errors))
+            await send_ws({"type": "error", "message": "lesson_definitions.json is invalid: " + "; ".join(errors[:3])})
+            continue
+        respelled = note_generator.update_spellings(lesson_catalog, new_catalog, config.KEYS) if note_generator else 0
+        old_catalog, lesson_catalog = lesson_catalog, new_catalog
+        counts = {section: len(defs) for section, defs in new_catalog.items()}
+        logger.info("Lesson catalog reloaded: %s, %d definition(s) respelled", counts, respelled)
+        await send_ws({"type": "lesson_catalog", "counts": counts})
+        # Replace the current lesson only if its definition was edited or removed
+        if current_lesson and note_generator:
+            ident = (current_lesson.get("type"), current_lesson.get("id"))
+            old_def = _find_definition(old_catalog, *ident)
+            new_def = _find_definition(new_catalog, *ident)
+            if new_def is None or old_def != new_def:
+                current_lesson = pick_random_lesson(lesson_catalog, note_generator) or current_lesson
+                await send_ws({"type": "lesson", "lesson": current_lesson})
+
+
+def _find_definition(catalog: dict, lesson_type: str | None, lesson_id: str | None):
+    for lesson in catalog.get(f"{lesson_type}s", []):
+        if lesson.id == lesson_id:
+            return lesson
+    return None
 
 
 # Log WebSocket traffic (type + brief summary; avoid flooding for lesson / midi_note)
@@ -68,7 +128,10 @@ def _ws_log_send(obj: dict) -> None:
     if t == "lesson":
         logger.info("WS send: type=lesson key=%s", (obj.get("lesson") or {}).get("key"))
     elif t == "midi_note":
-        logger.debug("WS send: type=midi_note note=%s on=%s", obj.get("note"), obj.get("on"))
+        # Per note: skip building the record unless DEBUG is on
+        if logger.isEnabledFor(logging.DEBUG):
+            fields = {k: v for k, v in obj.items() if k != "type"}
+            logger.debug("WS send: type=midi_note", extra={"fields": fields})
     else:
         logger.info("WS send: type=%s %s", t, {k: v for k, v in obj.items() if k != "type"})
 
@@ -82,48 +145,133 @@ async def send_ws(obj: dict) -> None:
             pass
 
 
+def _schedule_click(at_ns: int, accent: bool) -> None:
+    """Metronome sink: forwards to whichever synth backend is current (it may change during warm-up)."""
+    if synth:
+        synth.schedule_click(at_ns, accent)
+
+
+def _trace_latency(kind: str, note: int, received_ns: int, dequeue_ns: int, ws_ns: int | None) -> None:
+    """DEBUG per-note trace of UI stage latencies (ms since MIDI receive; audio is in the osc_send histogram)."""
+    def ms(t: int | None) -> str:
+        return "-" if t is None else f"{(t - received_ns) / 1e6:.3f}"
+    logger.debug("latency %s note=%s dequeue=%sms ws=%sms", kind, note, ms(dequeue_ns), ms(ws_ns))
+
+
 async def midi_consumer() -> None:
-    """Consume MIDI queue: note on/off -> OSC + validation -> WebSocket."""
+    """
+    UI stage of the MIDI pipeline: init workflow, validation and WebSocket feedback. The note has
+    already been played by MIDIHandler.dispatch_audio in the MIDI input callback, and arrives here
+    calibrated. Stage latencies and beat timing are measured from each message's arrival stamp.
+    """
     global current_lesson
     while midi_handler is not None:
-        msg = await midi_handler.get_message()
-        if msg is None:
-            await asyncio.sleep(0.001)
+        item = await midi_handler.get_message()
+        if item is None:
             continue
-        if msg.type == "note_on" and msg.velocity == 0:
-            msg = type(msg)("note_off", note=msg.note, velocity=0, time=msg.time, channel=msg.channel)
+        received_ns, msg = item
+        dequeue_ns = now_ns()
+        latency_metrics.observe(STAGE_DEQUEUE, received_ns, dequeue_ns)
+        ws_ns: int | None = None
+        init_state = midi_handler.get_init_state()
         if msg.type == "note_on":
-            note, vel, ch = msg.note, msg.velocity or 80, msg.channel
-            logger.debug("MIDI note_on note=%s vel=%s ch=%s", note, vel, ch)
-            if sc_client:
-                sc_client.note_on(note, vel, ch)
-            # Init workflow
-            init_state = midi_handler.get_init_state() if midi_handler else None
+            note, vel = msg.note, msg.velocity
+            logger.debug("MIDI note_on note=%s vel=%s ch=%s", note, vel, msg.channel)
             if init_state:
-                completed = midi_handler.handle_init_note(note) if midi_handler else None
+                completed = midi_handler.handle_init_note(note, vel)
                 if completed:
                     await send_ws({"type": "init_complete", "config": completed})
                 else:
                     await send_ws({"type": "init_step", "step": midi_handler.get_init_state().get("step") if midi_handler else "high"})
             else:
-                # Normal: validate and send feedback
                 lesson_midi = (current_lesson or {}).get("midiNotes") or []
                 correct = is_note_in_lesson(note, lesson_midi)
-                await send_ws({"type": "midi_note", "note": note, "velocity": vel, "on": True, "isCorrect": correct})
+                timing = beat_timing(received_ns, metronome.grid) if metronome else {}
+                await send_ws({"type": "midi_note", "note": note, "velocity": vel, "on": True, "isCorrect": correct, **timing})
+                ws_ns = now_ns()
+                latency_metrics.observe(STAGE_WS_SEND, received_ns, ws_ns)
+            if logger.isEnabledFor(logging.DEBUG):
+                _trace_latency("note_on", note, received_ns, dequeue_ns, ws_ns)
         elif msg.type == "note_off":
-            note, ch = msg.note, msg.channel
-            logger.debug("MIDI note_off note=%s ch=%s", note, ch)
-            if sc_client:
-                sc_client.note_off(note, ch)
-            if not (midi_handler and midi_handler.get_init_state()):
+            note = msg.note
+            logger.debug("MIDI note_off note=%s ch=%s", note, msg.channel)
+            if not init_state:
                 lesson_midi = (current_lesson or {}).get("midiNotes") or []
                 correct = is_note_in_lesson(note, lesson_midi)
                 await send_ws({"type": "midi_note", "note": note, "velocity": 0, "on": False, "isCorrect": correct})
+                ws_ns = now_ns()
+                latency_metrics.observe(STAGE_WS_SEND, received_ns, ws_ns)
+            if logger.isEnabledFor(logging.DEBUG):
+                _trace_latency("note_off", note, received_ns, dequeue_ns, ws_ns)
+
+
+def _use_synth(name: str) -> None:
+    global synth
+    synth = make_synth_backend(name)
+    synth.set_volume(volume)
+    if midi_handler:
+        midi_handler.synth = synth
+
+
+def _start_fallback_synth() -> bool:
+    """Use the in-process Rhodes when scsynth is unreachable. Returns False if disabled or it cannot start."""
+    if config.SYNTH_FALLBACK != "inprocess":
+        return False
+    if not rhodes_engine.is_available():
+        logger.warning("In-process Rhodes unavailable (numpy not installed)")
+        return False
+    try:
+        _use_synth(BACKEND_INPROCESS)
+    except Exception as e:
+        logger.warning("In-process Rhodes failed to start: %s", e)
+        return False
+    logger.warning("SuperCollider unavailable: using in-process Rhodes")
+    return True
+
+
+async def _set_backend_state(state: str) -> None:
+    global backend_state
+    backend_state = state
+    await send_ws({"type": "status", "state": state})
+
+
+async def _warm_up(sclang_proc) -> None:
+    """
+    Finish startup off the request path: load the mido backend in an executor and find
+    scsynth. If sclang was just started, poll /status with backoff instead of sleeping a fixed
+    time; otherwise (remote scsynth, e.g. Docker) probe once more with a longer timeout than
+    the startup probe. If it still does not answer, fall back to the in-process Rhodes.
+    """
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    await loop.run_in_executor(None, ensure_mido_backend)
+    if synth is None:
+        if sclang_proc is not None:
+            reachable = await wait_for_sc(config.SC_HOST, config.SC_PORT, timeout=config.SC_BOOT_TIMEOUT_SEC)
+            if reachable:
+                logger.info("SuperCollider started (PID %s)", sclang_proc.pid)
+        else:
+            reachable = await check_sc_running(config.SC_HOST, config.SC_PORT, timeout=config.SC_REMOTE_PROBE_TIMEOUT_SEC)
+            if reachable:
+                logger.info("SuperCollider reachable at %s:%s", config.SC_HOST, config.SC_PORT)
+        if reachable:
+            _use_synth(BACKEND_OSC)
+        elif not _start_fallback_synth():
+            # Docker / remote: without SC on the host (or the in-process fallback) there is no sound
+            logger.error(
+                "SuperCollider is not reachable at %s:%s; sending notes anyway. "
+                "Start scsynth on the host (e.g. run 'sclang bootstrap.scd' in sc_programs).",
+                config.SC_HOST, config.SC_PORT,
+            )
+            _use_synth(BACKEND_OSC)
+    await _set_backend_state("ready")
+    logger.info("Backend ready (warm-up %.0f ms)", (loop.time() - started) * 1000)
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    global lesson_catalog, device_configs, sc_client, midi_handler, note_generator, current_lesson
+    global lesson_catalog, device_configs, synth, midi_handler, note_generator, current_lesson, backend_state, metronome
+    backend_state = "warming_up"
     # Load data
     config.DATA_DIR.mkdir(parents=True, exist_ok=True)
     lesson_catalog = load_lesson_definitions()
@@ -134,32 +282,31 @@ async def lifespan(app: FastAPI):
     n_devices = len(device_configs)
     logger.info("Startup: lessons chords=%d scales=%d arpeggios=%d, device_configs=%d", n_chords, n_scales, n_arpeggios, n_devices)
     note_generator = LessonNoteGenerator()
-    # SuperCollider (only start sclang when on localhost; in Docker, SC must be running on host)
-    sc_running = await check_sc_running(config.SC_HOST, config.SC_PORT, timeout=2.0)
-    if not sc_running:
-        logger.warning("SuperCollider not running at %s:%s", config.SC_HOST, config.SC_PORT)
-        if config.SC_HOST in ("127.0.0.1", "localhost") and config.SC_BOOTSTRAP_SCRIPT.exists():
-            logger.info("Starting SuperCollider: %s", config.SC_BOOTSTRAP_SCRIPT)
-            proc = start_sc()
-            if proc:
-                await asyncio.sleep(config.SC_BOOT_TIMEOUT_SEC)
-                logger.info("SuperCollider started (PID %s)", proc.pid)
-            else:
-                logger.error("Failed to start SuperCollider (sclang not found?)")
-        else:
-            # Docker / remote: require SC on host so startup fails fast with obvious error
-            msg = (
-                "SuperCollider is not reachable at %s:%s. "
-                "Start scsynth on the host (e.g. run 'sclang bootstrap.scd' in sc_programs), then restart the backend."
-            ) % (config.SC_HOST, config.SC_PORT)
-            logger.error(msg)
-            print(msg, file=sys.stderr)
-            sys.exit(1)
+    n_spellings = note_generator.precompute_spellings(lesson_catalog, config.KEYS)
+    logger.info("Startup: precomputed %d key spellings", n_spellings)
+    sclang_proc = None
+    if config.SYNTH_BACKEND != BACKEND_OSC:
+        _use_synth(config.SYNTH_BACKEND)
+        logger.info("Synth backend: %s (%s)", config.SYNTH_BACKEND, type(synth).__name__)
     else:
-        logger.info("SuperCollider already running at %s:%s", config.SC_HOST, config.SC_PORT)
-    sc_client = SCClient(config.SC_HOST, config.SC_PORT)
-    sc_client.set_volume(volume)
+        # SuperCollider (only start sclang when on localhost; in Docker, SC must be running on host).
+        # A short probe finds a running scsynth in milliseconds; a freshly started one is awaited
+        # in the background (warm-up) so WebSocket clients can connect immediately.
+        sc_running = await check_sc_running(config.SC_HOST, config.SC_PORT, timeout=config.SC_STARTUP_PROBE_TIMEOUT_SEC)
+        if not sc_running:
+            logger.warning("SuperCollider not running at %s:%s", config.SC_HOST, config.SC_PORT)
+            if config.SC_HOST in ("127.0.0.1", "localhost") and config.SC_BOOTSTRAP_SCRIPT.exists():
+                logger.info("Starting SuperCollider: %s", config.SC_BOOTSTRAP_SCRIPT)
+                sclang_proc = start_sc()
+                if sclang_proc is None:
+                    logger.error("Failed to start SuperCollider (sclang not found?)")
+            # Remote scsynth: _warm_up probes again with a longer timeout, off the startup path
+        else:
+            logger.info("SuperCollider already running at %s:%s", config.SC_HOST, config.SC_PORT)
+            _use_synth(BACKEND_OSC)
     midi_handler = MIDIHandler()
+    midi_handler.synth = synth
+    metronome = Metronome(_schedule_click)
     # Initial lesson
     current_lesson = pick_random_lesson(lesson_catalog, note_generator)
     if current_lesson:
@@ -167,24 +314,35 @@ async def lifespan(app: FastAPI):
     # Start MIDI consumer and MIDI device poller (push device list changes to client)
     consumer_task = asyncio.create_task(midi_consumer())
     poller_task = asyncio.create_task(_midi_device_poller())
-    logger.info("Backend ready: MIDI consumer and device poller started")
+    watcher_task = (
+        asyncio.create_task(_lesson_catalog_watcher()) if config.LESSON_RELOAD_POLL_INTERVAL > 0 else None
+    )
+    warmup_task = asyncio.create_task(_warm_up(sclang_proc))
+    logger.info("Backend accepting connections: MIDI consumer and device poller started")
     try:
         yield
     finally:
         logger.info("Shutting down: stopping MIDI consumer and poller")
+        warmup_task.cancel()
         consumer_task.cancel()
         poller_task.cancel()
-        try:
-            await consumer_task
-        except asyncio.CancelledError:
-            pass
-        try:
-            await poller_task
-        except asyncio.CancelledError:
-            pass
+        if watcher_task:
+            watcher_task.cancel()
+        for task in (warmup_task, consumer_task, poller_task, watcher_task):
+            if task is None:
+                continue
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        if metronome:
+            await metronome.stop()
         if midi_handler:
-            midi_handler.close()
-        sc_client = None
+            midi_handler.synth = None
+            midi_handler.shutdown()
+        if synth:
+            synth.close()
+        synth = None
         midi_handler = None
         logger.info("Shutdown complete")
 
@@ -194,7 +352,16 @@ app = FastAPI(title="Piano Practice App", lifespan=lifespan)
 
 @app.get("/health")
 def health():
-    return {"status": "ok"}
+    return {"status": "ok", "state": backend_state}
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    """Prometheus text format: MIDI receive -> dequeue / OSC send / WS send latency histograms, MIDI queue counters."""
+    body = latency_metrics.render_prometheus()
+    if midi_handler:
+        body += render_queue_prometheus(midi_handler.queue_stats())
+    return PlainTextResponse(body, media_type="text/plain; version=0.0.4")
 
 
 @app.get("/api/midi/devices")
@@ -213,14 +380,18 @@ async def websocket_endpoint(websocket: WebSocket):
         # Send initial state
         devices = midi_handler.list_devices() if midi_handler else []
         logger.info("WebSocket connected: sending initial state (lesson, %d MIDI device(s))", len(devices))
+        await send_ws({"type": "status", "state": backend_state})
         await send_ws({"type": "lesson", "lesson": current_lesson})
         await send_ws({"type": "midi_devices", "devices": devices})
         _last_midi_devices_sent = devices  # so poller doesn't immediately re-send
         if midi_handler:
             await send_ws({"type": "device_configs", "configs": midi_handler.get_all_device_configs()})
         await send_ws({"type": "volume", "value": volume})
+        if metronome:
+            await send_ws({"type": "metronome", **metronome.state()})
         while True:
             raw = await websocket.receive_text()
+            received_ns = now_ns()  # arrival stamp for virtual notes, like the MIDI input callback's
             try:
                 data = json.loads(raw)
             except json.JSONDecodeError:
@@ -271,11 +442,31 @@ async def websocket_endpoint(websocket: WebSocket):
                 try:
                     v = float(data.get("value", volume))
                     volume = max(0.0, min(1.0, v))
-                    if sc_client:
-                        sc_client.set_volume(volume)
+                    if synth:
+                        synth.set_volume(volume)
                     await send_ws({"type": "volume", "value": volume})
                 except (TypeError, ValueError):
                     await send_ws({"type": "volume", "value": volume})
+            elif msg_type == "metronome" and metronome:
+                # {running?: bool, bpm?: number, beatsPerBar?: number}
+                try:
+                    running = bool(data.get("running", metronome.running))
+                    bpm = float(data["bpm"]) if data.get("bpm") is not None else None
+                    beats_per_bar = int(data["beatsPerBar"]) if data.get("beatsPerBar") else None
+                except (TypeError, ValueError):
+                    running, bpm, beats_per_bar = metronome.running, None, None
+                if running and not metronome.running:
+                    metronome.start(bpm, beats_per_bar)
+                elif running:
+                    if beats_per_bar and beats_per_bar != metronome.beats_per_bar:
+                        metronome.start(bpm, beats_per_bar)
+                    elif bpm is not None:
+                        metronome.set_tempo(bpm)
+                elif metronome.running:
+                    await metronome.stop()
+                elif bpm is not None:
+                    metronome.set_tempo(bpm)
+                await send_ws({"type": "metronome", **metronome.state()})
             elif msg_type == "virtual_note":
                 # Mouse/touch on virtual keyboard: note (int), on (bool), velocity (optional)
                 raw_note = data.get("note")
@@ -286,14 +477,15 @@ async def websocket_endpoint(websocket: WebSocket):
                 except (TypeError, ValueError):
                     note = None
                 if note is not None and 0 <= note <= 127:
-                    if sc_client:
+                    if synth:
                         if on:
-                            sc_client.note_on(note, vel, 0)
+                            synth.note_on(note, vel, 0)
                         else:
-                            sc_client.note_off(note, 0)
+                            synth.note_off(note, 0)
                     lesson_midi = (current_lesson or {}).get("midiNotes") or []
                     correct = is_note_in_lesson(note, lesson_midi)
-                    await send_ws({"type": "midi_note", "note": note, "velocity": vel if on else 0, "on": on, "isCorrect": correct})
+                    timing = beat_timing(received_ns, metronome.grid) if on and metronome else {}
+                    await send_ws({"type": "midi_note", "note": note, "velocity": vel if on else 0, "on": on, "isCorrect": correct, **timing})
     except WebSocketDisconnect:
         pass
     finally:
@@ -302,4 +494,4 @@ async def websocket_endpoint(websocket: WebSocket):
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host=config.WS_HOST, port=config.WS_HTTP_PORT)
+    uvicorn.run(app, host=config.WS_HOST, port=config.WS_HTTP_PORT, **runtime.uvicorn_options(config.RUNTIME_PROFILE))
@@ -0,0 +1,178 @@
+"""Latency instrumentation: HDR-style histograms per pipeline stage, Prometheus text export."""
+
+from __future__ import annotations
+
+import threading
+import time
+
+# Bucket layout: values below 2 * SUB_BUCKETS ns are exact; above that, each power of two
+# is split into SUB_BUCKETS linear bins (~6% relative precision with 16). Values are
+# clamped at 2**MAX_BITS ns (~18 minutes), so memory is fixed regardless of traffic.
+SUB_BUCKET_BITS = 4
+SUB_BUCKETS = 1 << SUB_BUCKET_BITS
+MAX_BITS = 40
+_BUCKET_COUNT = (MAX_BITS - SUB_BUCKET_BITS + 1) * SUB_BUCKETS
+
+# Prometheus `le` boundaries (seconds) exported from the fine-grained bins
+PROMETHEUS_BOUNDS_SEC: tuple[float, ...] = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0,
+)
+
+# Pipeline stages, all measured from the MIDI input callback's arrival stamp. osc_send is the
+# audio fast path (synth call in the callback thread); dequeue and ws_send are the UI path.
+STAGE_DEQUEUE = "dequeue"
+STAGE_OSC_SEND = "osc_send"
+STAGE_WS_SEND = "ws_send"
+STAGES: tuple[str, ...] = (STAGE_DEQUEUE, STAGE_OSC_SEND, STAGE_WS_SEND)
+
+
+def now_ns() -> int:
+    """Monotonic high-resolution timestamp used for all latency stamps."""
+    return time.perf_counter_ns()
+
+
+def _bucket_index(value_ns: int) -> int:
+    if value_ns < 2 * SUB_BUCKETS:
+        return max(0, value_ns)
+    shift = value_ns.bit_length() - SUB_BUCKET_BITS - 1
+    idx = (shift + 1) * SUB_BUCKETS + ((value_ns >> shift) - SUB_BUCKETS)
+    return min(idx, _BUCKET_COUNT - 1)
+
+
+def _bucket_upper_ns(idx: int) -> int:
+    """Exclusive upper edge of a bucket in ns."""
+    if idx < 2 * SUB_BUCKETS:
+        return idx + 1
+    shift = idx // SUB_BUCKETS - 1
+    return ((idx % SUB_BUCKETS) + SUB_BUCKETS + 1) << shift
+
+
+class LatencyHistogram:
+    """Fixed-size log-linear histogram of nanosecond latencies; safe to record from any thread."""
+
+    def __init__(self) -> None:
+        self._counts = [0] * _BUCKET_COUNT
+        self._count = 0
+        self._sum_ns = 0
+        self._max_ns = 0
+        self._lock = threading.Lock()
+
+    def record(self, value_ns: int) -> None:
+        idx = _bucket_index(value_ns)
+        with self._lock:
+            self._counts[idx] += 1
+            self._count += 1
+            self._sum_ns += value_ns
+            if value_ns > self._max_ns:
+                self._max_ns = value_ns
+
+    @property
+    def count(self) -> int:
+        return self._count
+
+    def percentile(self, q: float) -> int:
+        """Upper bucket edge (ns) at or below which q percent (0-100) of samples fall; 0 if empty."""
+        with self._lock:
+            counts = list(self._counts)
+            total = self._count
+            max_ns = self._max_ns
+        if total == 0:
+            return 0
+        target = max(1, int(round(total * q / 100.0)))
+        seen = 0
+        for idx, c in enumerate(counts):
+            seen += c
+            if seen >= target:
+                return min(_bucket_upper_ns(idx), max_ns)
+        return max_ns
+
+    def snapshot(self) -> dict:
+        """count, sum and max (ns) plus p50/p90/p99/p999 (ns)."""
+        return {
+            "count": self._count,
+            "sum_ns": self._sum_ns,
+            "max_ns": self._max_ns,
+            "p50_ns": self.percentile(50),
+            "p90_ns": self.percentile(90),
+            "p99_ns": self.percentile(99),
+            "p999_ns": self.percentile(99.9),
+        }
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counts = [0] * _BUCKET_COUNT
+            self._count = 0
+            self._sum_ns = 0
+            self._max_ns = 0
+
+    def prometheus_lines(self, name: str, labels: str) -> list[str]:
+        with self._lock:
+            counts = list(self._counts)
+            total = self._count
+            sum_ns = self._sum_ns
+        lines: list[str] = []
+        cumulative = 0
+        idx = 0
+        for bound in PROMETHEUS_BOUNDS_SEC:
+            bound_ns = int(bound * 1e9)
+            while idx < _BUCKET_COUNT and _bucket_upper_ns(idx) <= bound_ns:
+                cumulative += counts[idx]
+                idx += 1
+            lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+        lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {total}')
+        lines.append(f"{name}_sum{{{labels}}} {sum_ns / 1e9:.9f}")
+        lines.append(f"{name}_count{{{labels}}} {total}")
+        return lines
+
+
+class LatencyMetrics:
+    """One histogram per pipeline stage (see STAGES)."""
+
+    METRIC_NAME = "piano_midi_latency_seconds"
+
+    def __init__(self, stages: tuple[str, ...] = STAGES) -> None:
+        self.histograms: dict[str, LatencyHistogram] = {s: LatencyHistogram() for s in stages}
+
+    def observe(self, stage: str, received_ns: int, at_ns: int | None = None) -> int:
+        """Record (at_ns or now) - received_ns for stage; returns the elapsed ns."""
+        elapsed = (at_ns if at_ns is not None else now_ns()) - received_ns
+        self.histograms[stage].record(elapsed)
+        return elapsed
+
+    def snapshot(self) -> dict[str, dict]:
+        return {stage: h.snapshot() for stage, h in self.histograms.items()}
+
+    def reset(self) -> None:
+        for h in self.histograms.values():
+            h.reset()
+
+    def render_prometheus(self) -> str:
+        name = self.METRIC_NAME
+        lines = [
+            f"# HELP {name} Time from MIDI arrival (input callback) to each backend pipeline stage.",
+            f"# TYPE {name} histogram",
+        ]
+        for stage, h in self.histograms.items():
+            lines.extend(h.prometheus_lines(name, f'stage="{stage}"'))
+        return "\n".join(lines) + "\n"
+
+
+def render_queue_prometheus(stats: dict[str, int]) -> str:
+    """Prometheus text for MidiEventQueue.stats(): depth and high-water gauges, event counters."""
+    lines = [
+        "# HELP piano_midi_queue_depth MIDI events waiting for the consumer.",
+        "# TYPE piano_midi_queue_depth gauge",
+        f"piano_midi_queue_depth {stats.get('depth', 0)}",
+        "# HELP piano_midi_queue_high_water Largest MIDI queue depth seen.",
+        "# TYPE piano_midi_queue_high_water gauge",
+        f"piano_midi_queue_high_water {stats.get('high_water', 0)}",
+        "# HELP piano_midi_queue_events_total MIDI events by queue outcome.",
+        "# TYPE piano_midi_queue_events_total counter",
+    ]
+    for outcome in ("enqueued", "dropped_overflow", "dropped_stale", "coalesced"):
+        lines.append(f'piano_midi_queue_events_total{{outcome="{outcome}"}} {stats.get(outcome, 0)}')
+    return "\n".join(lines) + "\n"
+
+
+# Process-wide registry used by midi_handler / main
+latency_metrics = LatencyMetrics()
@@ -0,0 +1,158 @@
+"""
+Metronome: a beat grid and a lookahead scheduler that sends clicks ahead of time with timestamps.
+
+The scheduler does not sleep once per beat. It wakes every schedule_interval and passes every
+beat due within the next lookahead window to schedule_click(at_ns, accent). The synth then
+plays the click at at_ns: SCClient sends it in an OSC bundle with an NTP timetag, and
+RhodesEngine places it at a sample offset. Because of this, event-loop jitter does not reach the audio.
+
+Each beat time is computed from the grid origin as origin + beat * period. Times are never
+built by adding periods together, so rounding error does not accumulate over a long session.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+from dataclasses import dataclass
+from typing import Callable
+
+from backend.config import (
+    METRONOME_BEATS_PER_BAR,
+    METRONOME_BPM_MAX,
+    METRONOME_BPM_MIN,
+    METRONOME_DEFAULT_BPM,
+    METRONOME_LOOKAHEAD_SEC,
+    METRONOME_SCHEDULE_INTERVAL_SEC,
+)
+from backend.metrics import now_ns
+
+logger = logging.getLogger(__name__)
+
+NS_PER_MINUTE = 60_000_000_000
+
+
+@dataclass(frozen=True)
+class BeatGrid:
+    """Beat n (n >= first_beat) falls at start_ns + (n - first_beat) * 60e9 / bpm (perf_counter ns)."""
+
+    start_ns: int
+    bpm: float
+    beats_per_bar: int = METRONOME_BEATS_PER_BAR
+    first_beat: int = 0
+
+    @property
+    def period_ns(self) -> float:
+        return NS_PER_MINUTE / self.bpm
+
+    def time_of(self, beat: int) -> int:
+        return self.start_ns + round((beat - self.first_beat) * NS_PER_MINUTE / self.bpm)
+
+    def beat_at(self, t_ns: int) -> float:
+        """Fractional beat number at t_ns."""
+        return self.first_beat + (t_ns - self.start_ns) * self.bpm / NS_PER_MINUTE
+
+    def nearest(self, t_ns: int) -> tuple[int, int]:
+        """(nearest beat, t_ns - its time): negative offset = early, positive = late."""
+        beat = max(self.first_beat, round(self.beat_at(t_ns)))
+        return beat, t_ns - self.time_of(beat)
+
+    def is_downbeat(self, beat: int) -> bool:
+        return beat % self.beats_per_bar == 0
+
+
+def clamp_bpm(bpm: float) -> float:
+    return max(METRONOME_BPM_MIN, min(METRONOME_BPM_MAX, float(bpm)))
+
+
+class Metronome:
+    """
+    Owns the beat grid and the scheduler task. schedule_click(at_ns, accent) is called from the
+    event loop up to lookahead seconds before each beat; it must not block.
+    """
+
+    def __init__(
+        self,
+        schedule_click: Callable[[int, bool], None],
+        lookahead_sec: float = METRONOME_LOOKAHEAD_SEC,
+        interval_sec: float = METRONOME_SCHEDULE_INTERVAL_SEC,
+    ):
+        self._schedule_click = schedule_click
+        self.lookahead_ns = int(lookahead_sec * 1e9)
+        self.interval_sec = interval_sec
+        self.grid: BeatGrid | None = None
+        self.bpm = METRONOME_DEFAULT_BPM
+        self.beats_per_bar = METRONOME_BEATS_PER_BAR
+        self._next_beat = 0
+        self._task: asyncio.Task | None = None
+        self.late_beats = 0  # beats skipped because the scheduler woke after them
+
+    @property
+    def running(self) -> bool:
+        return self.grid is not None
+
+    def state(self) -> dict:
+        """WebSocket payload for {"type": "metronome", ...}."""
+        return {"running": self.running, "bpm": self.bpm, "beatsPerBar": self.beats_per_bar}
+
+    def start(self, bpm: float | None = None, beats_per_bar: int | None = None) -> BeatGrid:
+        """Start (or restart) with beat 0 one lookahead from now, so the first click is not late."""
+        if bpm is not None:
+            self.bpm = clamp_bpm(bpm)
+        if beats_per_bar:
+            self.beats_per_bar = max(1, int(beats_per_bar))
+        self.grid = BeatGrid(now_ns() + self.lookahead_ns, self.bpm, self.beats_per_bar)
+        self._next_beat = 0
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+        logger.info("Metronome started: %.1f bpm, %d beats per bar", self.bpm, self.beats_per_bar)
+        return self.grid
+
+    def set_tempo(self, bpm: float) -> None:
+        """
+        Change tempo without a gap or a doubled click. The new grid starts at the next beat
+        that has not been scheduled yet, and beat numbering carries on from there.
+        """
+        self.bpm = clamp_bpm(bpm)
+        if self.grid is not None:
+            origin = self.grid.time_of(self._next_beat)
+            self.grid = BeatGrid(origin, self.bpm, self.beats_per_bar, first_beat=self._next_beat)
+            logger.info("Metronome tempo: %.1f bpm from beat %d", self.bpm, self._next_beat)
+
+    async def stop(self) -> None:
+        self.grid = None
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        logger.info("Metronome stopped")
+
+    def _schedule_due(self, now: int) -> int:
+        """Schedule every beat up to now + lookahead. Returns the number of clicks sent."""
+        grid = self.grid
+        if grid is None:
+            return 0
+        horizon = now + self.lookahead_ns
+        sent = 0
+        while (at_ns := grid.time_of(self._next_beat)) <= horizon:
+            beat = self._next_beat
+            self._next_beat += 1
+            if at_ns < now:
+                # Event loop stalled past this beat: a late click is worse than none
+                self.late_beats += 1
+                logger.debug("Metronome: beat %d late by %.1f ms, skipped", beat, (now - at_ns) / 1e6)
+                continue
+            try:
+                self._schedule_click(at_ns, grid.is_downbeat(beat))
+                sent += 1
+            except Exception as e:
+                logger.warning("Metronome: schedule_click failed: %s", e)
+        return sent
+
+    async def _run(self) -> None:
+        while self.grid is not None:
+            self._schedule_due(now_ns())
+            await asyncio.sleep(self.interval_sec)
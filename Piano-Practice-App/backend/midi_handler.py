@@ -8,19 +8,25 @@ import os
 import sys
 import threading
 from pathlib import Path
-from typing import Any
+from typing import Any, Callable
 
 import mido
 from mido import Message
 
-from backend.config import DEVICE_CONFIGS_PATH
-from backend.lesson_loader import load_device_configs, save_device_configs
+from backend.config import MIDI_NOTE_MAX_AGE_MS, MIDI_QUEUE_CAPACITY, VELOCITY_CURVE_GAMMA
+from backend.device_config_store import DeviceConfigStore
+from backend.log_setup import THROTTLE
+from backend.metrics import STAGE_OSC_SEND, latency_metrics, now_ns
+from backend.midi_queue import MidiEventQueue
 
 logger = logging.getLogger(__name__)
 
 # Log MIDI list failure only once to avoid poller flooding (e.g. missing rtmidi)
 _midi_list_failure_logged = False
 _no_ports_hint_logged = False
+# mido backend is loaded on first use (ensure_mido_backend), not at import
+_backend_ready = False
+_backend_lock = threading.Lock()
 
 
 def _init_mido_backend() -> None:
@@ -71,21 +77,33 @@ def _is_running_in_docker() -> bool:
         return False
 
 
-# Set backend and log once at import
-_init_mido_backend()
-if _is_running_in_docker():
-    logger.warning(
-        "Backend is running in Docker. USB MIDI devices on the host are not visible here. "
-        "To use a USB MIDI keyboard on macOS, run the backend on the host (e.g. uvicorn backend.main:app)."
-    )
+def ensure_mido_backend() -> None:
+    """
+    Select and load the mido backend once, on first use (port listing/opening), so importing
+    this module stays cheap. Thread-safe; main.py preloads it from an executor during warm-up.
+    """
+    global _backend_ready
+    if _backend_ready:
+        return
+    with _backend_lock:
+        if _backend_ready:
+            return
+        _init_mido_backend()
+        if _is_running_in_docker():
+            logger.warning(
+                "Backend is running in Docker. USB MIDI devices on the host are not visible here. "
+                "To use a USB MIDI keyboard on macOS, run the backend on the host (e.g. uvicorn backend.main:app)."
+            )
+        _backend_ready = True
 
 
 def get_input_names() -> list[str]:
     """Return list of available MIDI input port names. Returns [] if unavailable (e.g. in Docker)."""
     global _midi_list_failure_logged, _no_ports_hint_logged
+    ensure_mido_backend()
     try:
         names = mido.get_input_names()
-        logger.info("MIDI list_devices: found %d port(s) %s", len(names), names)
+        logger.info("MIDI list_devices: found %d port(s) %s", len(names), names, extra=THROTTLE)
         if not names and not _is_running_in_docker() and not _no_ports_hint_logged:
             _no_ports_hint_logged = True
             logger.info(
@@ -102,11 +120,15 @@ def get_input_names() -> list[str]:
         return []
 
 
-def open_input(port_name: str):
-    """Open MIDI input port by name. Returns mido port or None."""
+def open_input(port_name: str, callback: Callable[[Message], None] | None = None):
+    """
+    Open MIDI input port by name. Returns mido port or None. With callback, mido calls it for
+    each message on the backend's own input thread as the message arrives (no iteration needed).
+    """
+    ensure_mido_backend()
     try:
         logger.info("MIDI open_input: opening %r", port_name)
-        port = mido.open_input(port_name)
+        port = mido.open_input(port_name, callback=callback)
         logger.info("MIDI open_input: opened %r", port_name)
         return port
     except (OSError, IOError) as e:
@@ -114,16 +136,62 @@ def open_input(port_name: str):
         return None
 
 
+# Lookup tables applied per note in the consumer: one index each, no branching on config
+IDENTITY_MAP: tuple[int, ...] = tuple(range(128))
+NOTE_FILTERED = -1  # note_map entry for keys outside the device range
+
+
+def build_velocity_curve(soft: int, hard: int, gamma: float = VELOCITY_CURVE_GAMMA) -> list[int]:
+    """
+    128-entry velocity response: soft..hard (the player's measured touch) is stretched to
+    1..127 with exponent gamma; 0 stays 0 (note off), outside values are clamped.
+    """
+    soft, hard = max(1, min(soft, hard)), max(soft, hard)
+    span = max(1, hard - soft)
+    curve = [0]
+    for v in range(1, 128):
+        x = min(1.0, max(0.0, (v - soft) / span))
+        curve.append(max(1, min(127, round(1 + 126 * x ** gamma))))
+    return curve
+
+
+def build_note_map(config: dict[str, Any] | None) -> tuple[int, ...]:
+    """
+    128-entry note table for a device config: keys outside lowNote..highNote map to
+    NOTE_FILTERED; others are shifted by the optional transpose (and filtered if that leaves 0-127).
+    """
+    if not config:
+        return IDENTITY_MAP
+    low = config.get("lowNote", 0)
+    high = config.get("highNote", 127)
+    transpose = int(config.get("transpose", 0))
+    table = []
+    for n in range(128):
+        out = n + transpose
+        table.append(out if low <= n <= high and 0 <= out <= 127 else NOTE_FILTERED)
+    return tuple(table)
+
+
+def build_velocity_map(config: dict[str, Any] | None) -> tuple[int, ...]:
+    """128-entry velocity table from config["velocityCurve"]; identity if absent or malformed."""
+    curve = (config or {}).get("velocityCurve")
+    if not isinstance(curve, list) or len(curve) != 128:
+        return IDENTITY_MAP
+    return tuple(max(0, min(127, int(v))) for v in curve)
+
+
 def make_midi_queue(loop: asyncio.AbstractEventLoop | None = None):
     """
-    Create a callback and an async iterator that yields MIDI messages.
-    Callback pushes to a queue via call_soon_threadsafe; consumer uses async for.
+    Create a callback and an async iterator that yields (received_ns, msg).
+    The callback stamps each message with metrics.now_ns() on the calling (MIDI) thread, then
+    pushes to a queue via call_soon_threadsafe; consumer uses async for.
     """
     loop = loop or asyncio.get_event_loop()
-    queue: asyncio.Queue[Message] = asyncio.Queue()
+    queue: asyncio.Queue[tuple[int, Message]] = asyncio.Queue()
 
     def callback(msg: Message):
-        loop.call_soon_threadsafe(queue.put_nowait, msg)
+        received_ns = now_ns()
+        loop.call_soon_threadsafe(queue.put_nowait, (received_ns, msg))
 
     async def stream():
         while True:
@@ -134,25 +202,44 @@ def make_midi_queue(loop: asyncio.AbstractEventLoop | None = None):
 
 class MIDIHandler:
     """
-    One selected device; pushes note on/off to queue; optional init workflow state
-    (waiting for lowest, then highest note) and device config persistence.
+    One selected device; optional init workflow state (waiting for lowest, then highest note)
+    and device config persistence.
+
+    Each message takes two paths. The audio fast path (dispatch_audio) runs synchronously in the
+    MIDI input callback and sends the note to the synth straight away. The UI path then hands the
+    message to the event loop through the bounded queue, where midi_consumer does validation and
+    WebSocket fan-out. A slow browser or event loop therefore never delays the sound.
     """
 
     def __init__(self):
         self._port = None
-        self._callback = None
-        self._thread: threading.Thread | None = None
-        self._queue: asyncio.Queue[Message] | None = None
+        # UI path: (received_ns, msg) with msg already calibrated by dispatch_audio. received_ns is
+        # stamped in the MIDI input callback as the message arrives, so timing never includes
+        # event-loop scheduling delay (msg.time is unused). Bounded, with per-type overflow policy;
+        # one queue for the handler's lifetime so its counters survive device switches.
+        self._queue = MidiEventQueue(MIDI_QUEUE_CAPACITY, int(MIDI_NOTE_MAX_AGE_MS * 1e6))
         self._loop: asyncio.AbstractEventLoop | None = None
-        try:
-            self._device_configs = load_device_configs()
-        except Exception:
-            self._device_configs = {}
-        self._init_state: dict[str, Any] | None = None  # { "step": "low"|"high", "lowNote"?: int }
+        # Per-device records; saves happen on the store's writer thread, never on the event loop
+        self._store = DeviceConfigStore()
+        self._init_state: dict[str, Any] | None = None  # { "step": "low"|"high"|"soft"|"hard", ... }
+        # Calibration of the open device (see build_note_map / build_velocity_map)
+        self.note_map: tuple[int, ...] = IDENTITY_MAP
+        self.velocity_map: tuple[int, ...] = IDENTITY_MAP
+        # Mapped note each held key sounded, by channel * 128 + input note (NOTE_FILTERED: none).
+        # Its note_off releases that note, even if the maps changed or the init workflow started
+        # while the key was held. Only dispatch_audio touches it, on the input callback thread.
+        self._sounding: list[int] = [NOTE_FILTERED] * (16 * 128)
+        # Audio sink for the fast path; main sets it whenever the synth backend changes
+        self.synth = None
+
+    def _apply_calibration(self, device_id: str | None) -> None:
+        cfg = self._store.get(device_id) if device_id else None
+        self.note_map = build_note_map(cfg)
+        self.velocity_map = build_velocity_map(cfg)
 
     def get_device_config(self, device_id: str) -> dict[str, Any] | None:
-        """Return stored config for device (lowNote, highNote, keyCount) or None."""
-        return self._device_configs.get(device_id)
+        """Return stored config for device (lowNote, highNote, keyCount, transpose?, velocityCurve?) or None."""
+        return self._store.get(device_id)
 
     def list_devices(self) -> list[str]:
         return get_input_names()
@@ -163,25 +250,31 @@ class MIDIHandler:
             logger.info("MIDI open: closing previous port %r", getattr(self, "_current_port_name", None))
             self.close()
         logger.info("MIDI open: connecting to %r", port_name)
-        port = open_input(port_name)
+        loop = asyncio.get_event_loop()
+        queue = self._queue
+        queue.clear()  # nothing from the previous device
+        self._sounding = [NOTE_FILTERED] * (16 * 128)
+
+        def on_message(msg: Message):
+            # Stamp first, play, then hop to the event loop for the UI
+            received_ns = now_ns()
+            try:
+                msg = self.dispatch_audio(received_ns, msg)
+            except Exception as e:
+                logger.warning("MIDI audio dispatch failed: %s", e)
+            if msg is not None:
+                loop.call_soon_threadsafe(queue.put_nowait, (received_ns, msg))
+
+        port = open_input(port_name, callback=on_message)
         if port is None:
             logger.warning("MIDI open: failed to open %r", port_name)
             return f"Could not open MIDI port: {port_name}"
         self._port = port
-        self._loop = asyncio.get_event_loop()
-        self._queue = asyncio.Queue()
-
-        def put(msg: Message):
-            self._loop.call_soon_threadsafe(self._queue.put_nowait, msg)
-
-        def thread_target():
-            for msg in port:
-                put(msg)
-
-        self._thread = threading.Thread(target=thread_target, daemon=True)
-        self._thread.start()
+        self._loop = loop
         self._current_port_name = port_name
-        logger.info("MIDI open: connected %r, read thread started", port_name)
+        self._store.refresh()  # hand edits of device_configs.json (e.g. transpose)
+        self._apply_calibration(port_name)
+        logger.info("MIDI open: connected %r, input callback installed", port_name)
         return None
 
     def close(self) -> None:
@@ -193,20 +286,60 @@ class MIDIHandler:
             except Exception as e:
                 logger.warning("MIDI close: exception %s", e)
             self._port = None
-        self._thread = None
         self._current_port_name = None
+        self._apply_calibration(None)
 
-    async def get_message(self) -> Message | None:
-        """Get next MIDI message (for use in a consumer task). Returns None if closed."""
-        if self._queue is None:
-            return None
-        try:
-            return await asyncio.wait_for(self._queue.get(), timeout=0.1)
-        except asyncio.TimeoutError:
-            return None
+    def dispatch_audio(self, received_ns: int, msg: Message) -> Message | None:
+        """
+        Audio fast path (MIDI input callback thread). Turns note_on with velocity 0 into note_off,
+        applies the device calibration, plays the note and records the osc_send latency.
+        The init workflow captures the calibration, so it sees raw notes instead. A note_off
+        releases the note its key's note_on sounded (see _sounding), whatever map is active now.
+        Returns the message for the UI path, or None if the key is outside the device range.
+        """
+        if msg.type == "note_on" and msg.velocity == 0:
+            msg = Message("note_off", note=msg.note, velocity=0, channel=msg.channel, time=msg.time)
+        elif msg.type != "note_on" and msg.type != "note_off":
+            return msg
+        key = msg.channel * 128 + msg.note
+        calibrate = self._init_state is None
+        if msg.type == "note_off" and self._sounding[key] >= 0:
+            note = self._sounding[key]
+        else:
+            note = self.note_map[msg.note] if calibrate else msg.note
+            if note < 0:
+                return None
+        synth = self.synth
+        if msg.type == "note_on":
+            self._sounding[key] = note
+            vel = self.velocity_map[msg.velocity] if calibrate else msg.velocity
+            if note != msg.note or vel != msg.velocity:
+                msg = msg.copy(note=note, velocity=vel)
+            if synth is not None:
+                synth.note_on(note, vel, msg.channel)
+                latency_metrics.observe(STAGE_OSC_SEND, received_ns)
+        else:
+            self._sounding[key] = NOTE_FILTERED
+            if note != msg.note:
+                msg = msg.copy(note=note)
+            if synth is not None:
+                synth.note_off(note, msg.channel)
+                latency_metrics.observe(STAGE_OSC_SEND, received_ns)
+        return msg
+
+    async def get_message(self) -> tuple[int, Message] | None:
+        """
+        Get next (received_ns, msg) for use in a consumer task; received_ns is the input
+        callback's monotonic stamp (metrics.now_ns). Returns None if closed or idle.
+        """
+        return await self._queue.get(timeout=0.1)
+
+    def queue_stats(self) -> dict[str, int]:
+        """MIDI queue depth, high-water mark and drop/coalesce counters (see MidiEventQueue)."""
+        return self._queue.stats()
 
     def start_init_workflow(self, device_id: str) -> None:
-        """Begin init workflow for device: waiting for lowest note."""
+        """Begin init workflow for device: lowest note, highest note, then softest and hardest touch."""
         logger.info("MIDI init_workflow: started for device %r (press lowest key)", device_id)
         self._init_state = {"deviceId": device_id, "step": "low", "lowNote": None, "highNote": None}
 
@@ -216,10 +349,11 @@ class MIDIHandler:
     def get_init_state(self) -> dict[str, Any] | None:
         return self._init_state
 
-    def handle_init_note(self, note: int) -> dict[str, Any] | None:
+    def handle_init_note(self, note: int, velocity: int | None = None) -> dict[str, Any] | None:
         """
-        If in init workflow, record lowest or highest note. Returns completed config
-        { lowNote, highNote, keyCount } when both received, else None.
+        If in init workflow, record lowest and highest note, then the softest and hardest
+        velocity the player produces. Returns the completed config { lowNote, highNote,
+        keyCount, transpose, velocityCurve } after the last step, else None.
         """
         if not self._init_state:
             return None
@@ -230,21 +364,53 @@ class MIDIHandler:
             return None
         if step == "high":
             low = self._init_state.get("lowNote")
-            high = note
             if low is not None:
-                low, high = min(low, high), max(low, high)
-                key_count = high - low + 1
-                device_id = self._init_state["deviceId"]
-                self._device_configs[device_id] = {"lowNote": low, "highNote": high, "keyCount": key_count}
-                save_device_configs(self._device_configs)
-                logger.info("MIDI init_workflow: completed for %r -> lowNote=%s highNote=%s keyCount=%s", device_id, low, high, key_count)
-                self._init_state = None
-                return {"lowNote": low, "highNote": high, "keyCount": key_count}
+                self._init_state["lowNote"], self._init_state["highNote"] = min(low, note), max(low, note)
+                self._init_state["step"] = "soft"
+            return None
+        if step == "soft":
+            self._init_state["softVelocity"] = velocity or 1
+            self._init_state["step"] = "hard"
+            return None
+        if step == "hard":
+            low = self._init_state["lowNote"]
+            high = self._init_state["highNote"]
+            soft = self._init_state.get("softVelocity", 1)
+            hard = velocity or 127
+            key_count = high - low + 1
+            device_id = self._init_state["deviceId"]
+            config = {
+                "lowNote": low,
+                "highNote": high,
+                "keyCount": key_count,
+                "transpose": (self._store.get(device_id) or {}).get("transpose", 0),
+                "velocityCurve": build_velocity_curve(soft, hard),
+            }
+            self._store.put(device_id, config)
+            logger.info(
+                "MIDI init_workflow: completed for %r -> lowNote=%s highNote=%s keyCount=%s velocity %s..%s",
+                device_id, low, high, key_count, soft, hard,
+            )
+            self._init_state = None
+            if device_id == getattr(self, "_current_port_name", None):
+                self._apply_calibration(device_id)
+            return config
         return None
 
     def get_config_for_device(self, device_id: str) -> dict[str, Any] | None:
-        return self._device_configs.get(device_id)
+        return self._store.get(device_id)
+
+    def set_device_config(self, device_id: str, config: dict[str, Any], persist: bool = True) -> None:
+        """Store a device config (saved in the background when persist) and recalibrate if it is open."""
+        self._store.put(device_id, config, persist=persist)
+        if device_id == getattr(self, "_current_port_name", None):
+            self._apply_calibration(device_id)
 
     def get_all_device_configs(self) -> dict[str, dict[str, Any]]:
         """Return copy of stored device configs (device_id -> { lowNote, highNote, keyCount })."""
-        return dict(self._device_configs)
+        return self._store.all()
+
+    def shutdown(self) -> None:
+        """Close the port and flush pending device config writes."""
+        self.close()
+        self._store.flush()
@@ -0,0 +1,163 @@
+"""
+Bounded MIDI event queue between the input callback and the UI consumer, with per-type overflow policy.
+
+The input callback has already played each note (MIDIHandler.dispatch_audio). This queue only
+feeds validation and WebSocket feedback. An unbounded queue behind a stalled consumer (e.g. a slow
+WebSocket) grows without limit and then flushes a burst of stale updates. This queue holds at most `capacity` events, and when it is
+full the message type decides what happens:
+
+- note_off (and note_on with velocity 0): never dropped, so no note is left hanging.
+- control_change / pitchwheel / aftertouch / polytouch: coalesced. A new value replaces the
+  pending one for the same controller, so only the latest value is delivered.
+- everything else (note_on, clock, ...): drop-oldest. The oldest droppable event is discarded.
+
+With max_age_ns set, note_ons older than that are also dropped when dequeued, so the screen
+never lights a key long after it was played. Counters (drops, coalesced, high-water mark) are exported on /metrics.
+All methods run on the event loop thread; producers hand over with call_soon_threadsafe.
+"""
+
+from __future__ import annotations
+
+import asyncio
+from collections import deque
+
+from mido import Message
+
+from backend.metrics import now_ns
+
+POLICY_NEVER_DROP = "never_drop"
+POLICY_COALESCE = "coalesce"
+POLICY_DROP_OLDEST = "drop_oldest"
+
+_COALESCE_TYPES = frozenset(("control_change", "pitchwheel", "aftertouch", "polytouch"))
+
+
+def overflow_policy(msg: Message) -> str:
+    if msg.type == "note_off" or (msg.type == "note_on" and msg.velocity == 0):
+        return POLICY_NEVER_DROP
+    if msg.type in _COALESCE_TYPES:
+        return POLICY_COALESCE
+    return POLICY_DROP_OLDEST
+
+
+def _coalesce_key(msg: Message) -> tuple:
+    if msg.type == "control_change":
+        return (msg.type, msg.channel, msg.control)
+    if msg.type == "polytouch":
+        return (msg.type, msg.channel, msg.note)
+    return (msg.type, msg.channel)
+
+
+class MidiEventQueue:
+    """
+    Queue of (received_ns, msg) with the overflow policies above. Removed events are left in
+    place as tombstones (entry[1] = None) and skipped on get, so a drop or coalesce is O(1)
+    apart from the scan for the oldest droppable event.
+    """
+
+    def __init__(self, capacity: int, max_age_ns: int = 0):
+        self.capacity = max(1, capacity)
+        self.max_age_ns = max_age_ns
+        self._entries: deque[list] = deque()  # [received_ns, msg | None, policy]
+        self._live = 0
+        self._pending_cc: dict[tuple, list] = {}
+        self._waiter: asyncio.Future | None = None
+        self.high_water = 0
+        self.dropped_overflow = 0
+        self.dropped_stale = 0
+        self.coalesced = 0
+        self.enqueued = 0
+
+    def qsize(self) -> int:
+        return self._live
+
+    __len__ = qsize
+
+    def put_nowait(self, item: tuple[int, Message]) -> None:
+        received_ns, msg = item
+        policy = overflow_policy(msg)
+        self.enqueued += 1
+        if policy == POLICY_COALESCE:
+            key = _coalesce_key(msg)
+            pending = self._pending_cc.get(key)
+            if pending is not None and pending[1] is not None:
+                pending[0], pending[1] = received_ns, msg
+                self.coalesced += 1
+                return
+        if self._live >= self.capacity and not self._evict_oldest() and policy != POLICY_NEVER_DROP:
+            # Full of note_offs only: drop the newcomer (note_offs may exceed capacity)
+            self.dropped_overflow += 1
+            return
+        entry = [received_ns, msg, policy]
+        if len(self._entries) >= 2 * self.capacity:
+            self._compact()
+        self._entries.append(entry)
+        self._live += 1
+        if policy == POLICY_COALESCE:
+            self._pending_cc[_coalesce_key(msg)] = entry
+        if self._live > self.high_water:
+            self.high_water = self._live
+        if self._waiter is not None and not self._waiter.done():
+            self._waiter.set_result(None)
+
+    def _evict_oldest(self) -> bool:
+        """Tombstone the oldest event that may be dropped; False if every pending event is a note_off."""
+        for entry in self._entries:
+            if entry[1] is not None and entry[2] != POLICY_NEVER_DROP:
+                self._remove(entry)
+                self.dropped_overflow += 1
+                return True
+        return False
+
+    def _compact(self) -> None:
+        """Drop tombstones (they pile up behind old note_offs while the consumer is stalled)."""
+        self._entries = deque(e for e in self._entries if e[1] is not None)
+
+    def _remove(self, entry: list) -> None:
+        if entry[2] == POLICY_COALESCE:
+            self._pending_cc.pop(_coalesce_key(entry[1]), None)
+        entry[1] = None
+        self._live -= 1
+
+    def _pop(self) -> tuple[int, Message] | None:
+        while self._entries:
+            entry = self._entries.popleft()
+            received_ns, msg, policy = entry
+            if msg is None:
+                continue
+            self._remove(entry)
+            if self.max_age_ns and msg.type == "note_on" and policy == POLICY_DROP_OLDEST:
+                if now_ns() - received_ns > self.max_age_ns:
+                    self.dropped_stale += 1
+                    continue
+            return received_ns, msg
+        return None
+
+    async def get(self, timeout: float) -> tuple[int, Message] | None:
+        """Next (received_ns, msg), or None if nothing arrives within timeout."""
+        item = self._pop()
+        if item is not None:
+            return item
+        self._waiter = asyncio.get_running_loop().create_future()
+        try:
+            await asyncio.wait_for(self._waiter, timeout)
+        except asyncio.TimeoutError:
+            return None
+        finally:
+            self._waiter = None
+        return self._pop()
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._pending_cc.clear()
+        self._live = 0
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "depth": self._live,
+            "high_water": self.high_water,
+            "enqueued": self.enqueued,
+            "dropped_overflow": self.dropped_overflow,
+            "dropped_stale": self.dropped_stale,
+            "coalesced": self.coalesced,
+        }
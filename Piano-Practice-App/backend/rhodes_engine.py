@@ -0,0 +1,337 @@
+"""
+In-process FM Rhodes: NumPy port of the \\rhodes SynthDef (sc_programs/rhodes_piano.scd).
+
+Used as a fallback when scsynth is not reachable. Same note_on / note_off / set_volume interface
+as SCClient. Audio is rendered in fixed-size blocks for a preallocated voice pool, either in a
+sounddevice output callback or, with a WAV path, by a real-time paced writer thread (no audio
+device needed, e.g. in Docker). numpy and sounddevice are optional dependencies.
+"""
+
+from __future__ import annotations
+
+import heapq
+import logging
+import os
+import threading
+import time
+import wave
+from collections import deque
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+try:
+    import numpy as np
+except ImportError:  # optional dependency
+    np = None
+
+# SynthDef defaults (\rhodes): modIndex, mix, lfoSpeed (x12 in the def), lfoDepth
+MOD_INDEX = 0.2
+MIX = 0.2
+LFO_HZ = 0.4 * 12
+LFO_DEPTH = 0.1
+ATTACK_SEC = 0.001
+# Decay times of env1..env4 (Env.adsr, sustain 0, linear)
+DECAY_SEC = (1.25, 1.00, 1.50, 1.50)
+# Gate envelope Env.asr(0, 1, 0.1): release time and default curve (-4)
+RELEASE_SEC = 0.1
+RELEASE_CURVE = -4.0
+PAN_CENTER_GAIN = 0.5 ** 0.5  # Pan2 at pan=0
+TWO_PI = 2.0 * 3.141592653589793
+# Metronome click (\click in sc_programs/metronome_click.scd): sine burst, Env.perc(0.0005, 0.03)
+CLICK_FREQ = (1000.0, 1500.0)  # normal, accent
+CLICK_ATTACK_SEC = 0.0005
+CLICK_SEC = 0.03
+CLICK_AMP = 0.25
+# Block clock: how much of each block's measured start time to trust over the sample-count prediction.
+# Small values smooth callback jitter but still follow drift between the audio and system clocks.
+CLOCK_SMOOTHING = 0.05
+# 16-bit stereo frames that fit a RIFF file (32-bit size field, 44-byte header)
+WAV_MAX_FRAMES = (2**32 - 1 - 44) // 4
+
+
+def is_available() -> bool:
+    """True if numpy is importable (sounddevice is only needed for live output)."""
+    return np is not None
+
+
+class RhodesEngine:
+    """
+    Polyphonic FM Rhodes rendered in NumPy blocks.
+
+    note_on/note_off/set_volume only append commands to a deque; the render thread (audio
+    callback or WAV writer) applies them at the start of the next block, so callers never
+    block on audio and latency is at most one block.
+    """
+
+    def __init__(
+        self,
+        sample_rate: int = 44100,
+        block_size: int = 128,
+        voices: int = 24,
+        wav_path: str | Path | None = None,
+        wav_max_seconds: float = 3600.0,
+    ):
+        if np is None:
+            raise RuntimeError("numpy is required for the in-process Rhodes engine")
+        self.sample_rate = sample_rate
+        self.block_size = block_size
+        self.wav_path = Path(wav_path) if wav_path else None
+        # Frames per WAV file before rotating; a RIFF size field cannot describe 4 GiB or more
+        self._wav_max_frames = max(block_size, min(int(wav_max_seconds * sample_rate), WAV_MAX_FRAMES))
+        self._volume = 0.8
+        self._commands: deque[tuple] = deque()
+        # Preallocated voice pool (one row per voice)
+        self._active = np.zeros(voices, dtype=bool)
+        self._freq = np.zeros(voices)
+        self._vel = np.zeros(voices)
+        self._amp = np.zeros(voices)
+        self._age = np.zeros(voices, dtype=np.int64)  # samples since note_on
+        self._release_pos = np.full(voices, -1, dtype=np.int64)  # samples since note_off, -1 = gate on
+        self._phase = np.zeros((voices, 4))  # osc4 (freq/2), osc3 (freq), osc2 (freq*15), osc1 (freq)
+        self._lfo_phase = np.zeros(voices)
+        self._generation = np.zeros(voices, dtype=np.int64)  # bumped on reuse; stale note_offs ignored
+        self._ratios = np.array([0.5, 1.0, 15.0, 1.0])
+        self._ramp = np.arange(block_size, dtype=np.float64)
+        self._decay = np.array(DECAY_SEC) * sample_rate
+        self._attack = max(1.0, ATTACK_SEC * sample_rate)
+        self._release_len = int(RELEASE_SEC * sample_rate)
+        self._max_age = int((ATTACK_SEC + max(DECAY_SEC)) * sample_rate)
+        # (channel, note) -> (voice, generation) (LIFO for note off, like SCClient); render thread only
+        self._held: dict[tuple[int, int], list[tuple[int, int]]] = {}
+        # Metronome clicks: heap of (at_ns, seq, wave) waiting, and [wave, position] playing
+        self._click_waves = tuple(self._make_click(f) for f in CLICK_FREQ)
+        self._pending_clicks: list[tuple[int, int, "np.ndarray"]] = []
+        self._clicks: list[list] = []
+        self._click_seq = 0
+        self._clock_ns: float | None = None  # estimated perf_counter ns of the current block's first sample
+        self._last_frames = 0
+        self._stream = None
+        self._writer: threading.Thread | None = None
+        self._stop = threading.Event()
+
+    # --- SCClient-compatible interface (any thread) ---
+
+    def set_volume(self, value: float) -> None:
+        self._volume = max(0.0, min(1.0, value))
+
+    def note_on(self, note: int, velocity: int, channel: int = 0) -> None:
+        vel = velocity / 127.0 if velocity else 0.5
+        amp = 0.3 * self._volume * (0.3 + 0.7 * vel)
+        self._commands.append(("on", channel, note, vel, amp))
+
+    def note_off(self, note: int, channel: int = 0) -> None:
+        self._commands.append(("off", channel, note))
+
+    def schedule_click(self, at_ns: int, accent: bool = False) -> None:
+        """Metronome click starting at the sample that plays at perf_counter time at_ns."""
+        self._commands.append(("click", at_ns, accent, self._volume))
+
+    # --- lifecycle ---
+
+    def start(self) -> None:
+        """Open the sounddevice stream, or the WAV writer thread when wav_path is set."""
+        if self.wav_path is not None:
+            self._writer = threading.Thread(target=self._write_wav, name="rhodes-wav", daemon=True)
+            self._writer.start()
+            logger.info("RhodesEngine: writing %d Hz stereo to %s", self.sample_rate, self.wav_path)
+            return
+        import sounddevice as sd
+
+        self._stream = sd.OutputStream(
+            samplerate=self.sample_rate,
+            blocksize=self.block_size,
+            channels=2,
+            dtype="float32",
+            latency="low",
+            callback=self._callback,
+        )
+        self._stream.start()
+        logger.info("RhodesEngine: sounddevice output %d Hz, block %d, latency %.1f ms",
+                    self.sample_rate, self.block_size, self._stream.latency * 1000)
+
+    def close(self) -> None:
+        self._stop.set()
+        if self._stream is not None:
+            self._stream.stop()
+            self._stream.close()
+            self._stream = None
+        if self._writer is not None:
+            self._writer.join(timeout=1.0)
+            self._writer = None
+
+    # --- rendering (render thread) ---
+
+    def _callback(self, outdata, frames, time_info, status) -> None:
+        if status:
+            logger.debug("RhodesEngine: stream status %s", status)
+        block = self.render(frames)
+        outdata[:, 0] = block
+        outdata[:, 1] = block
+
+    def _open_wav(self) -> "wave.Wave_write":
+        wav = wave.open(str(self.wav_path), "wb")
+        wav.setnchannels(2)
+        wav.setsampwidth(2)
+        wav.setframerate(self.sample_rate)
+        return wav
+
+    def _rotate_wav(self, wav: "wave.Wave_write") -> "wave.Wave_write":
+        """Close the full file as <name>.1.wav (replacing the previous one) and start a new one."""
+        wav.close()
+        previous = self.wav_path.with_suffix(".1" + self.wav_path.suffix)
+        try:
+            os.replace(self.wav_path, previous)
+            logger.info("RhodesEngine: WAV rotated, previous part kept as %s", previous)
+        except OSError as e:
+            logger.warning("RhodesEngine: cannot rotate %s (%s); overwriting it", self.wav_path, e)
+        return self._open_wav()
+
+    def _write_wav(self) -> None:
+        period = self.block_size / self.sample_rate
+        wav = self._open_wav()
+        try:
+            stereo = np.empty((self.block_size, 2), dtype=np.int16)
+            written = 0
+            deadline = time.perf_counter()
+            while not self._stop.is_set():
+                if written + self.block_size > self._wav_max_frames:
+                    wav = self._rotate_wav(wav)
+                    written = 0
+                block = self.render(self.block_size)
+                pcm = (np.clip(block, -1.0, 1.0) * 32767).astype(np.int16)
+                stereo[:, 0] = pcm
+                stereo[:, 1] = pcm
+                wav.writeframes(stereo.tobytes())
+                written += self.block_size
+                deadline += period
+                delay = deadline - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+        finally:
+            wav.close()
+
+    def _make_click(self, freq: float) -> "np.ndarray":
+        t = np.arange(int(CLICK_SEC * self.sample_rate)) / self.sample_rate
+        env = np.where(t < CLICK_ATTACK_SEC, t / CLICK_ATTACK_SEC, np.exp(-4.0 * (t - CLICK_ATTACK_SEC) / CLICK_SEC))
+        return (np.sin(TWO_PI * freq * t) * env * CLICK_AMP * PAN_CENTER_GAIN).astype(np.float32)
+
+    def _block_start_ns(self, frames: int) -> float:
+        """
+        perf_counter time of this block's first sample: the previous estimate advanced by the
+        previous block's length, nudged toward the measured call time by CLOCK_SMOOTHING.
+        """
+        measured = time.perf_counter_ns()
+        if self._clock_ns is None:
+            self._clock_ns = float(measured)
+        else:
+            predicted = self._clock_ns + self._last_frames * 1e9 / self.sample_rate
+            self._clock_ns = predicted + (measured - predicted) * CLOCK_SMOOTHING
+        self._last_frames = frames
+        return self._clock_ns
+
+    def _mix_clicks(self, out: "np.ndarray", block_start_ns: float) -> None:
+        frames = out.shape[0]
+        block_end_ns = block_start_ns + frames * 1e9 / self.sample_rate
+        while self._pending_clicks and self._pending_clicks[0][0] < block_end_ns:
+            at_ns, _, wave = heapq.heappop(self._pending_clicks)
+            offset = max(0, int(round((at_ns - block_start_ns) * self.sample_rate / 1e9)))
+            self._clicks.append([wave, -offset])
+        playing = []
+        for click in self._clicks:
+            wave, pos = click
+            start = max(0, -pos)
+            n = min(frames - start, wave.shape[0] - max(0, pos))
+            if n > 0:
+                out[start:start + n] += wave[max(0, pos):max(0, pos) + n]
+            click[1] = pos + frames
+            if click[1] < wave.shape[0]:
+                playing.append(click)
+        self._clicks = playing
+
+    def _allocate(self) -> int:
+        free = np.flatnonzero(~self._active)
+        if free.size:
+            return int(free[0])
+        return int(np.argmax(self._age))  # steal the oldest voice
+
+    def _apply_commands(self) -> None:
+        while self._commands:
+            cmd = self._commands.popleft()
+            if cmd[0] == "click":
+                _, at_ns, accent, volume = cmd
+                self._click_seq += 1
+                wave = self._click_waves[1 if accent else 0] * volume
+                heapq.heappush(self._pending_clicks, (at_ns, self._click_seq, wave))
+            elif cmd[0] == "on":
+                _, channel, note, vel, amp = cmd
+                v = self._allocate()
+                self._active[v] = True
+                self._freq[v] = 440.0 * 2.0 ** ((note - 69) / 12.0) * 2.0  # freq = note.midicps * 2
+                self._vel[v] = vel
+                self._amp[v] = amp
+                self._age[v] = 0
+                self._release_pos[v] = -1
+                self._phase[v] = 0.0
+                self._lfo_phase[v] = 0.0
+                self._generation[v] += 1
+                self._held.setdefault((channel, note), []).append((v, int(self._generation[v])))
+            else:
+                _, channel, note = cmd
+                stack = self._held.get((channel, note))
+                if not stack:
+                    continue
+                v, gen = stack.pop()
+                if not stack:
+                    del self._held[(channel, note)]
+                if self._active[v] and self._generation[v] == gen and self._release_pos[v] < 0:
+                    self._release_pos[v] = 0
+
+    def render(self, frames: int) -> "np.ndarray":
+        """Render one mono block (float32) for all active voices plus due metronome clicks."""
+        block_start_ns = self._block_start_ns(frames)
+        self._apply_commands()
+        out = np.zeros(frames, dtype=np.float32)
+        if self._pending_clicks or self._clicks:
+            self._mix_clicks(out, block_start_ns)
+        idx = np.flatnonzero(self._active)
+        if idx.size == 0:
+            return out
+        ramp = self._ramp[:frames] if frames <= self.block_size else np.arange(frames, dtype=np.float64)
+        sr = self.sample_rate
+        age = self._age[idx, None] + ramp  # (v, frames) samples since note_on
+        freq = self._freq[idx, None]
+        vel = self._vel[idx, None]
+
+        def env(k: int):
+            attack = np.minimum(age / self._attack, 1.0)
+            decay = np.clip(1.0 - (age - self._attack) / self._decay[k], 0.0, 1.0)
+            return np.where(age < self._attack, attack, decay)
+
+        step = TWO_PI * freq * self._ratios / sr  # (v, 4) radians per sample
+        phases = self._phase[idx][:, :, None] + step[:, :, None] * ramp  # (v, 4, frames)
+        osc4 = np.sin(phases[:, 0]) * (TWO_PI * 2 * 0.535887 * MOD_INDEX) * env(3) * vel
+        osc3 = np.sin(phases[:, 1] + osc4) * env(2) * vel
+        osc2 = np.sin(phases[:, 2]) * (TWO_PI * 0.108819) * env(1) * vel
+        osc1 = np.sin(phases[:, 3] + osc2) * env(0) * vel
+        snd = osc3 * (1 - MIX) + osc1 * MIX
+        lfo_step = TWO_PI * LFO_HZ / sr
+        snd *= np.sin(self._lfo_phase[idx, None] + lfo_step * ramp) * LFO_DEPTH + 1
+
+        # Gate envelope: 1 while held, curved release to 0 over RELEASE_SEC after note_off
+        rel = self._release_pos[idx]
+        releasing = rel >= 0
+        if releasing.any():
+            pos = np.clip((rel[releasing, None] + ramp) / self._release_len, 0.0, 1.0)
+            gate = 1.0 - (1.0 - np.exp(RELEASE_CURVE * pos)) / (1.0 - np.exp(RELEASE_CURVE))
+            snd[releasing] *= gate
+        out += (snd * self._amp[idx, None]).sum(axis=0).astype(np.float32) * PAN_CENTER_GAIN
+
+        # Advance voice state
+        self._phase[idx] = (self._phase[idx] + step * frames) % TWO_PI
+        self._lfo_phase[idx] = (self._lfo_phase[idx] + lfo_step * frames) % TWO_PI
+        self._age[idx] += frames
+        self._release_pos[idx[releasing]] += frames
+        done = (self._age[idx] > self._max_age) | (self._release_pos[idx] >= self._release_len)
+        self._active[idx[done]] = False
+        return out
@@ -0,0 +1,50 @@
+"""
+Runtime profiles: event loop, HTTP parser and logging setup (config.RUNTIME_PROFILE).
+
+- "default": the asyncio loop. Logging is queued unless LOG_ASYNC=0 (see backend/log_setup.py).
+- "lowlatency": uvloop and httptools (when installed), no access log, and queued logging in all
+  cases. With LOG_LEVEL=DEBUG, per-note logs then no longer put stderr writes into note timing.
+"""
+
+from __future__ import annotations
+
+import importlib.util
+import logging
+from typing import Any
+
+from backend import log_setup
+
+PROFILE_DEFAULT = "default"
+PROFILE_LOW_LATENCY = "lowlatency"
+PROFILES = (PROFILE_DEFAULT, PROFILE_LOW_LATENCY)
+
+# uvicorn's loggers write directly to stderr; their records are routed through the root setup
+UVICORN_LOGGERS = ("uvicorn", "uvicorn.error", "uvicorn.access")
+
+logger = logging.getLogger(__name__)
+
+
+def configure_logging(profile: str, level: int, queued: bool = True, json_lines: bool = False) -> None:
+    """Configure the root logger for profile (replaces logging.basicConfig in main)."""
+    log_setup.setup_logging(
+        level,
+        json_lines=json_lines,
+        queued=queued or profile == PROFILE_LOW_LATENCY,
+        capture=UVICORN_LOGGERS,
+    )
+
+
+def uvicorn_options(profile: str) -> dict[str, Any]:
+    """Extra uvicorn.run / uvicorn.Config arguments for profile."""
+    # Without log_config=None, uvicorn.Config applies its own LOGGING_CONFIG after configure_logging
+    # and puts a synchronous stderr handler back on the uvicorn loggers
+    options: dict[str, Any] = {"log_config": None}
+    if profile != PROFILE_LOW_LATENCY:
+        return options
+    options["access_log"] = False
+    for option, module in (("loop", "uvloop"), ("http", "httptools")):
+        if importlib.util.find_spec(module) is not None:
+            options[option] = module
+        else:
+            logger.warning("Low-latency profile: %s not installed, using uvicorn's default %s", module, option)
+    return options
@@ -6,15 +6,25 @@ import asyncio
 import logging
 import socket
 import subprocess
+import threading
+import time
 from pathlib import Path
 from collections import defaultdict
 
-from pythonosc import udp_client
+from pythonosc import osc_bundle_builder, osc_message_builder, udp_client
 
 from backend.config import SC_BOOT_TIMEOUT_SEC, SC_BOOTSTRAP_SCRIPT, SC_HOST, SC_PORT
 
 logger = logging.getLogger(__name__)
 
+# Wall clock minus perf_counter for OSC timetags, re-sampled on every metronome click.
+# Samples are low-pass filtered so one preempted reading does not move the click; a jump
+# larger than WALL_OFFSET_STEP_SEC (NTP step, suspend) is taken at once.
+WALL_OFFSET_ALPHA = 0.1
+WALL_OFFSET_STEP_SEC = 0.05
+# A sample whose two perf_counter reads are further apart than this was preempted: ignored
+WALL_OFFSET_MAX_READ_NS = 50_000
+
 
 def _make_osc_client(host: str = SC_HOST, port: int = SC_PORT) -> udp_client.SimpleUDPClient:
     return udp_client.SimpleUDPClient(host, port)
@@ -49,6 +59,36 @@ async def check_sc_running(host: str = SC_HOST, port: int = SC_PORT, timeout: fl
     return result
 
 
+async def wait_for_sc(
+    host: str = SC_HOST,
+    port: int = SC_PORT,
+    timeout: float = SC_BOOT_TIMEOUT_SEC,
+    initial_delay: float = 0.05,
+    max_delay: float = 0.5,
+) -> bool:
+    """
+    Poll scsynth with /status until it answers or timeout elapses, backing off exponentially
+    (initial_delay doubling up to max_delay) between probes. Returns True once it answers.
+    """
+    loop = asyncio.get_event_loop()
+    deadline = loop.time() + timeout
+    delay = initial_delay
+    attempts = 0
+    while True:
+        remaining = deadline - loop.time()
+        if remaining <= 0:
+            logger.info("wait_for_sc %s:%s -> not ready after %d probe(s)", host, port, attempts)
+            return False
+        started = loop.time()
+        attempts += 1
+        if await loop.run_in_executor(None, _check_sc_running_sync, host, port, min(delay, remaining)):
+            logger.info("wait_for_sc %s:%s -> ready after %d probe(s)", host, port, attempts)
+            return True
+        # A refused probe returns immediately; still wait out the backoff interval
+        await asyncio.sleep(max(0.0, min(delay - (loop.time() - started), deadline - loop.time())))
+        delay = min(delay * 2, max_delay)
+
+
 def start_sc(bootstrap_script: str | Path | None = None) -> subprocess.Popen | None:
     """Start SuperCollider by running sclang bootstrap.scd. Returns Popen or None on failure."""
     script = Path(bootstrap_script or SC_BOOTSTRAP_SCRIPT)
@@ -71,7 +111,11 @@ def start_sc(bootstrap_script: str | Path | None = None) -> subprocess.Popen | N
 
 
 class SCClient:
-    """OSC client for Rhodes: note on/off with velocity and volume-scaled amp."""
+    """
+    OSC client for Rhodes: note on/off with velocity and volume-scaled amp. Thread-safe: notes
+    arrive from the MIDI input callback thread (audio fast path) and from the event loop
+    (virtual keyboard, metronome).
+    """
 
     def __init__(self, host: str = SC_HOST, port: int = SC_PORT):
         self._client = _make_osc_client(host, port)
@@ -79,10 +123,18 @@ class SCClient:
         self._node_id = 1000
         # (channel, note) -> list of node ids (LIFO for note off)
         self._active_nodes: dict[tuple[int, int], list[int]] = defaultdict(list)
+        self._lock = threading.Lock()  # node ids and _active_nodes
+        # perf_counter_ns -> wall clock for OSC timetags; kept in step by _sync_wall_offset()
+        self._wall_offset = self._sample_wall_offset()[0]
 
     def set_volume(self, value: float) -> None:
         self._volume = max(0.0, min(1.0, value))
 
+    def close(self) -> None:
+        """SynthBackend interface; the UDP client has nothing to flush."""
+        with self._lock:
+            self._active_nodes.clear()
+
     def _next_node_id(self) -> int:
         n = self._node_id
         self._node_id += 1
@@ -93,8 +145,9 @@ class SCClient:
     def note_on(self, note: int, velocity: int, channel: int = 0) -> None:
         vel = velocity / 127.0 if velocity else 0.5
         amp = 0.3 * self._volume * (0.3 + 0.7 * vel)
-        node_id = self._next_node_id()
-        self._active_nodes[(channel, note)].append(node_id)
+        with self._lock:
+            node_id = self._next_node_id()
+            self._active_nodes[(channel, note)].append(node_id)
         logger.debug("SC note_on note=%s vel=%s ch=%s node_id=%s", note, velocity, channel, node_id)
         # /s_new defName nodeID addAction targetID [paramName paramValue ...]
         self._client.send_message(
@@ -104,10 +157,43 @@ class SCClient:
 
     def note_off(self, note: int, channel: int = 0) -> None:
         key = (channel, note)
-        if not self._active_nodes[key]:
-            return
-        node_id = self._active_nodes[key].pop()
+        with self._lock:
+            nodes = self._active_nodes.get(key)
+            if not nodes:
+                return
+            node_id = nodes.pop()
+            if not nodes:
+                del self._active_nodes[key]
         logger.debug("SC note_off note=%s ch=%s node_id=%s", note, channel, node_id)
         self._client.send_message("/n_set", [node_id, "gate", 0])
-        if not self._active_nodes[key]:
-            del self._active_nodes[key]
+
+    @staticmethod
+    def _sample_wall_offset() -> tuple[float, int]:
+        """(time.time() - perf_counter seconds, width of the reading in ns)"""
+        before = time.perf_counter_ns()
+        wall = time.time()
+        after = time.perf_counter_ns()
+        return wall - (before + after) / 2e9, after - before
+
+    def _sync_wall_offset(self) -> None:
+        """Follow drift and steps of the wall clock against perf_counter (see WALL_OFFSET_*)."""
+        sample, width = self._sample_wall_offset()
+        if width > WALL_OFFSET_MAX_READ_NS:
+            return
+        error = sample - self._wall_offset
+        if abs(error) > WALL_OFFSET_STEP_SEC:
+            logger.info("SC: wall clock stepped by %.1f ms, timetags follow", error * 1e3)
+            self._wall_offset = sample
+        else:
+            self._wall_offset += WALL_OFFSET_ALPHA * error
+
+    def schedule_click(self, at_ns: int, accent: bool = False) -> None:
+        """Metronome click at perf_counter time at_ns: a timetagged bundle, played sample-accurately by scsynth."""
+        self._sync_wall_offset()
+        msg = osc_message_builder.OscMessageBuilder(address="/s_new")
+        # /s_new click -1 (server-assigned node; the click frees itself) addToHead group 0
+        for arg in ("click", -1, 0, 0, "accent", 1 if accent else 0, "amp", 0.25 * self._volume):
+            msg.add_arg(arg)
+        bundle = osc_bundle_builder.OscBundleBuilder(self._wall_offset + at_ns / 1e9)
+        bundle.add_content(msg.build())
+        self._client.send(bundle.build())
@@ -0,0 +1,148 @@
+"""Synth backends: one interface for the audio path (OSC/scsynth, in-process Rhodes, MIDI out, recording sink)."""
+
+from __future__ import annotations
+
+import logging
+import threading
+from collections import deque
+from typing import Protocol
+
+from backend import config
+from backend.metrics import now_ns
+
+logger = logging.getLogger(__name__)
+
+# Names accepted by config.SYNTH_BACKEND / make_synth_backend
+BACKEND_OSC = "osc"
+BACKEND_INPROCESS = "inprocess"
+BACKEND_MIDI = "midi"
+BACKEND_NULL = "null"
+BACKEND_NAMES = (BACKEND_OSC, BACKEND_INPROCESS, BACKEND_MIDI, BACKEND_NULL)
+
+
+class SynthBackend(Protocol):
+    """What main.py calls on the audio path. SCClient is the reference implementation."""
+
+    def note_on(self, note: int, velocity: int, channel: int = 0) -> None: ...
+
+    def note_off(self, note: int, channel: int = 0) -> None: ...
+
+    def set_volume(self, value: float) -> None: ...
+
+    def schedule_click(self, at_ns: int, accent: bool = False) -> None: ...
+
+    def close(self) -> None: ...
+
+
+# General MIDI percussion (channel 10) used for metronome clicks on a MIDI output
+GM_DRUM_CHANNEL = 9
+GM_CLICK_NOTES = (77, 76)  # low / high wood block: normal, accent
+
+
+class MidiOutBackend:
+    """
+    Pass notes through to a MIDI output port (e.g. a DAW on an IAC/virtual bus); volume -> CC7.
+    MIDI has no timestamps, so metronome clicks are sent by a timer thread (not sample-accurate).
+    """
+
+    def __init__(self, port_name: str):
+        import mido
+
+        from backend.midi_handler import ensure_mido_backend
+
+        ensure_mido_backend()
+        self._mido = mido
+        self._port = mido.open_output(port_name)
+        self.port_name = port_name
+        logger.info("MidiOutBackend: opened %r", port_name)
+
+    def note_on(self, note: int, velocity: int, channel: int = 0) -> None:
+        self._port.send(self._mido.Message("note_on", note=note, velocity=velocity or 64, channel=channel))
+
+    def note_off(self, note: int, channel: int = 0) -> None:
+        self._port.send(self._mido.Message("note_off", note=note, velocity=0, channel=channel))
+
+    def set_volume(self, value: float) -> None:
+        cc = int(round(max(0.0, min(1.0, value)) * 127))
+        self._port.send(self._mido.Message("control_change", control=7, value=cc, channel=0))
+
+    def schedule_click(self, at_ns: int, accent: bool = False) -> None:
+        note = GM_CLICK_NOTES[1 if accent else 0]
+        timer = threading.Timer(max(0.0, (at_ns - now_ns()) / 1e9), self._click, (note,))
+        timer.daemon = True
+        timer.start()
+
+    def _click(self, note: int) -> None:
+        try:
+            self._port.send(self._mido.Message("note_on", note=note, velocity=100, channel=GM_DRUM_CHANNEL))
+            self._port.send(self._mido.Message("note_off", note=note, velocity=0, channel=GM_DRUM_CHANNEL))
+        except Exception as e:
+            logger.debug("MidiOutBackend: click failed: %s", e)
+
+    def close(self) -> None:
+        try:
+            self._port.send(self._mido.Message("control_change", control=123, value=0, channel=0))  # all notes off
+            self._port.close()
+        except Exception as e:
+            logger.warning("MidiOutBackend: close failed: %s", e)
+
+
+class RecordingSink:
+    """
+    Null audio sink that records every call as (perf_counter_ns, method, args), for tests and
+    bench/backend_load.py. maxlen bounds memory (oldest calls dropped); None keeps everything.
+    """
+
+    def __init__(self, maxlen: int | None = None):
+        self.calls: deque[tuple[int, str, tuple]] = deque(maxlen=maxlen)
+        self.volume = config.DEFAULT_VOLUME
+
+    def note_on(self, note: int, velocity: int, channel: int = 0) -> None:
+        self.calls.append((now_ns(), "note_on", (note, velocity, channel)))
+
+    def note_off(self, note: int, channel: int = 0) -> None:
+        self.calls.append((now_ns(), "note_off", (note, channel)))
+
+    def set_volume(self, value: float) -> None:
+        self.volume = max(0.0, min(1.0, value))
+        self.calls.append((now_ns(), "set_volume", (value,)))
+
+    def schedule_click(self, at_ns: int, accent: bool = False) -> None:
+        self.calls.append((now_ns(), "schedule_click", (at_ns, accent)))
+
+    def clear(self) -> None:
+        self.calls.clear()
+
+    def close(self) -> None:
+        pass
+
+
+def make_synth_backend(name: str) -> SynthBackend:
+    """
+    Build and start the backend for name (see BACKEND_NAMES). Raises ValueError for an unknown
+    name and RuntimeError/OSError if the backend cannot start. For "osc", main.py handles
+    checking/starting scsynth first; this only creates the client.
+    """
+    if name == BACKEND_OSC:
+        from backend.sc_manager import SCClient
+
+        return SCClient(config.SC_HOST, config.SC_PORT)
+    if name == BACKEND_INPROCESS:
+        from backend.rhodes_engine import RhodesEngine
+
+        engine = RhodesEngine(
+            sample_rate=config.INPROCESS_SAMPLE_RATE,
+            block_size=config.INPROCESS_BLOCK_SIZE,
+            voices=config.INPROCESS_VOICES,
+            wav_path=config.INPROCESS_WAV_PATH,
+            wav_max_seconds=config.INPROCESS_WAV_MAX_MINUTES * 60,
+        )
+        engine.start()
+        return engine
+    if name == BACKEND_MIDI:
+        if not config.MIDI_OUT_PORT:
+            raise RuntimeError("SYNTH_BACKEND=midi requires MIDI_OUT_PORT")
+        return MidiOutBackend(config.MIDI_OUT_PORT)
+    if name == BACKEND_NULL:
+        return RecordingSink(maxlen=config.RECORDING_SINK_MAXLEN)
+    raise ValueError(f"Unknown synth backend: {name!r} (expected one of {', '.join(BACKEND_NAMES)})")
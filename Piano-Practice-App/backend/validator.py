@@ -1,8 +1,21 @@
-"""Note membership validation only (no order rules). Green if note in lesson, red if not."""
+"""Note membership validation (green if note in lesson, red if not) and timing against the metronome grid."""
 
 from __future__ import annotations
 
+from backend.metronome import BeatGrid
+
 
 def is_note_in_lesson(midi_note: int, lesson_midi_notes: list[int]) -> bool:
     """Return True if the played MIDI note is in the current lesson's expected notes."""
     return midi_note in lesson_midi_notes
+
+
+def beat_timing(received_ns: int, grid: BeatGrid | None) -> dict:
+    """
+    Where a note landed on the metronome grid, from its MIDI receive stamp: {"beat", "offsetMs"}
+    (negative offset = early). Empty when the metronome is off.
+    """
+    if grid is None:
+        return {}
+    beat, offset_ns = grid.nearest(received_ns)
+    return {"beat": beat, "offsetMs": round(offset_ns / 1e6, 2)}
@@ -0,0 +1,378 @@
+#!/usr/bin/env python3
+"""
+End-to-end load and latency benchmark for the backend (backend.main:app).
+
+Boots the real app under uvicorn on a free localhost port with:
+- a fake MIDI input port (messages fed from this process, delivered to MIDIHandler's input callback),
+- a mock scsynth on UDP (answers /status, timestamps every /s_new and /n_set it receives), or with
+  --synth null the in-process RecordingSink (backend/synth_backends.py), which timestamps every call,
+- N WebSocket clients (the first selects the fake MIDI device; all timestamp midi_note feedback).
+
+Note streams are injected at increasing rates. For each rate it reports delivered throughput,
+end-to-end percentiles (inject -> note_on at the synth, inject -> WS at the clients), the
+backend's own per-stage percentiles (backend.metrics) and the MIDI queue depth, and flags the
+first rate where the queue keeps growing. Runs offline on Linux; no MIDI or audio hardware.
+
+Usage (from Piano-Practice-App/):
+    PYTHONPATH=. python bench/backend_load.py
+    PYTHONPATH=. python bench/backend_load.py --clients 4 --rates 100,500,1000,2000 --duration 3
+    PYTHONPATH=. python bench/backend_load.py --synth null   # measure the audio path without UDP
+    PYTHONPATH=. python bench/backend_load.py --max-p99-ms 5 --json results.json   # gate: exit 1 on regression
+    PYTHONPATH=. python bench/backend_load.py --profile lowlatency --log-level DEBUG
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import socket
+import sys
+import threading
+import time
+from collections import defaultdict, deque
+
+FAKE_PORT_NAME = "Bench MIDI"
+NOTE_LOW, NOTE_HIGH = 21, 108  # note numbers cycle over an 88-key range
+
+
+def _free_port(kind: int) -> int:
+    s = socket.socket(socket.AF_INET, kind)
+    s.bind(("127.0.0.1", 0))
+    port = s.getsockname()[1]
+    s.close()
+    return port
+
+
+def _pct(values: list[int], q: float) -> float:
+    """Percentile in ms of ns samples; nan if empty."""
+    if not values:
+        return float("nan")
+    ordered = sorted(values)
+    idx = min(len(ordered) - 1, max(0, int(round(len(ordered) * q / 100.0)) - 1))
+    return ordered[idx] / 1e6
+
+
+class MockScsynth:
+    """UDP stand-in for scsynth: replies to /status, records arrival time of note OSC messages."""
+
+    def __init__(self, port: int):
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.bind(("127.0.0.1", port))
+        self.sock.settimeout(0.2)
+        self.note_on_arrivals: dict[int, deque[int]] = defaultdict(deque)
+        self.messages = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join(timeout=1.0)
+        self.sock.close()
+
+    def _run(self) -> None:
+        from pythonosc.osc_message import OscMessage
+
+        while not self._stop.is_set():
+            try:
+                data, addr = self.sock.recvfrom(65536)
+            except socket.timeout:
+                continue
+            except OSError:
+                return
+            now = time.perf_counter_ns()
+            if data.startswith(b"/status"):
+                self.sock.sendto(b"/status.reply\x00\x00\x00,\x00\x00\x00", addr)
+                continue
+            self.messages += 1
+            if data.startswith(b"/s_new"):
+                params = OscMessage(data).params
+                # ["rhodes", node_id, addAction, target, "note", note, ...]
+                if "note" in params:
+                    self.note_on_arrivals[int(params[params.index("note") + 1])].append(now)
+
+
+class FakeMidiPort:
+    """Like a mido input port opened with a callback: feed() calls it on the feeding thread."""
+
+    def __init__(self) -> None:
+        self.callback = None
+        self.closed = False
+
+    def feed(self, msg) -> None:
+        if self.callback is not None and not self.closed:
+            self.callback(msg)
+
+    def close(self) -> None:
+        self.closed = True
+        self.callback = None
+
+
+def _install_fakes(fake_port: FakeMidiPort) -> None:
+    from backend import midi_handler as mh
+
+    mh.get_input_names = lambda: [FAKE_PORT_NAME]
+    def open_input(name, callback=None):
+        if name != FAKE_PORT_NAME:
+            return None
+        fake_port.callback = callback
+        fake_port.closed = False
+        return fake_port
+
+    mh.open_input = open_input
+
+
+class ServerThread:
+    def __init__(self, app, port: int):
+        import uvicorn
+
+        from backend import config, runtime
+
+        options = runtime.uvicorn_options(config.RUNTIME_PROFILE)
+        self.server = uvicorn.Server(
+            uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning", lifespan="on", **options)
+        )
+        self.thread = threading.Thread(target=self.server.run, daemon=True)
+
+    def start(self, timeout: float = 15.0) -> None:
+        self.thread.start()
+        deadline = time.monotonic() + timeout
+        while not self.server.started:
+            if time.monotonic() > deadline or not self.thread.is_alive():
+                raise RuntimeError("backend did not start")
+            time.sleep(0.02)
+
+    def stop(self) -> None:
+        self.server.should_exit = True
+        self.thread.join(timeout=5.0)
+
+
+class Client:
+    """WebSocket client that timestamps midi_note (on) feedback per note."""
+
+    def __init__(self, idx: int):
+        self.idx = idx
+        self.arrivals: dict[int, deque[int]] = defaultdict(deque)
+        self.received = 0
+        self.ws = None
+
+    async def connect(self, url: str) -> None:
+        import websockets
+
+        self.ws = await websockets.connect(url, max_queue=None)
+
+    async def listen(self) -> None:
+        try:
+            async for raw in self.ws:
+                now = time.perf_counter_ns()
+                data = json.loads(raw)
+                if data.get("type") == "midi_note" and data.get("on"):
+                    self.received += 1
+                    self.arrivals[int(data["note"])].append(now)
+        except Exception:
+            pass
+
+
+def _inject(fake_port: FakeMidiPort, rate: float, duration: float, injected: dict[int, deque[int]]) -> int:
+    """Feed note_on/note_off pairs at `rate` note_ons per second; returns note_ons sent."""
+    import mido
+
+    count = int(rate * duration)
+    interval_ns = int(1e9 / rate)
+    start = time.perf_counter_ns()
+    note = NOTE_LOW
+    for i in range(count):
+        target = start + i * interval_ns
+        while True:
+            remaining = target - time.perf_counter_ns()
+            if remaining <= 0:
+                break
+            if remaining > 2_000_000:
+                time.sleep((remaining - 1_000_000) / 1e9)
+        stamp = time.perf_counter_ns()
+        injected[note].append(stamp)
+        fake_port.feed(mido.Message("note_on", note=note, velocity=90))
+        fake_port.feed(mido.Message("note_off", note=note, velocity=0))
+        note = NOTE_LOW if note >= NOTE_HIGH else note + 1
+    return count
+
+
+def _match(injected: dict[int, deque[int]], arrivals: dict[int, deque[int]]) -> list[int]:
+    """Pair inject/arrival stamps FIFO per note; returns latencies in ns."""
+    out: list[int] = []
+    for note, sent in injected.items():
+        got = arrivals.get(note, deque())
+        for s, a in zip(sent, got):
+            out.append(a - s)
+    return out
+
+
+def _sink_arrivals(sink) -> dict[int, deque[int]]:
+    """note_on call times per note from a RecordingSink."""
+    arrivals: dict[int, deque[int]] = defaultdict(deque)
+    for t, method, call_args in list(sink.calls):
+        if method == "note_on":
+            arrivals[call_args[0]].append(t)
+    return arrivals
+
+
+def _queue_drops(main) -> int:
+    if main.midi_handler is None:
+        return 0
+    stats = main.midi_handler.queue_stats()
+    return stats["dropped_overflow"] + stats["dropped_stale"]
+
+
+async def _run_step(main, fake_port, synth, clients, rate, duration, drain) -> dict:
+    from backend.metrics import latency_metrics
+    from backend.synth_backends import RecordingSink
+
+    sink = main.synth if isinstance(main.synth, RecordingSink) else None
+    latency_metrics.reset()
+    synth.note_on_arrivals.clear()
+    if sink is not None:
+        sink.clear()
+    for c in clients:
+        c.arrivals.clear()
+    injected: dict[int, deque[int]] = defaultdict(deque)
+    depths: list[int] = []
+    loop = asyncio.get_running_loop()
+    drops_before = _queue_drops(main)
+    inject_task = loop.run_in_executor(None, _inject, fake_port, rate, duration, injected)
+    t0 = time.perf_counter()
+    while not inject_task.done():
+        depths.append(main.midi_handler.queue_stats()["depth"] if main.midi_handler else 0)
+        await asyncio.sleep(0.05)
+    sent = await inject_task
+    elapsed = time.perf_counter() - t0
+    end_depth = depths[-1] if depths else 0
+    await asyncio.sleep(drain)
+    synth_lat = _match(injected, _sink_arrivals(sink) if sink is not None else synth.note_on_arrivals)
+    ws_lat = [lat for c in clients for lat in _match(injected, c.arrivals)]
+    stages = latency_metrics.snapshot()
+    delivered_ws = max((sum(len(v) for v in c.arrivals.values()) for c in clients), default=0)
+    return {
+        "rate": rate,
+        "sent": sent,
+        "inject_rate": sent / elapsed if elapsed else 0.0,
+        "synth_delivered": len(synth_lat),
+        "ws_delivered": delivered_ws,
+        "synth_p50_ms": _pct(synth_lat, 50),
+        "synth_p99_ms": _pct(synth_lat, 99),
+        "ws_p50_ms": _pct(ws_lat, 50),
+        "ws_p99_ms": _pct(ws_lat, 99),
+        "stages_ms": {
+            s: {"p50": h["p50_ns"] / 1e6, "p99": h["p99_ns"] / 1e6, "count": h["count"]} for s, h in stages.items()
+        },
+        "max_queue_depth": max(depths, default=0),
+        "end_queue_depth": end_depth,
+        # Events the bounded queue discarded (overflow or stale note_ons) during the step
+        "queue_drops": _queue_drops(main) - drops_before,
+        # A backlog at the end of injection that exceeds 10% of what was sent means the consumer fell behind
+        # or the bounded queue had to discard events
+        "queue_growing": end_depth > max(16, 0.1 * 2 * sent) or _queue_drops(main) > drops_before,
+    }
+
+
+async def _bench(args) -> list[dict]:
+    from backend import main
+
+    fake_port = FakeMidiPort()
+    _install_fakes(fake_port)
+    http_port = _free_port(socket.SOCK_STREAM)
+    server = ServerThread(main.app, http_port)
+    server.start()
+    try:
+        # Saved config so selecting the fake device skips the init workflow
+        main.midi_handler.set_device_config(
+            FAKE_PORT_NAME, {"lowNote": NOTE_LOW, "highNote": NOTE_HIGH, "keyCount": 88}, persist=False
+        )
+        url = f"ws://127.0.0.1:{http_port}/ws"
+        clients = [Client(i) for i in range(args.clients)]
+        for c in clients:
+            await c.connect(url)
+        listeners = [asyncio.create_task(c.listen()) for c in clients]
+        await clients[-1].ws.send(json.dumps({"type": "midi_device_select", "deviceId": FAKE_PORT_NAME}))
+        await asyncio.sleep(0.5)
+        results = []
+        for rate in args.rates:
+            r = await _run_step(main, fake_port, args.synth, clients, rate, args.duration, args.drain)
+            results.append(r)
+            _print_row(r)
+        for c in clients:
+            await c.ws.close()
+        for t in listeners:
+            t.cancel()
+        return results
+    finally:
+        server.stop()
+
+
+def _print_header() -> None:
+    print(f"{'rate/s':>8} {'sent':>7} {'synth':>7} {'ws':>7} {'syn p50':>8} {'syn p99':>8} "
+          f"{'ws p50':>8} {'ws p99':>8} {'deq p99':>8} {'maxQ':>6} {'drops':>6} {'grow':>5}")
+
+
+def _print_row(r: dict) -> None:
+    deq = r["stages_ms"].get("dequeue", {}).get("p99", float("nan"))
+    print(f"{r['rate']:>8.0f} {r['sent']:>7} {r['synth_delivered']:>7} {r['ws_delivered']:>7} "
+          f"{r['synth_p50_ms']:>8.3f} {r['synth_p99_ms']:>8.3f} {r['ws_p50_ms']:>8.3f} {r['ws_p99_ms']:>8.3f} "
+          f"{deq:>8.3f} {r['max_queue_depth']:>6} {r['queue_drops']:>6} {'yes' if r['queue_growing'] else 'no':>5}")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=1, help="WebSocket clients (default 1)")
+    parser.add_argument("--rates", default="50,100,250,500,1000,2000", help="note_on rates per second, comma-separated")
+    parser.add_argument("--duration", type=float, default=2.0, help="seconds per rate step")
+    parser.add_argument("--drain", type=float, default=1.0, help="seconds to wait for stragglers after each step")
+    parser.add_argument("--synth", choices=("osc", "null"), default="osc",
+                        help="audio path: osc to the mock scsynth (default) or the in-process recording sink")
+    parser.add_argument("--profile", choices=("default", "lowlatency"),
+                        help="backend runtime profile (RUNTIME_PROFILE, see backend/runtime.py)")
+    parser.add_argument("--log-level", help="backend LOG_LEVEL (default WARNING; DEBUG logs every note)")
+    parser.add_argument("--json", dest="json_path", help="write results to this JSON file")
+    parser.add_argument("--max-p99-ms", type=float, help="gate: exit 1 if synth p99 exceeds this at any rate before the queue grows")
+    args = parser.parse_args()
+    args.rates = [float(r) for r in args.rates.split(",") if r.strip()]
+
+    sc_port = _free_port(socket.SOCK_DGRAM)
+    # Must be set before backend.config is imported
+    os.environ["SC_HOST"] = "127.0.0.1"
+    os.environ["SC_PORT"] = str(sc_port)
+    os.environ.setdefault("LESSON_RELOAD_POLL_INTERVAL", "0")
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    if args.log_level:
+        os.environ["LOG_LEVEL"] = args.log_level.upper()
+    if args.profile:
+        os.environ["RUNTIME_PROFILE"] = args.profile
+    os.environ["SYNTH_BACKEND"] = args.synth
+    args.synth = MockScsynth(sc_port)
+    args.synth.start()
+    _print_header()
+    try:
+        results = asyncio.run(_bench(args))
+    finally:
+        args.synth.stop()
+
+    knee = next((r["rate"] for r in results if r["queue_growing"]), None)
+    print(f"\nQueue starts growing at: {knee:.0f} notes/s" if knee else "\nQueue did not grow at any tested rate")
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump({"results": results, "queue_knee_rate": knee}, f, indent=2)
+    if args.max_p99_ms is not None:
+        stable = [r for r in results if not r["queue_growing"]]
+        worst = max((r["synth_p99_ms"] for r in stable), default=float("nan"))
+        if not stable or worst > args.max_p99_ms:
+            print(f"FAIL: synth p99 {worst:.3f} ms > {args.max_p99_ms} ms")
+            return 1
+        print(f"PASS: synth p99 {worst:.3f} ms <= {args.max_p99_ms} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
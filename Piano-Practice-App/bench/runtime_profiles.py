@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Compare backend runtime profiles (backend/runtime.py) with bench/backend_load.py.
+
+Runs the load benchmark once per (variant, LOG_LEVEL) pair. Each run is its own process, since the
+event loop and logging are process-wide. Synth and WebSocket p50/p99 are printed per rate side by side.
+The variants are: default profile with synchronous logging (LOG_ASYNC=0), default profile with
+queued logging (backend/log_setup.py), and the lowlatency profile. LOG_LEVEL=DEBUG logs every note,
+which is where moving log I/O off the loop matters most.
+
+Usage (from Piano-Practice-App/):
+    PYTHONPATH=. python bench/runtime_profiles.py
+    PYTHONPATH=. python bench/runtime_profiles.py --rates 500,1000 --log-levels WARNING,DEBUG
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+BENCH = Path(__file__).resolve().parent / "backend_load.py"
+# (RUNTIME_PROFILE, LOG_ASYNC)
+VARIANTS = (("default", "0"), ("default", "1"), ("lowlatency", "1"))
+
+
+def _run(profile: str, log_async: str, log_level: str, args) -> list[dict]:
+    with tempfile.TemporaryDirectory() as tmp:
+        out = Path(tmp) / "results.json"
+        cmd = [
+            sys.executable, str(BENCH),
+            "--profile", profile, "--log-level", log_level,
+            "--rates", args.rates, "--duration", str(args.duration),
+            "--clients", str(args.clients), "--synth", args.synth,
+            "--json", str(out),
+        ]
+        # Backend logs go to stderr. Read them through a pipe, as a terminal or a container log
+        # collector would, so each write costs what it costs in practice.
+        proc = subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, env={**os.environ, "LOG_ASYNC": log_async})
+        for _ in proc.stderr:
+            pass
+        if proc.wait() != 0:
+            raise subprocess.CalledProcessError(proc.returncode, cmd)
+        return json.loads(out.read_text(encoding="utf-8"))["results"]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rates", default="250,1000,2000", help="note_on rates per second, comma-separated")
+    parser.add_argument("--duration", type=float, default=3.0, help="seconds per rate step")
+    parser.add_argument("--clients", type=int, default=2, help="WebSocket clients")
+    parser.add_argument("--synth", choices=("osc", "null"), default="osc")
+    parser.add_argument("--log-levels", default="WARNING,DEBUG", help="LOG_LEVEL values to compare")
+    args = parser.parse_args()
+
+    print(f"{'profile':>11} {'async':>5} {'log':>8} {'rate/s':>7} {'syn p50':>8} {'syn p99':>8} {'ws p50':>8} {'ws p99':>8} {'drops':>6}")
+    for log_level in [lvl.strip().upper() for lvl in args.log_levels.split(",") if lvl.strip()]:
+        for profile, log_async in VARIANTS:
+            for r in _run(profile, log_async, log_level, args):
+                print(f"{profile:>11} {log_async:>5} {log_level:>8} {r['rate']:>7.0f} {r['synth_p50_ms']:>8.3f} {r['synth_p99_ms']:>8.3f} "
+                      f"{r['ws_p50_ms']:>8.3f} {r['ws_p99_ms']:>8.3f} {r.get('queue_drops', 0):>6}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,10 +1,18 @@
 import { useApp } from '../contexts/AppContext'
 
+const PROMPTS: Record<string, string> = {
+  low: 'Play the lowest note on your keyboard.',
+  high: 'Now play the highest note on your keyboard.',
+  soft: 'Play any key as softly as you comfortably can.',
+  hard: 'Now play any key as hard as you comfortably can.',
+}
+const STEPS = ['low', 'high', 'soft', 'hard']
+
 export function InitWorkflowModal() {
   const { initWorkflow } = useApp()
   if (!initWorkflow) return null
   const step = initWorkflow.step
-  const prompt = step === 'low' ? 'Play the lowest note on your keyboard.' : 'Now play the highest note on your keyboard.'
+  const prompt = PROMPTS[step] ?? PROMPTS.high
   return (
     <div
       style={{
@@ -29,7 +37,7 @@ export function InitWorkflowModal() {
         <h3 style={{ marginTop: 0 }}>Set up keyboard</h3>
         <p style={{ color: '#ccc' }}>{prompt}</p>
         <p style={{ fontSize: 12, color: '#888' }}>
-          {step === 'low' ? 'Step 1 of 2' : 'Step 2 of 2'}
+          Step {Math.max(1, STEPS.indexOf(step) + 1)} of {STEPS.length}
         </p>
       </div>
     </div>
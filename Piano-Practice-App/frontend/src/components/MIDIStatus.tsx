@@ -1,10 +1,32 @@
+import { useEffect, useState } from 'react'
 import { useApp } from '../contexts/AppContext'
 
+// How long the "Lessons reloaded" notice stays visible
+const CATALOG_NOTICE_MS = 5000
+
 export function MIDIStatus() {
-  const { selectedDeviceId, selectedDeviceConfig, connected, error } = useApp()
+  const { selectedDeviceId, selectedDeviceConfig, connected, error, backendState, lessonCatalog } = useApp()
+  const [catalogNotice, setCatalogNotice] = useState<string | null>(null)
+
+  useEffect(() => {
+    if (!lessonCatalog) return
+    const summary = Object.entries(lessonCatalog.counts)
+      .map(([section, count]) => `${count} ${section}`)
+      .join(', ')
+    setCatalogNotice(`Lessons reloaded (${summary})`)
+    const timer = setTimeout(() => setCatalogNotice(null), CATALOG_NOTICE_MS)
+    return () => clearTimeout(timer)
+  }, [lessonCatalog])
+
   return (
     <div style={{ padding: '8px 12px', fontSize: '14px', color: '#aaa' }}>
       {!connected && <span>{error || 'Connecting…'}</span>}
+      {connected && backendState === 'warming_up' && (
+        <span role="status" style={{ color: '#e0c060', marginRight: '12px' }}>Warming up audio…</span>
+      )}
+      {connected && catalogNotice && (
+        <span role="status" style={{ color: '#7fbf7f', marginRight: '12px' }}>{catalogNotice}</span>
+      )}
       {connected && selectedDeviceId && (
         <span>
           {selectedDeviceId}
@@ -1,6 +1,7 @@
 import { ErrorDisplay } from './ErrorDisplay'
 import { InitWorkflowModal } from './InitWorkflowModal'
 import { LessonDisplay } from './LessonDisplay'
+import { MetronomeControl } from './MetronomeControl'
 import { MIDIStatus } from './MIDIStatus'
 import { NextLessonButton } from './NextLessonButton'
 import { VolumeControl } from './VolumeControl'
@@ -57,6 +58,7 @@ export function MainPage() {
             </select>
           </div>
           <VolumeControl />
+          <MetronomeControl />
           <NextLessonButton />
         </div>
       </header>
@@ -0,0 +1,38 @@
+import { useApp } from '../contexts/AppContext'
+
+export function MetronomeControl() {
+  const { metronome, setMetronome, beatOffsetMs, connected } = useApp()
+  return (
+    <div style={{ display: 'flex', alignItems: 'center', gap: 8 }}>
+      <label style={{ display: 'flex', alignItems: 'center', gap: 6, fontSize: 14 }}>
+        <input
+          type="checkbox"
+          checked={metronome.running}
+          onChange={(e) => setMetronome({ running: e.target.checked, bpm: metronome.bpm })}
+          disabled={!connected}
+          style={{ accentColor: '#4a90d9' }}
+        />
+        Metronome
+      </label>
+      <input
+        type="number"
+        min={20}
+        max={300}
+        value={metronome.bpm}
+        onChange={(e) => {
+          const bpm = parseFloat(e.target.value)
+          if (bpm >= 20 && bpm <= 300) setMetronome({ bpm })
+        }}
+        disabled={!connected}
+        title="Beats per minute"
+        style={{ width: 56, padding: '4px 6px', background: '#2a2a2a', color: '#eee', border: '1px solid #555', borderRadius: 4 }}
+      />
+      <span style={{ fontSize: 12, color: '#888' }}>bpm</span>
+      {metronome.running && beatOffsetMs !== null && (
+        <span style={{ fontSize: 12, color: Math.abs(beatOffsetMs) <= 30 ? '#6c6' : '#c96' }} title="Last note vs nearest beat">
+          {beatOffsetMs > 0 ? '+' : ''}{Math.round(beatOffsetMs)} ms
+        </span>
+      )}
+    </div>
+  )
+}
@@ -18,6 +18,21 @@ export interface DeviceConfig {
   keyCount: number
 }
 
+export interface MetronomeState {
+  running: boolean
+  bpm: number
+  beatsPerBar: number
+}
+
+// Backend startup: 'warming_up' until the MIDI backend is loaded and the synth answers
+export type BackendState = 'warming_up' | 'ready'
+
+// Sent when lesson_definitions.json is hot-reloaded: definitions per section
+export interface LessonCatalog {
+  counts: Record<string, number>
+  reloadedAt: number
+}
+
 const SHOW_ROOT_INDICATOR_KEY = 'piano-practice-show-root-indicator'
 
 function getInitialShowRootIndicator(): boolean {
@@ -31,8 +46,10 @@ function getInitialShowRootIndicator(): boolean {
 
 type AppState = {
   connected: boolean
+  backendState: BackendState | null
   error: string | null
   lesson: Lesson | null
+  lessonCatalog: LessonCatalog | null
   devices: string[]
   deviceConfigs: Record<string, DeviceConfig>
   selectedDeviceId: string | null
@@ -41,13 +58,18 @@ type AppState = {
   noteCorrect: Map<number, boolean>
   volume: number
   showRootIndicator: boolean
-  initWorkflow: { deviceId: string; step: 'low' | 'high' } | null
+  initWorkflow: { deviceId: string; step: 'low' | 'high' | 'soft' | 'hard' } | null
+  metronome: MetronomeState
+  // Last note's distance from the nearest beat (ms, negative = early); null when metronome is off
+  beatOffsetMs: number | null
 }
 
 const defaultState: AppState = {
   connected: false,
+  backendState: null,
   error: null,
   lesson: null,
+  lessonCatalog: null,
   devices: [],
   deviceConfigs: {},
   selectedDeviceId: null,
@@ -57,6 +79,8 @@ const defaultState: AppState = {
   volume: 0.8,
   showRootIndicator: getInitialShowRootIndicator(),
   initWorkflow: null,
+  metronome: { running: false, bpm: 80, beatsPerBar: 4 },
+  beatOffsetMs: null,
 }
 
 type AppContextValue = AppState & {
@@ -66,6 +90,7 @@ type AppContextValue = AppState & {
   nextLesson: () => void
   setVolume: (value: number) => void
   setShowRootIndicator: (value: boolean) => void
+  setMetronome: (update: Partial<MetronomeState>) => void
   clearError: () => void
 }
 
@@ -113,6 +138,11 @@ export function AppProvider({ children }: { children: React.ReactNode }) {
     }
   }, [])
 
+  const setMetronome = useCallback((update: Partial<MetronomeState>) => {
+    setState((prev) => ({ ...prev, metronome: { ...prev.metronome, ...update } }))
+    send({ type: 'metronome', ...update })
+  }, [send])
+
   const clearError = useCallback(() => {
     setState((prev) => ({ ...prev, error: null }))
   }, [])
@@ -140,7 +170,14 @@ export function AppProvider({ children }: { children: React.ReactNode }) {
       try {
         const data = JSON.parse(event.data)
         const t = data.type
-        if (t === 'lesson') {
+        if (t === 'status') {
+          setStateRef.current((prev) => ({ ...prev, backendState: data.state ?? null }))
+        } else if (t === 'lesson_catalog') {
+          setStateRef.current((prev) => ({
+            ...prev,
+            lessonCatalog: { counts: data.counts || {}, reloadedAt: Date.now() },
+          }))
+        } else if (t === 'lesson') {
           setStateRef.current((prev) => ({ ...prev, lesson: data.lesson ?? null }))
         } else if (t === 'midi_devices') {
           setStateRef.current((prev) => ({ ...prev, devices: data.devices || [] }))
@@ -185,10 +222,17 @@ export function AppProvider({ children }: { children: React.ReactNode }) {
               nextActive.set(note, false)
               nextCorrect.set(note, isCorrect)
             }
-            return { ...prev, activeNotes: nextActive, noteCorrect: nextCorrect }
+            const beatOffsetMs = on && typeof data.offsetMs === 'number' ? data.offsetMs : prev.beatOffsetMs
+            return { ...prev, activeNotes: nextActive, noteCorrect: nextCorrect, beatOffsetMs }
           })
         } else if (t === 'volume') {
           setStateRef.current((prev) => ({ ...prev, volume: data.value ?? prev.volume }))
+        } else if (t === 'metronome') {
+          setStateRef.current((prev) => ({
+            ...prev,
+            metronome: { running: !!data.running, bpm: data.bpm ?? prev.metronome.bpm, beatsPerBar: data.beatsPerBar ?? prev.metronome.beatsPerBar },
+            beatOffsetMs: data.running ? prev.beatOffsetMs : null,
+          }))
         } else if (t === 'error') {
           setStateRef.current((prev) => ({ ...prev, error: data.message || 'Error' }))
         }
@@ -219,6 +263,7 @@ export function AppProvider({ children }: { children: React.ReactNode }) {
     nextLesson,
     setVolume,
     setShowRootIndicator,
+    setMetronome,
     clearError,
   }
 
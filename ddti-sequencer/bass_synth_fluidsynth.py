@@ -3,11 +3,37 @@
 Bass Synthesizer using FluidSynth + SoundFont
 More realistic bass sounds using sample-based synthesis
 Requires FluidSynth and a SoundFont file
+
+The audio driver is picked per platform (DRIVERS): the first one that starts is used, or
+FLUIDSYNTH_DRIVER in synth_config.py. FluidSynth's defaults are tuned for playback, not for
+triggering: up to 16 periods of buffering, 256 voices, reverb and chorus. Here the buffer is
+FLUIDSYNTH_PERIODS x FLUIDSYNTH_PERIOD_SIZE frames, polyphony is FLUIDSYNTH_POLYPHONY, and the
+effects are off unless FLUIDSYNTH_EFFECTS is set. The startup report shows the resulting
+buffer latency.
+
+Only the samples of the selected preset (BASS_BANK / BASS_PROGRAM) are loaded, and they are
+locked in memory. Before the audio driver starts, every sequence note is played once into a
+throwaway buffer, so the first hit does not pay for loading or paging in a sample.
+
+Offline rendering: the Sequenced track of a capture file (capture.py) is rendered to a WAV
+file, block by block, as fast as the CPU allows. Memory use does not grow with the length
+of the show:
+    python3 bass_synth_fluidsynth.py --render captures/ddti-20261019-203015.mid
 """
 
+import argparse
+import logging
 import mido
 import sys
 import time
+import wave
+from typing import List, Optional, Tuple
+
+from log_setup import MESSAGE_FORMAT, setup_logging
+from realtime import add_realtime_args, enter_realtime, exit_realtime, report
+from trigger_filter import TriggerFilter
+
+logger = logging.getLogger("ddti.synth")
 
 try:
     import fluidsynth
@@ -18,24 +44,96 @@ except ImportError:
     print("  Linux: sudo apt install fluidsynth && pip install pyfluidsynth")
     sys.exit(1)
 
+# Tried in order until one starts (jack only starts when a JACK server is running)
+DRIVERS = {
+    'darwin': ('coreaudio',),
+    'linux': ('jack', 'alsa', 'pulseaudio'),
+    'win32': ('wasapi', 'dsound'),
+}
+PERIOD_SIZE = 64
+PERIODS = 2
+POLYPHONY = 16
+BASS_PROGRAM = 38            # Synth Bass 1
+WARMUP_FRAMES = 512          # per note when preloading
+RENDER_BLOCK_FRAMES = 8192
+RENDER_TAIL_SEC = 2.0        # rendered after the last event, for the release
+
+
+def fluidsynth_options() -> dict:
+    """FluidSynthBass keyword arguments from synth_config.py (module defaults for anything missing)"""
+    try:
+        import synth_config
+    except ImportError:
+        synth_config = None
+    return {
+        'driver': getattr(synth_config, 'FLUIDSYNTH_DRIVER', None),
+        'device': getattr(synth_config, 'FLUIDSYNTH_DEVICE', None),
+        'period_size': getattr(synth_config, 'FLUIDSYNTH_PERIOD_SIZE', PERIOD_SIZE),
+        'periods': getattr(synth_config, 'FLUIDSYNTH_PERIODS', PERIODS),
+        'polyphony': getattr(synth_config, 'FLUIDSYNTH_POLYPHONY', POLYPHONY),
+        'effects': getattr(synth_config, 'FLUIDSYNTH_EFFECTS', False),
+        'sample_rate': getattr(synth_config, 'SAMPLE_RATE', 44100),
+        'bank': getattr(synth_config, 'BASS_BANK', 0),
+        'program': getattr(synth_config, 'BASS_PROGRAM', BASS_PROGRAM),
+    }
+
+
+def start_audio(fs, driver: Optional[str] = None, device: Optional[str] = None) -> str:
+    """Start fs's audio driver: driver if given, else the first of DRIVERS that starts"""
+    if driver:
+        candidates = (driver,)
+    else:
+        platform = 'linux' if sys.platform.startswith('linux') else sys.platform
+        candidates = DRIVERS.get(platform, ('portaudio',))
+    for name in candidates:
+        if name == 'jack':
+            # Without autoconnect JACK output goes nowhere
+            fs.setting('audio.jack.autoconnect', 1)
+        fs.start(driver=name, device=device)
+        if getattr(fs, 'audio_driver', None):
+            return name
+    raise RuntimeError(f"no FluidSynth audio driver started (tried: {', '.join(candidates)})")
+
 
 class FluidSynthBass:
     """FluidSynth-based bass synthesizer"""
-    def __init__(self, soundfont_path: str, input_port: str, note_sequence: list):
+    def __init__(self, soundfont_path: str, input_port: str, note_sequence: list,
+                 driver: Optional[str] = None, device: Optional[str] = None,
+                 period_size: int = PERIOD_SIZE, periods: int = PERIODS, polyphony: int = POLYPHONY,
+                 effects: bool = False, sample_rate: int = 44100, bank: int = 0,
+                 program: int = BASS_PROGRAM, offline: bool = False):
         """
         Args:
             soundfont_path: Path to .sf2 SoundFont file
             input_port: MIDI input port name
             note_sequence: List of MIDI notes to cycle through
+            driver: FluidSynth audio driver (None: first of DRIVERS that starts)
+            device: audio device for the driver (None: its default)
+            period_size, periods: audio buffer, periods x period_size frames
+            polyphony: maximum voices
+            effects: keep FluidSynth's reverb and chorus
+            bank, program: SoundFont preset to play
+            offline: no audio driver, only render() (see --render)
         """
         self.soundfont_path = soundfont_path
         self.input_port_name = input_port
         self.note_sequence = note_sequence
         self.current_index = 0
+        self.trigger_filter = TriggerFilter.from_config()
+        self.sample_rate = sample_rate
+        self.driver = None
         
-        # Initialize FluidSynth
-        self.fs = fluidsynth.Synth()
-        self.fs.start(driver='coreaudio')  # Use 'alsa' on Linux
+        # Initialize FluidSynth: settings must be in place before the synth and driver are created
+        self.fs = fluidsynth.Synth(samplerate=float(sample_rate), **{
+            'synth.polyphony': polyphony,
+            'synth.reverb.active': int(effects),
+            'synth.chorus.active': int(effects),
+            # Load sample data when a preset is selected (only the bass), and keep it in RAM
+            'synth.dynamic-sample-loading': 1,
+            'synth.lock-memory': 1,
+            'audio.period-size': period_size,
+            'audio.periods': periods,
+        })
         
         # Load SoundFont
         try:
@@ -49,9 +147,79 @@ class FluidSynthBass:
         # 32 = Acoustic Bass, 33 = Electric Bass (finger), 34 = Electric Bass (pick)
         # 35 = Fretless Bass, 36 = Slap Bass 1, 37 = Slap Bass 2
         # 38 = Synth Bass 1, 39 = Synth Bass 2
-        self.fs.program_select(0, self.sfid, 0, 38)  # Synth Bass 1
+        self.fs.program_select(0, self.sfid, bank, program)
+        preset_name = getattr(self.fs, 'sfpreset_name', None)
+        name = preset_name(self.sfid, bank, program) if preset_name else None
+        preset = f"bank {bank}, program {program}"
+        print(f"✅ Selected instrument: {f'{name} ({preset})' if name else preset}")
+        
+        t0 = time.perf_counter()
+        self.preload(self.note_sequence)
+        print(f"✅ Preloaded {len(set(self.note_sequence))} notes in {(time.perf_counter() - t0) * 1000:.0f} ms")
         
-        print(f"✅ Selected instrument: Synth Bass 1 (program 38)")
+        if not offline:
+            try:
+                self.driver = start_audio(self.fs, driver, device)
+            except (RuntimeError, AssertionError) as e:
+                print(f"❌ {e}")
+                sys.exit(1)
+            self._report_audio(sample_rate, period_size, periods, polyphony, effects)
+    
+    def preload(self, notes):
+        """Play each note into a throwaway buffer (no driver running yet): pages in its samples"""
+        for note in sorted(set(notes)):
+            self.fs.noteon(0, note, 1)
+            self.fs.get_samples(WARMUP_FRAMES)
+            self.fs.cc(0, 120, 0)  # All Sound Off
+        self.fs.get_samples(WARMUP_FRAMES)
+    
+    def _report_audio(self, sample_rate: int, period_size: int, periods: int, polyphony: int, effects: bool):
+        # Read back what FluidSynth accepted (clamped to its limits) where pyfluidsynth allows it
+        get = getattr(self.fs, 'get_setting', None)
+        if get is not None:
+            period_size = get('audio.period-size') or period_size
+            periods = get('audio.periods') or periods
+        buffer_ms = period_size * periods / sample_rate * 1000
+        print(f"🔊 FluidSynth audio: {self.driver}, {periods} x {period_size} frames @ {sample_rate} Hz "
+              f"= {buffer_ms:.1f} ms buffer")
+        if self.driver == 'jack':
+            print("   (JACK uses the server's buffer size; see jackd -p / -n)")
+        print(f"   Polyphony {polyphony}, reverb/chorus {'on' if effects else 'off'}")
+    
+    def note_on(self, note: int, velocity: int):
+        self.fs.noteon(0, note, velocity)
+    
+    def note_off(self, note: int):
+        self.fs.noteoff(0, note)
+    
+    def close(self):
+        self.fs.delete()
+    
+    def render(self, events: List[Tuple[float, mido.Message]], wav_path: str,
+               tail_sec: float = RENDER_TAIL_SEC, block_frames: int = RENDER_BLOCK_FRAMES) -> float:
+        """Render (seconds, note message) events to a 16-bit stereo WAV; returns the audio length in seconds"""
+        rate = self.sample_rate
+        written = 0
+        with wave.open(wav_path, 'wb') as out:
+            out.setnchannels(2)
+            out.setsampwidth(2)
+            out.setframerate(rate)
+            
+            def render_until(frame):
+                nonlocal written
+                while written < frame:
+                    n = min(block_frames, frame - written)
+                    out.writeframes(fluidsynth.raw_audio_string(self.fs.get_samples(n)))
+                    written += n
+            
+            for seconds, msg in events:
+                render_until(int(seconds * rate))
+                if msg.type == 'note_on' and msg.velocity > 0:
+                    self.note_on(msg.note, msg.velocity)
+                else:
+                    self.note_off(msg.note)
+            render_until(written + int(tail_sec * rate))
+        return written / rate
     
     def get_next_note(self) -> int:
         """Get next note in sequence"""
@@ -69,36 +237,48 @@ class FluidSynthBass:
     def process_midi(self, msg: mido.Message):
         """Process incoming MIDI message"""
         if msg.type == 'note_on' and msg.velocity > 0:
+            # Double-fires and crosstalk must not advance the sequence
+            if not self.trigger_filter.accept(msg.note, msg.velocity, time.perf_counter_ns()):
+                return
             # Get next note in sequence
             midi_note = self.get_next_note()
             
             # Play note on FluidSynth
-            self.fs.noteon(0, midi_note, msg.velocity)
+            self.note_on(midi_note, msg.velocity)
             
-            print(f"🎵 Playing {self.get_note_name(midi_note)} (velocity: {msg.velocity}) "
-                  f"[Step {self.current_index}/{len(self.note_sequence)}]")
+            if logger.isEnabledFor(logging.INFO):
+                logger.info(
+                    "🎵 Playing %s", self.get_note_name(midi_note),
+                    extra={"fields": {"vel": msg.velocity, "step": f"{self.current_index}/{len(self.note_sequence)}"}},
+                )
             
         elif msg.type == 'note_off' or (msg.type == 'note_on' and msg.velocity == 0):
+            if not self.trigger_filter.accept_off(msg.note):
+                return
             # Note off - let the previous note decay naturally
             prev_index = (self.current_index - 1) % len(self.note_sequence)
             prev_note = self.note_sequence[prev_index]
-            self.fs.noteoff(0, prev_note)
+            self.note_off(prev_note)
     
-    def run(self):
-        """Main loop"""
+    def run(self, realtime: bool = False, cpu=None):
+        """Main loop (realtime: see realtime.py)"""
         try:
             print(f"\n📝 Note sequence: {[self.get_note_name(n) for n in self.note_sequence]}")
             print(f"🎵 Listening for triggers...\n")
             
             # Open MIDI input
             with mido.open_input(self.input_port_name) as inport:
+                if realtime:
+                    report(enter_realtime(cpu))
                 for msg in inport:
                     self.process_midi(msg)
                     
         except KeyboardInterrupt:
             print("\n\n👋 Shutting down...")
         finally:
-            self.fs.delete()
+            if realtime:
+                exit_realtime()
+            self.close()
 
 
 def main():
@@ -111,26 +291,66 @@ def main():
         NOTE_SEQUENCE = [36, 40, 43, 48]  # C1 → E1 → G1 → C2
         INPUT_PORT = "TriggerIO MIDI Out"
     
+    options = fluidsynth_options()
+    parser = argparse.ArgumentParser(description="DDTI bass synthesizer (FluidSynth)")
+    parser.add_argument('--driver', default=options['driver'],
+                        help="audio driver, e.g. coreaudio, alsa, jack, pulseaudio (default: auto)")
+    parser.add_argument('--period-size', type=int, default=options['period_size'],
+                        help=f"frames per audio period (default: {options['period_size']})")
+    parser.add_argument('--periods', type=int, default=options['periods'],
+                        help=f"audio periods in the buffer (default: {options['periods']})")
+    parser.add_argument('--render', metavar='CAPTURE',
+                        help="render a capture file's Sequenced track (capture.py) to WAV instead of playing live")
+    parser.add_argument('--out', help="with --render: WAV path (default: the capture path with .wav)")
+    add_realtime_args(parser)
+    args = parser.parse_args()
+    options.update(driver=args.driver, period_size=args.period_size, periods=args.periods)
+    
+    setup_logging(env_prefix="DDTI_LOG_", text_format=MESSAGE_FORMAT)
+    
     # ===== CONFIGURATION =====
-    # Path to SoundFont file
+    # Path to SoundFont file (SOUNDFONT_PATH in synth_config.py)
     # Download free SoundFonts from:
     # - https://musical-artifacts.com/artifacts?tags=soundfont
     # - https://schristiancollins.com/generaluser.php (GeneralUser GS)
-    
-    SOUNDFONT_PATH = "/usr/local/share/soundfonts/default.sf2"  # Adjust path
+    try:
+        import synth_config
+    except ImportError:
+        synth_config = None
+    SOUNDFONT_PATH = getattr(synth_config, 'SOUNDFONT_PATH', "/usr/local/share/soundfonts/default.sf2")
     
     print("=" * 60)
     print("🎸 DDTI Bass Synthesizer - FluidSynth")
     print("=" * 60)
     
+    if args.render:
+        from capture import read_capture
+        events = [(t, msg) for t, _, msg in read_capture(args.render, 'Sequenced')]
+        wav_path = args.out or args.render.rsplit('.', 1)[0] + '.wav'
+        synth = FluidSynthBass(
+            soundfont_path=SOUNDFONT_PATH,
+            input_port=INPUT_PORT,
+            note_sequence=sorted({msg.note for _, msg in events}),
+            offline=True,
+            **options
+        )
+        t0 = time.perf_counter()
+        seconds = synth.render(events, wav_path)
+        elapsed = time.perf_counter() - t0
+        synth.close()
+        print(f"💾 {wav_path}: {seconds:.1f} s of audio from {len(events)} events "
+              f"in {elapsed:.2f} s ({seconds / max(elapsed, 1e-9):.0f}x real time)")
+        return
+    
     # Create synth
     synth = FluidSynthBass(
         soundfont_path=SOUNDFONT_PATH,
         input_port=INPUT_PORT,
-        note_sequence=NOTE_SEQUENCE
+        note_sequence=NOTE_SEQUENCE,
+        **options
     )
     
-    synth.run()
+    synth.run(realtime=args.realtime, cpu=args.cpu)
 
 
 if __name__ == "__main__":
@@ -5,10 +5,22 @@ Pure Python sine/sub-bass generation with configurable ADSR
 Uses sounddevice with system default routing (same as Spotify)
 """
 
+import argparse
+import logging
 import numpy as np
 import sounddevice as sd
 import mido
 import sys
+import time
+
+from log_setup import MESSAGE_FORMAT, setup_logging
+from realtime import add_realtime_args, enter_realtime, exit_realtime, report
+from trigger_filter import TriggerFilter
+
+logger = logging.getLogger("ddti.synth")
+
+BLOCK_SIZE = 128   # frames per audio callback (2.9 ms @ 44100 Hz)
+VOICES = 8         # notes that can sound at once (chords, release tails)
 
 
 class ADSREnvelope:
@@ -125,6 +137,80 @@ class BassSynthesizer:
         sd.play(audio, self.sample_rate)
 
 
+class SimpleBassVoice:
+    """Voice interface (note_on / note_off) for MIDINoteSequencer's integrated mode
+    
+    One output stream stays open; its callback mixes the sounding notes. note_on() only
+    publishes (buffer, gain) into a voice slot, so the MIDI and scheduler threads never wait
+    for PortAudio. Each slot has one writer: note_on() replaces the tuple in _slots, and
+    the callback alone tracks what it is playing (_playing) and where (_pos). A replaced
+    tuple starts from the beginning. Publishing is one list assignment, so no lock is needed.
+    """
+    def __init__(self, synth: BassSynthesizer, waveform: str = 'sine', note_duration: float = 0.5,
+                 blocksize: int = BLOCK_SIZE, voices: int = VOICES):
+        self.synth = synth
+        self.waveform = waveform
+        self.note_duration = note_duration
+        self._rendered = {}  # note -> full-velocity audio (see prepare)
+        self._slots = [None] * voices     # written by note_on: (audio, gain)
+        self._playing = [None] * voices   # written by the callback only
+        self._pos = [0] * voices
+        self._next = 0
+        self._scratch = np.zeros(blocksize, dtype=np.float32)
+        self.stream = sd.OutputStream(samplerate=synth.sample_rate, blocksize=blocksize, channels=1,
+                                      dtype='float32', latency='low', callback=self._callback)
+        self.stream.start()
+    
+    def prepare(self, notes):
+        """Render each note once at full velocity; a trigger then only scales the buffer"""
+        for note in set(notes):
+            self._rendered[note] = self.synth.generate_bass_note(
+                self.synth.midi_to_freq(note), self.note_duration, 127, self.waveform
+            )
+    
+    def note_on(self, note: int, velocity: int):
+        audio = self._rendered.get(note)
+        if audio is None:
+            # Not in the sequence given to prepare(): render once now
+            self.prepare([note])
+            audio = self._rendered[note]
+        i = self._next
+        self._next = (i + 1) % len(self._slots)
+        self._slots[i] = (audio, velocity / 127.0)
+    
+    def note_off(self, note: int):
+        """Notes are one-shots with a fixed duration; the ADSR release ends them"""
+        pass
+    
+    def close(self):
+        self.stream.stop()
+        self.stream.close()
+    
+    def _callback(self, outdata, frames, time_info, status):
+        out = outdata[:, 0]
+        out.fill(0.0)
+        if len(self._scratch) < frames:
+            self._scratch = np.zeros(frames, dtype=np.float32)
+        scratch = self._scratch
+        slots, playing, pos = self._slots, self._playing, self._pos
+        for i in range(len(slots)):
+            slot = slots[i]
+            if slot is None:
+                continue
+            if slot is not playing[i]:
+                playing[i] = slot
+                pos[i] = 0
+            audio, gain = slot
+            start = pos[i]
+            n = min(frames, len(audio) - start)
+            if n <= 0:
+                continue
+            np.multiply(audio[start:start + n], gain, out=scratch[:n])
+            out[:n] += scratch[:n]
+            pos[i] = start + n
+        np.clip(out, -1.0, 1.0, out=out)
+
+
 class MIDIBassSynth:
     """MIDI-triggered bass synthesizer"""
     def __init__(self, input_port: str, note_sequence: list, 
@@ -139,11 +225,13 @@ class MIDIBassSynth:
         self.input_port_name = input_port
         self.note_sequence = note_sequence
         self.current_index = 0
+        self.trigger_filter = TriggerFilter.from_config()
         self.waveform = waveform
         self.note_duration = note_duration
         
         # Initialize synthesizer
         self.synth = BassSynthesizer()
+        self.voice = SimpleBassVoice(self.synth, waveform, note_duration)
         
     def get_next_note(self) -> int:
         """Get next note in sequence"""
@@ -154,20 +242,25 @@ class MIDIBassSynth:
     def process_midi(self, msg: mido.Message):
         """Process incoming MIDI message"""
         if msg.type == 'note_on' and msg.velocity > 0:
+            # Double-fires and crosstalk must not advance the sequence
+            if not self.trigger_filter.accept(msg.note, msg.velocity, time.perf_counter_ns()):
+                return
             # Get next note in sequence
             midi_note = self.get_next_note()
-            frequency = self.synth.midi_to_freq(midi_note)
             
             # Play the note
-            self.synth.play_note(
-                frequency=frequency,
-                duration=self.note_duration,
-                velocity=msg.velocity,
-                waveform=self.waveform
-            )
+            self.voice.note_on(midi_note, msg.velocity)
             
-            print(f"🎵 {self.get_note_name(midi_note)} ({frequency:.1f} Hz) "
-                  f"vel:{msg.velocity} [Step {self.current_index}/{len(self.note_sequence)}]")
+            if logger.isEnabledFor(logging.INFO):
+                logger.info(
+                    "🎵 %s", self.get_note_name(midi_note),
+                    extra={"fields": {"hz": round(self.synth.midi_to_freq(midi_note), 1), "vel": msg.velocity,
+                                      "step": f"{self.current_index}/{len(self.note_sequence)}"}},
+                )
+        
+        elif msg.type == 'note_off' or (msg.type == 'note_on' and msg.velocity == 0):
+            # Consume the release of a rejected hit; notes are one-shots, so nothing else to do
+            self.trigger_filter.accept_off(msg.note)
     
     def get_note_name(self, note: int) -> str:
         """Get readable note name"""
@@ -176,8 +269,10 @@ class MIDIBassSynth:
         note_name = note_names[note % 12]
         return f"{note_name}{octave}"
     
-    def run(self):
-        """Main loop"""
+    def run(self, realtime: bool = False, cpu=None):
+        """Main loop (realtime: see realtime.py)"""
+        # Render the sequence now (after any ADSR override), not on the first hits
+        self.voice.prepare(self.note_sequence)
         try:
             print(f"\n🔊 Audio: System default output (same as Spotify)")
             print(f"   Using device: {sd.default.device}")
@@ -189,15 +284,19 @@ class MIDIBassSynth:
             
             # Open MIDI input
             with mido.open_input(self.input_port_name) as inport:
+                if realtime:
+                    report(enter_realtime(cpu))
                 for msg in inport:
                     self.process_midi(msg)
                     
         except KeyboardInterrupt:
             print("\n\n👋 Shutting down...")
-        except Exception as e:
-            print(f"\n❌ Error: {e}")
-            import traceback
-            traceback.print_exc()
+        except Exception:
+            logger.exception("❌ Error")
+        finally:
+            if realtime:
+                exit_realtime()
+            self.voice.close()
 
 
 def main():
@@ -210,6 +309,12 @@ def main():
         NOTE_SEQUENCE = [36, 40, 43, 48]  # C1 → E1 → G1 → C2
         INPUT_PORT = "TriggerIO MIDI Out"
     
+    parser = argparse.ArgumentParser(description="DDTI bass synthesizer (simple)")
+    add_realtime_args(parser)
+    args = parser.parse_args()
+    
+    setup_logging(env_prefix="DDTI_LOG_", text_format=MESSAGE_FORMAT)
+    
     # ===== CONFIGURATION =====
     WAVEFORM = 'sine'        # 'sine', 'triangle', or 'saw'
     NOTE_DURATION = 0.5      # Duration in seconds
@@ -243,7 +348,7 @@ def main():
     # Override ADSR if needed
     synth.synth.adsr = ADSR_CONFIG
     
-    synth.run()
+    synth.run(realtime=args.realtime, cpu=args.cpu)
 
 
 if __name__ == "__main__":
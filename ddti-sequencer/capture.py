@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+"""
+Performance capture: every trigger and every sequenced note, written to Standard MIDI Files
+
+PerformanceRecorder.record() is called on the trigger thread (and on the scheduler thread for
+held-back notes). It writes the perf_counter_ns time and the packed message into a
+preallocated ring under a short lock, with no allocation and no I/O. A background thread
+drains the ring every FLUSH_INTERVAL_SEC into the current .mid file. The file is rewritten
+atomically, so a crash loses at most one interval. A new file is started after
+ROTATE_MINUTES or ROTATE_EVENTS. If the writer falls a whole ring behind, the oldest records
+are dropped and counted.
+
+Files are type 1 SMF at 120 bpm with TICKS_PER_BEAT = 5000, which gives 100 µs per tick:
+    track 0  tempo, start time (wall clock)
+    track 1  "Triggers"   every note_on / note_off from the inputs, before the trigger filter
+    track 2  "Sequenced"  every note the sequencer played (voice and outputs)
+A trigger without a sequenced note right after it was rejected by the trigger filter or was a tie.
+
+    python3 capture.py info captures/ddti-20261019-203015.mid
+    python3 capture.py replay captures/ddti-20261019-203015.mid --port "IAC Driver Bus 2"
+
+replay sends the Triggers track to a MIDI output with the original timing. Loop it back into
+the sequencer to play a recorded show again, e.g. for latency measurements.
+"""
+
+import argparse
+import logging
+import os
+import sys
+import threading
+import time
+from array import array
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+import mido
+
+logger = logging.getLogger("ddti.capture")
+
+CAPTURE_DIR = "captures"
+RING_SIZE = 65536
+FLUSH_INTERVAL_SEC = 5.0
+ROTATE_MINUTES = 10.0
+ROTATE_EVENTS = 20000
+TICKS_PER_BEAT = 5000
+TEMPO = 500000                  # µs per beat (120 bpm): 100 µs per tick
+NS_PER_TICK = TEMPO * 1000 // TICKS_PER_BEAT
+
+TRIGGERS, SEQUENCED = 0, 1
+TRACK_NAMES = ('Triggers', 'Sequenced')
+
+
+def add_capture_args(parser: argparse.ArgumentParser):
+    """Add --capture [DIR] (default from CAPTURE / CAPTURE_DIR in config.py)"""
+    try:
+        import config
+    except ImportError:
+        config = None
+    directory = getattr(config, 'CAPTURE_DIR', CAPTURE_DIR)
+    parser.add_argument('--capture', nargs='?', const=directory, metavar='DIR',
+                        default=directory if getattr(config, 'CAPTURE', False) else None,
+                        help=f"record triggers and sequenced notes to .mid files (default dir: {directory})")
+
+
+class PerformanceRecorder:
+    """Preallocated ring of note events, drained to rotating .mid files by a writer thread"""
+    def __init__(self, directory: str = CAPTURE_DIR, ring_size: int = RING_SIZE,
+                 flush_interval: float = FLUSH_INTERVAL_SEC, rotate_minutes: float = ROTATE_MINUTES,
+                 rotate_events: int = ROTATE_EVENTS):
+        self.directory = directory
+        self._size = ring_size
+        self._times = array('q', [0] * ring_size)
+        self._events = array('L', [0] * ring_size)   # track << 24 | status << 16 | data1 << 8 | data2
+        self._lock = threading.Lock()
+        self._written = 0
+        self._read = 0
+        self.dropped = 0
+        self.files = []
+
+        self._flush_interval = flush_interval
+        self._rotate_ns = int(rotate_minutes * 60e9)
+        self._rotate_events = rotate_events
+        self._segment = []          # (t_ns, packed) of the current file
+        self._segment_path = None
+        self._segment_start_ns = 0
+        self._segment_wall = None
+
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="capture-writer", daemon=True)
+
+    def start(self):
+        """Start the writer thread (before enter_realtime(), so it keeps normal priority)"""
+        os.makedirs(self.directory, exist_ok=True)
+        self._thread.start()
+
+    def record(self, track: int, status: int, data1: int, data2: int, t_ns: int):
+        """Store one event; called from the MIDI threads, never blocks on I/O"""
+        with self._lock:
+            i = self._written % self._size
+            self._times[i] = t_ns
+            self._events[i] = (track << 24) | (status << 16) | (data1 << 8) | data2
+            self._written += 1
+
+    @property
+    def recorded(self) -> int:
+        return self._written
+
+    def close(self):
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join(timeout=10.0)
+        else:
+            self.flush()
+        self._finish_segment()
+
+    def flush(self):
+        """Move new ring entries into the current segment and rewrite its file"""
+        with self._lock:
+            end = self._written
+        start = self._read
+        if end - start > self._size:
+            self.dropped += end - start - self._size
+            start = end - self._size
+        new = [(self._times[i % self._size], self._events[i % self._size]) for i in range(start, end)]
+        with self._lock:
+            # Entries overwritten while copying are lost
+            overwritten = self._written - self._size - start
+        if overwritten > 0:
+            self.dropped += overwritten
+            new = new[overwritten:]
+        self._read = end
+        if not new:
+            return
+
+        for t_ns, packed in new:
+            if self._segment and (t_ns - self._segment_start_ns >= self._rotate_ns
+                                  or len(self._segment) >= self._rotate_events):
+                self._finish_segment()
+            if not self._segment:
+                self._begin_segment(t_ns)
+            self._segment.append((t_ns, packed))
+        self._write_segment()
+
+    def _begin_segment(self, t_ns: int):
+        wall = time.time() - (time.perf_counter_ns() - t_ns) / 1e9
+        stamp = datetime.fromtimestamp(wall)
+        name = f"ddti-{stamp:%Y%m%d-%H%M%S}.mid"
+        path = os.path.join(self.directory, name)
+        suffix = 1
+        while path in self.files or os.path.exists(path):
+            path = os.path.join(self.directory, f"{name[:-4]}-{suffix}.mid")
+            suffix += 1
+        self._segment_path = path
+        self._segment_start_ns = t_ns
+        self._segment_wall = stamp
+        self.files.append(path)
+
+    def _finish_segment(self):
+        if self._segment:
+            self._write_segment()
+            logger.info("💾 Capture written", extra={"fields": {"file": self._segment_path,
+                                                                "events": len(self._segment)}})
+        self._segment = []
+
+    def _write_segment(self):
+        midi = mido.MidiFile(type=1, ticks_per_beat=TICKS_PER_BEAT)
+        meta = mido.MidiTrack([
+            mido.MetaMessage('set_tempo', tempo=TEMPO),
+            mido.MetaMessage('text', text=f"captured {self._segment_wall.isoformat(timespec='milliseconds')}"),
+        ])
+        midi.tracks.append(meta)
+        tracks = [mido.MidiTrack([mido.MetaMessage('track_name', name=name)]) for name in TRACK_NAMES]
+        last_tick = [0] * len(tracks)
+        for t_ns, packed in self._segment:
+            track = packed >> 24
+            # Two threads record sequenced notes: never step back in time
+            tick = max((t_ns - self._segment_start_ns) // NS_PER_TICK, last_tick[track])
+            msg = mido.Message.from_bytes([(packed >> 16) & 0xFF, (packed >> 8) & 0x7F, packed & 0x7F])
+            msg.time = tick - last_tick[track]
+            last_tick[track] = tick
+            tracks[track].append(msg)
+        midi.tracks.extend(tracks)
+
+        tmp = self._segment_path + ".tmp"
+        try:
+            midi.save(tmp)
+            os.replace(tmp, self._segment_path)
+        except OSError as e:
+            logger.warning("💾 Cannot write capture %s: %s", self._segment_path, e)
+
+    def _run(self):
+        while not self._stop.wait(self._flush_interval):
+            self.flush()
+        self.flush()
+
+
+def read_capture(path: str, track: Optional[str] = None) -> List[Tuple[float, str, mido.Message]]:
+    """(seconds from the file's start, track name, message) for every note event, in time order"""
+    midi = mido.MidiFile(path)
+    events = []
+    for midi_track in midi.tracks:
+        name = midi_track.name
+        if track is not None and name.lower() != track.lower():
+            continue
+        tick = 0
+        for msg in midi_track:
+            tick += msg.time
+            if msg.type in ('note_on', 'note_off'):
+                events.append((tick * NS_PER_TICK / 1e9, name, msg))
+    events.sort(key=lambda e: e[0])
+    return events
+
+
+def _info(path: str):
+    events = read_capture(path)
+    print(f"📄 {path}")
+    for name in TRACK_NAMES:
+        hits = [msg for _, track, msg in events if track == name and msg.type == 'note_on' and msg.velocity > 0]
+        print(f"  {name:<10} {len(hits):>6} notes")
+    if events:
+        print(f"  Length     {events[-1][0]:>9.1f} s")
+
+
+def _replay(path: str, port_name: str, track: str):
+    events = read_capture(path, track)
+    if not events:
+        print(f"❌ No {track} events in {path}")
+        return 1
+    print(f"▶️  {len(events)} events from {path} → {port_name} (Ctrl-C to stop)")
+    with mido.open_output(port_name) as port:
+        start = time.perf_counter()
+        for t, _, msg in events:
+            delay = start + t - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            port.send(msg)
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Performance capture files (.mid)")
+    sub = parser.add_subparsers(dest='command', required=True)
+    info = sub.add_parser('info', help="summarize capture files")
+    info.add_argument('files', nargs='+')
+    replay = sub.add_parser('replay', help="send a capture's triggers to a MIDI output with the original timing")
+    replay.add_argument('file')
+    replay.add_argument('--port', required=True, help="MIDI output port")
+    replay.add_argument('--track', default='Triggers', choices=TRACK_NAMES)
+    args = parser.parse_args()
+
+    try:
+        if args.command == 'info':
+            for path in args.files:
+                _info(path)
+            return 0
+        return _replay(args.file, args.port, args.track)
+    except KeyboardInterrupt:
+        return 0
+    except (OSError, IOError) as e:
+        print(f"❌ {e}")
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+"""
+MIDI clock / transport follower and precise scheduler for MIDINoteSequencer
+
+ClockFollower consumes clock (24 per quarter note), start, continue, stop and songpos from
+Ableton, and tracks the song position in ticks together with a smoothed tick period. The
+sequencer uses this for two things:
+- reset on bar: the first hit of each bar plays step 1 of the sequence, so a long sequence stays
+  aligned with the song. A hit slightly ahead of the downbeat counts as the downbeat.
+- micro-quantize: a hit up to window_ms before the next grid line (e.g. 1/16) is held back and
+  played on the line. Hits further away play immediately; nothing is ever moved earlier.
+
+Held-back notes are played by PreciseScheduler. It is a timer thread that waits on a
+condition until SPIN_NS before the due time, then spins (yielding the GIL) to the exact
+nanosecond. time.sleep() alone often wakes a millisecond or more late. With --realtime the
+sequencer passes spin_ns=0: the whole process is pinned to one CPU, where the spin would
+compete with the SCHED_FIFO input threads, and the condition wait is precise enough there.
+
+Jitter benchmark (feeds a simulated 120 bpm clock, quantizes hits and measures how late
+each scheduled note fires, next to a plain time.sleep() scheduler):
+    python3 clock_sync.py
+    python3 clock_sync.py --seconds 20 --bpm 174
+"""
+
+import argparse
+import heapq
+import logging
+import math
+import random
+import sys
+import threading
+import time
+from array import array
+
+logger = logging.getLogger("ddti.clock")
+
+PPQN = 24
+SPIN_NS = 1_000_000          # spin the final 1 ms before a due time
+PERIOD_SMOOTHING = 0.1       # weight of each new clock interval in the tick period estimate
+QUANTIZE_GRIDS = {'off': 0, '1/4': 24, '1/8': 12, '1/16': 6, '1/32': 3}
+CLOCK_TYPES = frozenset(('clock', 'start', 'continue', 'stop', 'songpos'))
+
+
+def add_clock_args(parser: argparse.ArgumentParser):
+    """Add --clock / --quantize / --quantize-window-ms / --no-bar-reset (defaults from config.py)"""
+    try:
+        import config
+    except ImportError:
+        config = None
+    parser.add_argument('--clock', default=getattr(config, 'CLOCK_PORT', None), metavar='PORT',
+                        help="follow MIDI clock and transport from this input port (e.g. Ableton via IAC)")
+    parser.add_argument('--quantize', choices=tuple(QUANTIZE_GRIDS), default=getattr(config, 'QUANTIZE', 'off'),
+                        help="with --clock: hold hits back to the next grid line within the window")
+    parser.add_argument('--quantize-window-ms', type=float, default=getattr(config, 'QUANTIZE_WINDOW_MS', 20.0),
+                        help="with --clock: furthest a hit is held back, and how early a hit still counts as the downbeat (ms)")
+    parser.add_argument('--no-bar-reset', action='store_true', default=not getattr(config, 'RESET_ON_BAR', True),
+                        help="with --clock: do not restart the sequence on each downbeat")
+    parser.set_defaults(beats_per_bar=getattr(config, 'BEATS_PER_BAR', 4))
+
+
+def clock_options(args) -> dict:
+    """MIDINoteSequencer keyword arguments from add_clock_args' options"""
+    return {
+        'clock_port_name': args.clock,
+        'quantize': args.quantize,
+        'quantize_window_ms': args.quantize_window_ms,
+        'bar_reset': not args.no_bar_reset,
+        'beats_per_bar': args.beats_per_bar,
+    }
+
+
+class ClockFollower:
+    """Song position from MIDI clock; handle() may be called from a MIDI callback thread"""
+    def __init__(self, beats_per_bar: int = 4):
+        self.ticks_per_bar = PPQN * beats_per_bar
+        self.running = False
+        self.tick = 0                # ticks since song start (song position)
+        self.tick_ns = 0             # perf_counter_ns of the last clock
+        self.period_ns = 0.0         # smoothed clock interval; 0 until two clocks have arrived
+
+    def handle(self, msg, now_ns: int) -> bool:
+        """Consume a clock/transport message; False if msg is anything else"""
+        t = msg.type
+        if t == 'clock':
+            if self.tick_ns:
+                interval = now_ns - self.tick_ns
+                if self.period_ns == 0.0:
+                    self.period_ns = float(interval)
+                elif interval < 4 * self.period_ns:  # not across a pause
+                    self.period_ns += PERIOD_SMOOTHING * (interval - self.period_ns)
+            if self.running:
+                self.tick += 1
+            self.tick_ns = now_ns
+        elif t == 'start':
+            # The next clock is tick 0
+            self.tick = -1
+            self.running = True
+        elif t == 'continue':
+            # self.tick is the last clock before stop: the next clock advances it as usual
+            self.running = True
+        elif t == 'stop':
+            self.running = False
+        elif t == 'songpos':
+            # Song position pointer counts sixteenths; the next clock plays that position
+            self.tick = msg.pos * (PPQN // 4) - 1
+        else:
+            return False
+        return True
+
+    @property
+    def bpm(self) -> float:
+        return 60e9 / (self.period_ns * PPQN) if self.period_ns else 0.0
+
+    @property
+    def locked(self) -> bool:
+        """Running, with a tempo estimate"""
+        return self.running and self.period_ns > 0.0
+
+    def tick_at(self, now_ns: int) -> float:
+        """Fractional song position at now_ns, extrapolated from the last clock (at most one tick)"""
+        return self.tick + min(1.0, (now_ns - self.tick_ns) / self.period_ns)
+
+    def time_of_tick(self, tick: float) -> int:
+        return self.tick_ns + int((tick - self.tick) * self.period_ns)
+
+    def bar_at(self, now_ns: int, early_ns: int = 0) -> int:
+        """Bar number at now_ns, counting a hit up to early_ns before a downbeat as that bar"""
+        return int((self.tick_at(now_ns + early_ns)) // self.ticks_per_bar)
+
+    def quantize(self, now_ns: int, grid_ticks: int, window_ns: int) -> int:
+        """Due time for a hit at now_ns: the next grid line if it is within window_ns, else now_ns"""
+        if not grid_ticks:
+            return now_ns
+        line = math.ceil(self.tick_at(now_ns) / grid_ticks) * grid_ticks
+        due = self.time_of_tick(line)
+        return due if 0 < due - now_ns <= window_ns else now_ns
+
+
+class PreciseScheduler:
+    """Timer thread: condition wait until spin_ns before due, then spin to it"""
+    def __init__(self, stats_size: int = 4096, spin_ns: int = SPIN_NS):
+        self._spin_ns = spin_ns
+        self._heap = []
+        self._seq = 0
+        self._cond = threading.Condition()
+        self._running = True
+        # Lateness of each fired call (ns), preallocated ring
+        self._late = array('q', [0] * stats_size)
+        self._fired = 0
+        self._thread = threading.Thread(target=self._run, name="note-scheduler", daemon=True)
+        self._thread.start()
+
+    def schedule(self, due_ns: int, fn, *args):
+        with self._cond:
+            self._seq += 1
+            heapq.heappush(self._heap, (due_ns, self._seq, fn, args))
+            self._cond.notify()
+
+    def stop(self):
+        with self._cond:
+            self._running = False
+            self._cond.notify()
+        self._thread.join(timeout=1.0)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while self._running and not self._heap:
+                    self._cond.wait()
+                if not self._running:
+                    return
+                due = self._heap[0][0]
+                remaining = due - time.perf_counter_ns()
+                if remaining > self._spin_ns:
+                    # Woken early by a new (possibly sooner) entry, or by the timeout: re-check
+                    self._cond.wait((remaining - self._spin_ns) / 1e9)
+                    continue
+                _, _, fn, args = heapq.heappop(self._heap)
+            while time.perf_counter_ns() < due:
+                time.sleep(0)  # yield the GIL to the MIDI thread while spinning
+            now = time.perf_counter_ns()
+            try:
+                fn(*args)
+            except Exception:
+                logger.exception("❌ Scheduled note failed")
+            self._late[self._fired % len(self._late)] = now - due
+            self._fired += 1
+
+    def stats(self) -> dict:
+        """Lateness of the last fired calls, in ms"""
+        return _percentiles(self._late[:min(self._fired, len(self._late))])
+
+
+def _percentiles(samples) -> dict:
+    late = sorted(samples)
+    if not late:
+        return {'n': 0, 'p50': 0.0, 'p99': 0.0, 'max': 0.0}
+
+    def pct(p):
+        return late[min(len(late) - 1, int(p / 100 * len(late)))] / 1e6
+
+    return {'n': len(late), 'p50': pct(50), 'p99': pct(99), 'max': late[-1] / 1e6}
+
+
+def _sleep_scheduler_run(due_list):
+    """Baseline: one time.sleep() per due time; returns lateness samples (ns)"""
+    late = []
+    for due in due_list:
+        delay = (due - time.perf_counter_ns()) / 1e9
+        if delay > 0:
+            time.sleep(delay)
+        late.append(time.perf_counter_ns() - due)
+    return late
+
+
+def main():
+    import mido
+
+    parser = argparse.ArgumentParser(description="Clock follower / quantize jitter benchmark")
+    parser.add_argument('--seconds', type=float, default=10.0)
+    parser.add_argument('--bpm', type=float, default=120.0)
+    parser.add_argument('--quantize', choices=tuple(q for q in QUANTIZE_GRIDS if q != 'off'), default='1/16')
+    parser.add_argument('--window-ms', type=float, default=30.0)
+    args = parser.parse_args()
+
+    clock = ClockFollower()
+    scheduler = PreciseScheduler()
+    tick_ns = int(60e9 / (args.bpm * PPQN))
+    grid = QUANTIZE_GRIDS[args.quantize]
+    window_ns = int(args.window_ms * 1e6)
+    stop = threading.Event()
+
+    def feed_clock():
+        clock.handle(mido.Message('start'), time.perf_counter_ns())
+        msg = mido.Message('clock')
+        next_ns = time.perf_counter_ns()
+        while not stop.is_set():
+            next_ns += tick_ns
+            while time.perf_counter_ns() < next_ns:
+                time.sleep(0)
+            clock.handle(msg, time.perf_counter_ns())
+
+    feeder = threading.Thread(target=feed_clock, daemon=True)
+    feeder.start()
+    time.sleep(0.5)  # lock onto the tempo
+
+    rng = random.Random(1)
+    due_list = []
+    quantized = 0
+    end = time.perf_counter_ns() + int(args.seconds * 1e9)
+    while time.perf_counter_ns() < end:
+        time.sleep(rng.uniform(0.05, 0.2))
+        now = time.perf_counter_ns()
+        due = clock.quantize(now, grid, window_ns)
+        if due != now:
+            quantized += 1
+            scheduler.schedule(due, lambda: None)
+            due_list.append(due - now)
+    time.sleep(args.window_ms / 1e3 + 0.01)
+    precise = scheduler.stats()
+
+    # Same delays through time.sleep, for comparison
+    t0 = time.perf_counter_ns()
+    baseline = _percentiles(_sleep_scheduler_run([t0 + sum(due_list[:i + 1]) for i in range(len(due_list))]))
+    stop.set()
+    scheduler.stop()
+
+    print("=" * 60)
+    print(f"⏱️  Clock follower: {clock.bpm:.2f} bpm measured ({args.bpm:g} sent), "
+          f"{quantized} hits quantized to {args.quantize} within {args.window_ms:g} ms")
+    print("=" * 60)
+    print(f"{'scheduler':>16} {'n':>5} {'p50 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    for name, r in (('PreciseScheduler', precise), ('time.sleep', baseline)):
+        print(f"{name:>16} {r['n']:>5} {r['p50']:>8.3f} {r['p99']:>8.3f} {r['max']:>8.3f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
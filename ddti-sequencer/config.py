@@ -13,10 +13,40 @@ Edit the NOTE_SEQUENCE to change which notes are played
 # Your note sequence (edit this!)
 NOTE_SEQUENCE = [36, 40, 43, 48]  # C1 → E1 → G1 → C2
 
+# Pattern string instead of NOTE_SEQUENCE (midi_sequencer_fast.py / sequencer_synth.py).
+# Rests, ties, chords, velocity layers, per-step channel, ratchets, Euclidean fills; see pattern.py.
+# PATTERN = "C1 _ E1+G1 G1|C2@100 . E(3,8,C2) C1*3"
+PATTERN = None
+RATCHET_MS = 60       # time between ratchet strikes (C1*3)
+
 # MIDI Port Names
+# midi_sequencer_fast.py / sequencer_synth.py also take lists: every input drives the same sequence,
+# every output gets a copy. A name also matches a port that starts with it; ports that go away
+# are reopened when they come back (midi_ports.py).
+# INPUT_PORT = ["TriggerIO MIDI Out", "FS-1"]   # DDTI + foot controller
+# OUTPUT_PORT = ["IAC Driver Bus 1", "MicroFreak"]
 INPUT_PORT = "TriggerIO MIDI Out"   # Your DDTI
 OUTPUT_PORT = "IAC Driver Bus 1"     # Virtual MIDI port
 
+# ===== Performance Capture (capture.py) =====
+# Record every trigger and sequenced note to .mid files (same as --capture). A new file every 10 minutes.
+CAPTURE = False
+CAPTURE_DIR = "captures"
+
+# ===== Trigger Filter (trigger_filter.py) =====
+# Drops double-fires and crosstalk before they advance the sequence. 0 turns a check off.
+TRIGGER_MASK_MS = 30             # same pad again within this window is a double-fire...
+RETRIGGER_VELOCITY_RATIO = 1.5   # ...unless it is this many times louder than the last hit
+CROSSTALK_MS = 15                # other pad within this window of the last hit is crosstalk...
+CROSSTALK_VELOCITY_RATIO = 0.5   # ...if quieter than this fraction of that hit
+
+# ===== Clock Sync (clock_sync.py; midi_sequencer_fast.py / sequencer_synth.py) =====
+CLOCK_PORT = None            # e.g. "IAC Driver Bus 2" with Ableton sending MIDI clock to it; None = off
+RESET_ON_BAR = True          # first hit of each bar plays step 1 of the sequence
+BEATS_PER_BAR = 4
+QUANTIZE = 'off'             # 'off', '1/4', '1/8', '1/16', '1/32'
+QUANTIZE_WINDOW_MS = 20      # hits this close before a grid line are held back onto it
+
 # ===== Preset Sequences =====
 # Uncomment one of these to use it, or create your own!
 
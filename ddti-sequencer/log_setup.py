@@ -0,0 +1,249 @@
+"""
+Logging setup: non-blocking queue logging, repeat suppression for poll messages, structured fields.
+
+With queued logging (on by default), the root logger has a QueueHandler. A log call on the
+event loop or in a MIDI callback then only enqueues the record. A writer thread wakes every
+FLUSH_INTERVAL_SEC, formats the whole batch, writes it and flushes once. Waking once per
+record would take the GIL from the caller on every log call.
+
+Records can carry:
+- fields: extra={"fields": {...}}. Appended as key=value, or as keys with json output.
+- THROTTLE: extra=THROTTLE for messages that repeat on a timer, e.g. the MIDI device poll.
+  An identical throttled message is written at most once per REPEAT_WINDOW_SEC. The next one
+  written carries repeated=N.
+
+Settings left as None come from the environment: <prefix>LEVEL, <prefix>FORMAT (text or json)
+and <prefix>ASYNC (0 writes on the calling thread). The backend passes them from config.py;
+the ddti-sequencer scripts use the DDTI_LOG_ prefix.
+
+This file is the source of truth. ddti-sequencer/log_setup.py is a byte-identical copy,
+because the sequencer scripts run standalone. After editing, copy it over and check:
+    python3 Piano-Practice-App/backend/log_setup.py --check
+"""
+
+from __future__ import annotations
+
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import threading
+import time
+
+TEXT_FORMAT = "%(levelname)s:%(name)s:%(message)s"
+MESSAGE_FORMAT = "%(message)s"  # console scripts whose lines replaced print()
+FLUSH_INTERVAL_SEC = 0.05
+REPEAT_WINDOW_SEC = 60.0
+
+# extra= for log calls that repeat on a timer (see RepeatFilter)
+THROTTLE = {"throttle": True}
+
+
+class RepeatFilter(logging.Filter):
+    """
+    Drop a throttled record if an identical one (logger, level, message, args) was let through
+    less than window seconds ago. The next record that passes gets fields["repeated"] = N.
+    Unthrottled records always pass.
+    """
+
+    def __init__(self, window: float = REPEAT_WINDOW_SEC):
+        super().__init__()
+        self.window = window
+        self._seen: dict[tuple, list] = {}  # key -> [last emitted (monotonic), suppressed count]
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if not getattr(record, "throttle", False):
+            return True
+        try:
+            key = (record.name, record.levelno, record.msg, repr(record.args))
+        except Exception:
+            return True
+        now = time.monotonic()
+        with self._lock:
+            seen = self._seen.get(key)
+            if seen is not None and now - seen[0] < self.window:
+                seen[1] += 1
+                return False
+            suppressed = seen[1] if seen is not None else 0
+            self._seen[key] = [now, 0]
+            if len(self._seen) > 1024:  # forget stale keys (e.g. device lists that changed)
+                self._seen = {k: v for k, v in self._seen.items() if now - v[0] < self.window}
+        if suppressed:
+            record.fields = {**(getattr(record, "fields", None) or {}), "repeated": suppressed}
+        return True
+
+
+class StructuredFormatter(logging.Formatter):
+    """fmt (TEXT_FORMAT) plus ' key=value' per field, or one JSON object per line when json=True."""
+
+    def __init__(self, json_lines: bool = False, fmt: str = TEXT_FORMAT):
+        super().__init__(fmt)
+        self.json_lines = json_lines
+
+    def format(self, record: logging.LogRecord) -> str:
+        fields = getattr(record, "fields", None) or {}
+        if self.json_lines:
+            obj = {
+                "ts": round(record.created, 6),
+                "level": record.levelname,
+                "logger": record.name,
+                "msg": record.getMessage(),
+                **fields,
+            }
+            if record.exc_info:
+                obj["exc"] = self.formatException(record.exc_info)
+            return json.dumps(obj, default=str)
+        line = super().format(record)
+        if fields:
+            line += " " + " ".join(f"{k}={v}" for k, v in fields.items())
+        return line
+
+
+class _ThreadQueueHandler(logging.handlers.QueueHandler):
+    """Enqueue the record as is: the writer is a thread in this process, so formatting can happen there."""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+class _BufferedStreamHandler(logging.StreamHandler):
+    """StreamHandler that leaves flushing to the batch writer (one flush per batch, not per record)."""
+
+    def emit(self, record: logging.LogRecord) -> None:
+        try:
+            self.stream.write(self.format(record) + self.terminator)
+        except Exception:
+            self.handleError(record)
+
+
+class _BatchWriter:
+    """Drains the record queue every interval and hands each batch to the handler, then flushes once."""
+
+    def __init__(self, records: queue.SimpleQueue, handler: logging.Handler, interval: float = FLUSH_INTERVAL_SEC):
+        self._records = records
+        self._handler = handler
+        self._interval = interval
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join(timeout=2.0)
+        self._drain()
+
+    def _drain(self) -> None:
+        wrote = False
+        while True:
+            try:
+                record = self._records.get_nowait()
+            except queue.Empty:
+                break
+            self._handler.handle(record)
+            wrote = True
+        if wrote:
+            self._handler.flush()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self._interval):
+            self._drain()
+
+
+_writer: _BatchWriter | None = None
+_configured = False
+
+
+def setup_logging(
+    level: int | None = None,
+    json_lines: bool | None = None,
+    queued: bool | None = None,
+    capture: tuple[str, ...] = (),
+    env_prefix: str = "LOG_",
+    text_format: str = TEXT_FORMAT,
+) -> None:
+    """
+    Configure the root logger (call once at startup, instead of logging.basicConfig).
+    level / json_lines / queued left as None come from env_prefix + LEVEL / FORMAT / ASYNC.
+    capture: names of loggers that have their own handlers (e.g. uvicorn's). Their handlers
+    are removed so their records also go through the root logger's setup.
+    """
+    global _writer, _configured
+    if _configured:
+        return
+    _configured = True
+    if level is None:
+        level = getattr(logging, os.environ.get(env_prefix + "LEVEL", "INFO").upper(), logging.INFO)
+    if json_lines is None:
+        json_lines = os.environ.get(env_prefix + "FORMAT", "text").lower() == "json"
+    if queued is None:
+        queued = os.environ.get(env_prefix + "ASYNC", "1").lower() not in ("0", "false", "no")
+    formatter = StructuredFormatter(json_lines, text_format)
+    throttle = RepeatFilter()
+    if queued:
+        stream = _BufferedStreamHandler()
+        stream.setFormatter(formatter)
+        records: queue.SimpleQueue = queue.SimpleQueue()
+        handler: logging.Handler = _ThreadQueueHandler(records)
+        _writer = _BatchWriter(records, stream)
+        _writer.start()
+        atexit.register(stop_logging)
+    else:
+        handler = logging.StreamHandler()
+        handler.setFormatter(formatter)
+    # Filter before queuing, so suppressed records cost no queue traffic
+    handler.addFilter(throttle)
+    root = logging.getLogger()
+    root.handlers[:] = [handler]
+    root.setLevel(level)
+    for name in capture:
+        captured = logging.getLogger(name)
+        captured.handlers.clear()
+        captured.propagate = True
+
+
+def stop_logging() -> None:
+    """Write queued records and stop the writer thread (registered with atexit)."""
+    global _writer
+    if _writer is not None:
+        _writer.stop()
+        _writer = None
+
+
+# Repository paths of this file and its copies (see the module docstring)
+COPIES = ("Piano-Practice-App/backend/log_setup.py", "ddti-sequencer/log_setup.py")
+
+
+def check_copies() -> list[str]:
+    """Copies that differ from this file (relative paths); empty when all match."""
+    here = os.path.abspath(__file__)
+    root = os.path.dirname(here)
+    while not all(os.path.exists(os.path.join(root, path)) for path in COPIES):
+        parent = os.path.dirname(root)
+        if parent == root:
+            return list(COPIES)
+        root = parent
+    with open(here, "rb") as f:
+        source = f.read()
+    differing = []
+    for path in COPIES:
+        with open(os.path.join(root, path), "rb") as f:
+            if f.read() != source:
+                differing.append(path)
+    return differing
+
+
+if __name__ == "__main__":
+    if sys.argv[1:] != ["--check"]:
+        print(f"usage: {sys.argv[0]} --check")
+        sys.exit(2)
+    differing = check_copies()
+    if differing:
+        print("log_setup.py copies differ from " + COPIES[0] + ": " + ", ".join(differing))
+        sys.exit(1)
+    print("log_setup.py copies are identical")
@@ -0,0 +1,203 @@
+"""
+MIDI port management for the sequencer: several inputs merged, several outputs fanned out, reconnect by name
+
+PortManager opens every named input in callback mode. Messages from all inputs go to one
+handler, one message at a time, so the DDTI and a foot controller can drive the same
+sequencer. Every named output gets an OutputDestination, which has a bounded queue and its
+own sender thread. The trigger thread only enqueues the encoded bytes. A stalled port (a hung
+USB synth, a full IAC buffer) then drops its own oldest messages and never delays the other
+destinations or the next trigger.
+
+Ports are matched by name: first an exact match, then the first port whose name starts with
+the configured name (USB devices often come back with a different suffix). A watcher thread
+re-checks every RECONNECT_INTERVAL_SEC. It closes ports that have disappeared and reopens
+them when they come back. After a reconnect an output gets All Notes Off first, since note_offs
+may have been lost while it was gone.
+"""
+
+import logging
+import threading
+from collections import deque
+from typing import Callable, Dict, List, Optional
+
+import mido
+
+from log_setup import THROTTLE
+
+logger = logging.getLogger("ddti.ports")
+
+RECONNECT_INTERVAL_SEC = 1.0
+DEST_QUEUE_SIZE = 256
+ALL_NOTES_OFF = 123
+
+
+def resolve_port(name: str, available: List[str]) -> Optional[str]:
+    """The available port for a configured name: exact match, else the first one starting with it"""
+    if name in available:
+        return name
+    for candidate in available:
+        if candidate.startswith(name):
+            return candidate
+    return None
+
+
+class OutputDestination:
+    """One output port behind a bounded queue and its own sender thread"""
+    def __init__(self, name: str, queue_size: int = DEST_QUEUE_SIZE):
+        self.name = name
+        self.port = None
+        self.port_name = None
+        self.sent = 0
+        # Dropped messages, one counter per writer (see dropped): senders when the queue is
+        # full (rare, so they may take a lock), the sender thread while the port is gone
+        self._dropped_full = 0
+        self._dropped_full_lock = threading.Lock()
+        self._dropped_offline = 0
+        self._opened_before = False
+        self._queue = deque(maxlen=queue_size)
+        self._wake = threading.Event()
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name=f"midi-out:{name}", daemon=True)
+        self._thread.start()
+
+    @property
+    def dropped(self) -> int:
+        return self._dropped_full + self._dropped_offline
+
+    def send(self, msg: mido.Message):
+        """Enqueue msg (encoded now, so the caller may reuse it); never blocks on I/O"""
+        queue = self._queue
+        if len(queue) == queue.maxlen:
+            with self._dropped_full_lock:
+                self._dropped_full += 1  # deque drops the oldest
+        queue.append(msg.bin())
+        self._wake.set()
+
+    def open(self, port_name: str):
+        port = mido.open_output(port_name)
+        if self._opened_before:
+            # Note-offs sent while it was gone are lost: silence anything left hanging
+            for channel in range(16):
+                port.send(mido.Message('control_change', channel=channel, control=ALL_NOTES_OFF, value=0))
+        self._opened_before = True
+        self.port_name = port_name
+        self.port = port
+
+    def close(self):
+        port, self.port = self.port, None
+        if port is not None:
+            try:
+                port.close()
+            except Exception:
+                pass
+
+    def stop(self):
+        self._running = False
+        self._wake.set()
+        self._thread.join(timeout=1.0)
+        self.close()
+
+    def _run(self):
+        queue = self._queue
+        while self._running:
+            self._wake.wait()
+            self._wake.clear()
+            while queue:
+                data = queue.popleft()
+                port = self.port
+                if port is None:
+                    self._dropped_offline += 1
+                    continue
+                try:
+                    port.send(mido.Message.from_bytes(data))
+                    self.sent += 1
+                except Exception as e:
+                    logger.warning("🔌 Output %s failed (%s), will reconnect", self.name, e)
+                    self.close()
+
+
+class PortManager:
+    """Named inputs (name -> callback) and outputs, kept open and reconnected by a watcher thread"""
+    def __init__(self, inputs: Dict[str, Callable], outputs: List[str],
+                 interval: float = RECONNECT_INTERVAL_SEC):
+        self._callbacks = dict(inputs)
+        self._inputs = {name: None for name in inputs}      # configured name -> open port
+        self.outputs = [OutputDestination(name) for name in outputs]
+        self._interval = interval
+        self._stop = threading.Event()
+        self._watcher = threading.Thread(target=self._watch, name="midi-ports", daemon=True)
+
+    def start(self):
+        """Open what is available now, then keep reconciling in the background"""
+        self.reconcile()
+        self._watcher.start()
+
+    def send(self, msg: mido.Message):
+        for dest in self.outputs:
+            dest.send(msg)
+
+    @property
+    def connected_inputs(self) -> List[str]:
+        return [port.name for port in self._inputs.values() if port is not None]
+
+    @property
+    def connected_outputs(self) -> List[str]:
+        return [dest.port_name for dest in self.outputs if dest.port is not None]
+
+    def stats(self) -> dict:
+        return {dest.name: {'sent': dest.sent, 'dropped': dest.dropped, 'connected': dest.port is not None}
+                for dest in self.outputs}
+
+    def close(self):
+        self._stop.set()
+        if self._watcher.is_alive():
+            self._watcher.join(timeout=2.0)
+        for name, port in self._inputs.items():
+            if port is not None:
+                port.close()
+                self._inputs[name] = None
+        for dest in self.outputs:
+            dest.stop()
+
+    def reconcile(self):
+        try:
+            available_in = mido.get_input_names()
+            available_out = mido.get_output_names() if self.outputs else []
+        except Exception as e:
+            logger.warning("🔌 Cannot list MIDI ports: %s", e, extra=THROTTLE)
+            return
+
+        for name, port in self._inputs.items():
+            if port is not None and port.name not in available_in:
+                logger.warning("🔌 Input lost: %s", port.name)
+                port.close()
+                self._inputs[name] = port = None
+            if port is None:
+                actual = resolve_port(name, available_in)
+                if actual is None:
+                    logger.warning("🔌 Waiting for input: %s", name, extra=THROTTLE)
+                    continue
+                try:
+                    self._inputs[name] = mido.open_input(actual, callback=self._callbacks[name])
+                    logger.info("🔌 Input connected: %s", actual)
+                except Exception as e:
+                    logger.warning("🔌 Cannot open input %s: %s", actual, e, extra=THROTTLE)
+
+        for dest in self.outputs:
+            if dest.port is not None and dest.port_name not in available_out:
+                logger.warning("🔌 Output lost: %s", dest.port_name)
+                dest.close()
+            if dest.port is None:
+                actual = resolve_port(dest.name, available_out)
+                if actual is None:
+                    logger.warning("🔌 Waiting for output: %s", dest.name, extra=THROTTLE)
+                    continue
+                try:
+                    dest.open(actual)
+                    logger.info("🔌 Output connected: %s", actual)
+                except Exception as e:
+                    logger.warning("🔌 Cannot open output %s: %s", actual, e, extra=THROTTLE)
+
+    def _watch(self):
+        while not self._stop.wait(self._interval):
+            self.reconcile()
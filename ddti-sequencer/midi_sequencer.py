@@ -4,11 +4,17 @@ DDTI to Ableton MIDI Note Sequencer
 Converts drum triggers into a cycling sequence of bass notes
 """
 
+import logging
 import mido
 import time
 import sys
 from typing import List
 
+from log_setup import MESSAGE_FORMAT, setup_logging
+from trigger_filter import TriggerFilter
+
+logger = logging.getLogger("ddti.sequencer")
+
 
 class MIDINoteSequencer:
     def __init__(self, sequence: List[int], input_port_name: str, output_port_name: str):
@@ -26,6 +32,7 @@ class MIDINoteSequencer:
         self.output_port_name = output_port_name
         self.input_port = None
         self.output_port = None
+        self.trigger_filter = TriggerFilter.from_config()
         
     def connect(self):
         """Connect to MIDI ports"""
@@ -75,6 +82,11 @@ class MIDINoteSequencer:
         """Process incoming MIDI message and send sequenced note"""
         # Only process note_on messages with velocity > 0
         if msg.type == 'note_on' and msg.velocity > 0:
+            # Double-fires and crosstalk must not advance the sequence
+            if not self.trigger_filter.accept(msg.note, msg.velocity, time.perf_counter_ns()):
+                logger.info("🚫 Trigger %s (vel: %s) filtered", msg.note, msg.velocity,
+                            extra={"fields": self.trigger_filter.stats()})
+                return
             next_note = self.get_next_note()
             
             # Create new message with sequenced note, preserving velocity and channel
@@ -87,11 +99,18 @@ class MIDINoteSequencer:
             
             self.output_port.send(new_msg)
             
-            # Log the conversion
-            print(f"🥁 Trigger {msg.note} (vel: {msg.velocity}) → 🎹 Note {next_note} ({self.get_note_name(next_note)}) [Step {self.current_index}/{len(self.sequence)}]")
+            # Log the conversion (queued: the writer thread does the console I/O, not this loop)
+            if logger.isEnabledFor(logging.INFO):
+                logger.info(
+                    "🥁 → 🎹 %s", self.get_note_name(next_note),
+                    extra={"fields": {"trigger": msg.note, "vel": msg.velocity, "note": next_note,
+                                      "step": f"{self.current_index}/{len(self.sequence)}"}},
+                )
         
         # Pass through note_off messages with the last sent note
         elif msg.type == 'note_off' or (msg.type == 'note_on' and msg.velocity == 0):
+            if not self.trigger_filter.accept_off(msg.note):
+                return
             # Send note_off for the previous note in sequence
             prev_index = (self.current_index - 1) % len(self.sequence)
             prev_note = self.sequence[prev_index]
@@ -144,6 +163,7 @@ def main():
     INPUT_PORT = "TriggerIO MIDI Out"  # Your DDTI
     OUTPUT_PORT = "IAC Driver Bus 1"   # Virtual MIDI port (we'll create this)
     
+    setup_logging(env_prefix="DDTI_LOG_", text_format=MESSAGE_FORMAT)
     print("=" * 60)
     print("🎵 DDTI MIDI Note Sequencer")
     print("=" * 60)
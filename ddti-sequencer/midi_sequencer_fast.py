@@ -2,84 +2,281 @@
 """
 DDTI to Ableton MIDI Note Sequencer - LOW LATENCY VERSION
 Minimal logging for maximum performance
+
+MIDINoteSequencer can also drive a bass voice directly (see sequencer_synth.py):
+any object with note_on(note, velocity) / note_off(note). The output port is then optional
+and only mirrors the notes (e.g. to Ableton).
+
+The outgoing note messages are built once per sequence note and reused, so a trigger allocates
+nothing that the cyclic GC has to track (see realtime.py / --realtime).
+
+Inputs and outputs are lists of port names (see midi_ports.py). All inputs feed the same
+sequence, each output has its own queue and sender thread, and ports that disappear (USB
+re-enumeration) are reopened by name.
+
+The sequence can be a flat note list (NOTE_SEQUENCE) or a pattern string (PATTERN / --pattern,
+see pattern.py). Both are compiled to step tables before the first hit.
+
+With --clock PORT the sequencer follows Ableton's MIDI clock (see clock_sync.py). The sequence
+restarts on each bar, and --quantize holds hits back to the next grid line.
+
+With --capture the incoming triggers and the sequenced notes are recorded to .mid files by a
+background writer (see capture.py).
 """
 
+import argparse
+import logging
 import mido
 import sys
-from typing import List
+import threading
+import time
+from typing import List, Optional, Union
+
+from capture import SEQUENCED, TRIGGERS, PerformanceRecorder, add_capture_args
+from clock_sync import CLOCK_TYPES, QUANTIZE_GRIDS, SPIN_NS, ClockFollower, PreciseScheduler, add_clock_args, clock_options
+from log_setup import MESSAGE_FORMAT, setup_logging
+from midi_ports import PortManager
+from pattern import NOTE, RATCHET_MS, TIE, add_pattern_arg, compile_pattern
+from realtime import add_realtime_args, enter_realtime, exit_realtime, report
+from trigger_filter import TriggerFilter
+
+logger = logging.getLogger("ddti.sequencer")
 
 
 class MIDINoteSequencer:
-    def __init__(self, sequence: List[int], input_port_name: str, output_port_name: str):
+    def __init__(self, sequence: Union[List[int], str], input_port_name: Union[str, List[str]],
+                 output_port_name: Union[str, List[str], None],
+                 voice=None, clock_port_name: Optional[str] = None, quantize: str = 'off',
+                 quantize_window_ms: float = 20.0, bar_reset: bool = True, beats_per_bar: int = 4,
+                 ratchet_ms: float = RATCHET_MS, capture_dir: Optional[str] = None):
         self.sequence = sequence
+        self.pattern = compile_pattern(sequence)
         self.current_index = 0
-        self.input_port_name = input_port_name
-        self.output_port_name = output_port_name
-        self.input_port = None
-        self.output_port = None
+        self._sounding = ()        # chord of the last struck step
+        self._sounding_channel = 0  # trigger channel it was struck with
+        self._ratchet_ns = int(ratchet_ms * 1e6)
+        self.input_port_names = _port_names(input_port_name)
+        self.output_port_names = _port_names(output_port_name)
+        self.ports = None
+        self._input_lock = threading.Lock()  # inputs call back on their own threads; one message at a time
+        self._stop = threading.Event()
+        self.voice = voice
+        self.trigger_filter = TriggerFilter.from_config()
+        self._debug = False
+        # Prebuilt messages: velocity/channel are set on send (ports encode the message immediately)
+        self._note_on_msgs = {n: mido.Message('note_on', note=n) for n in self.pattern.notes()}
+        self._note_off_msgs = {n: mido.Message('note_off', note=n, velocity=0) for n in self.pattern.notes()}
+        # Clock sync (clock_sync.py): off unless a clock port is given
+        self.clock_port_name = clock_port_name
+        self.clock = ClockFollower(beats_per_bar) if clock_port_name else None
+        self.bar_reset = bar_reset
+        self._grid = QUANTIZE_GRIDS[quantize]
+        self._window_ns = int(quantize_window_ms * 1e6)
+        self.scheduler = None
+        self._realtime = False   # set by run(); no scheduler spin on the pinned CPU
+        self._bar = None
+        self._held_until_ns = 0  # due time of the last held-back or ratcheted strike
+        self._pending = 0        # scheduled strikes that have not fired yet
+        # Input and scheduler threads both strike and release: _sounding, _pending and the
+        # prebuilt messages are only touched with this held
+        self._play_lock = threading.RLock()
+        # Performance capture (capture.py): off unless a directory is given
+        self.recorder = PerformanceRecorder(capture_dir) if capture_dir else None
         
     def connect(self):
-        """Connect to MIDI ports"""
+        """Open the MIDI ports (missing ones are opened when they appear, see midi_ports.py)"""
+        if (self.clock is not None and self._grid) or max(self.pattern.ratchets) > 1:
+            self.scheduler = PreciseScheduler(spin_ns=0 if self._realtime else SPIN_NS)
+        # Per-trigger lines only with DDTI_LOG_LEVEL=DEBUG (checked once, not per message)
+        self._debug = logger.isEnabledFor(logging.DEBUG)
+        
+        inputs = {name: self._on_input for name in self.input_port_names}
+        if self.clock is not None and self.clock_port_name not in inputs:
+            # Clock on its own port: no need to wait for the trigger lock
+            inputs[self.clock_port_name] = self._on_clock
         try:
-            self.input_port = mido.open_input(self.input_port_name)
-            self.output_port = mido.open_output(self.output_port_name)
-            
-            print(f"✅ Connected: {self.input_port_name} → {self.output_port_name}")
-            print(f"📝 Sequence: {self.sequence}")
-            print("🎵 Running in LOW LATENCY mode (minimal logging)\n")
-            
+            self.ports = PortManager(inputs, self.output_port_names)
+            self.ports.start()
         except Exception as e:
             print(f"❌ Error: {e}")
             sys.exit(1)
+        
+        targets = (["synth"] if self.voice is not None else []) + self.output_port_names
+        print(f"✅ Inputs: {', '.join(self.input_port_names)} → {' + '.join(targets)}")
+        if self.clock is not None:
+            print(f"🕐 Following clock: {self.clock_port_name}")
+        print(f"📝 Sequence: {self.pattern.source} ({len(self.pattern)} steps)")
+        print("🎵 Running in LOW LATENCY mode (minimal logging)\n")
+    
+    def _on_input(self, msg: mido.Message):
+        with self._input_lock:
+            self.process_message(msg)
     
-    def get_next_note(self) -> int:
-        """Get the next note in the sequence and advance the counter"""
-        note = self.sequence[self.current_index]
-        self.current_index = (self.current_index + 1) % len(self.sequence)
-        return note
+    def _on_clock(self, msg: mido.Message):
+        self.clock.handle(msg, time.perf_counter_ns())
     
     def process_message(self, msg: mido.Message):
         """Process incoming MIDI message and send sequenced note - OPTIMIZED"""
+        now = time.perf_counter_ns()
+        # Clock and transport (when clock and triggers share a port)
+        if msg.type in CLOCK_TYPES:
+            if self.clock is not None:
+                self.clock.handle(msg, now)
+            return
+        
         # Only process note_on messages with velocity > 0
         if msg.type == 'note_on' and msg.velocity > 0:
-            next_note = self.get_next_note()
+            if self.recorder is not None:
+                self.recorder.record(TRIGGERS, 0x90 | msg.channel, msg.note, msg.velocity, now)
+            # Double-fires and crosstalk must not advance the sequence
+            if not self.trigger_filter.accept(msg.note, msg.velocity, now):
+                return
+            due = now
+            clock = self.clock
+            if clock is not None and clock.locked:
+                if self.bar_reset:
+                    # A hit just ahead of the downbeat counts as the downbeat
+                    bar = clock.bar_at(now, self._window_ns)
+                    if bar != self._bar:
+                        self._bar = bar
+                        self.current_index = 0
+                if self.scheduler is not None:
+                    due = clock.quantize(now, self._grid, self._window_ns)
+            # Advance one step and read its tables (see pattern.py)
+            pattern = self.pattern
+            step = self.current_index
+            self.current_index = (step + 1) % len(pattern.kinds)
+            kind = pattern.kinds[step]
+            if kind == TIE:
+                return
+            chord = pattern.layers[step][pattern.vel_index[step][msg.velocity]] if kind == NOTE else ()
             
-            # Create and send message immediately (no logging for speed)
-            new_msg = mido.Message(
-                'note_on',
-                note=next_note,
-                velocity=msg.velocity,
-                channel=msg.channel
-            )
-            self.output_port.send(new_msg)
+            ratchet = pattern.ratchets[step]
+            with self._play_lock:
+                if due > now or ratchet > 1:
+                    for strike in range(ratchet):
+                        at = due + strike * self._ratchet_ns
+                        if at > now:
+                            self._schedule_strike(at, chord, msg.velocity, msg.channel)
+                        else:
+                            self._strike(chord, msg.velocity, msg.channel)
+                    self._held_until_ns = due + (ratchet - 1) * self._ratchet_ns
+                elif self._pending:
+                    # An earlier strike has not fired yet: keep the order
+                    self._schedule_strike(self._held_until_ns, chord, msg.velocity, msg.channel)
+                else:
+                    self._strike(chord, msg.velocity, msg.channel)
+            if self._debug:
+                logger.debug("trigger", extra={"fields": {"in": msg.note, "vel": msg.velocity, "step": step + 1,
+                                                          "notes": [n for n, _ in chord], "held_ms": (due - now) / 1e6}})
         
         # Pass through note_off messages
         elif msg.type == 'note_off' or (msg.type == 'note_on' and msg.velocity == 0):
-            prev_index = (self.current_index - 1) % len(self.sequence)
-            prev_note = self.sequence[prev_index]
-            
-            new_msg = mido.Message(
-                'note_off',
-                note=prev_note,
-                velocity=0,
-                channel=msg.channel
-            )
-            self.output_port.send(new_msg)
+            if self.recorder is not None:
+                status = 0x80 if msg.type == 'note_off' else 0x90
+                self.recorder.record(TRIGGERS, status | msg.channel, msg.note, msg.velocity, now)
+            if not self.trigger_filter.accept_off(msg.note):
+                return
+            # A tie next keeps the note sounding through the next hit
+            if self.pattern.kinds[self.current_index] == TIE:
+                return
+            with self._play_lock:
+                if self._pending:
+                    # Its strike has not fired yet (held back, or ratcheting), even if its due
+                    # time has passed: release after it. Same due time, later in the queue.
+                    self.scheduler.schedule(self._held_until_ns, self._release)
+                else:
+                    self._release()
+    
+    def _schedule_strike(self, due_ns: int, chord: tuple, velocity: int, channel: int):
+        self._pending += 1
+        self.scheduler.schedule(due_ns, self._scheduled_strike, chord, velocity, channel)
+    
+    def _scheduled_strike(self, chord: tuple, velocity: int, channel: int):
+        with self._play_lock:
+            self._pending -= 1
+            self._strike(chord, velocity, channel)
     
-    def run(self):
-        """Main loop - listen and process messages"""
+    def _strike(self, chord: tuple, velocity: int, channel: int):
+        """End the sounding chord, then play chord (empty for a rest)"""
+        with self._play_lock:
+            self._release()
+            for note, ch in chord:
+                self._note_on(note, velocity, ch if ch >= 0 else channel)
+            self._sounding = chord
+            self._sounding_channel = channel
+    
+    def _release(self):
+        with self._play_lock:
+            channel = self._sounding_channel
+            for note, ch in self._sounding:
+                self._note_off(note, ch if ch >= 0 else channel)
+            self._sounding = ()
+    
+    def _note_on(self, note: int, velocity: int, channel: int):
+        # Called with _play_lock held (from _strike)
+        # Play first: the voice is the audio path, the port only mirrors
+        if self.voice is not None:
+            self.voice.note_on(note, velocity)
+        if self.recorder is not None:
+            self.recorder.record(SEQUENCED, 0x90 | channel, note, velocity, time.perf_counter_ns())
+        
+        # Queue for every output (no logging for speed)
+        if self.output_port_names:
+            new_msg = self._note_on_msgs[note]
+            new_msg.velocity = velocity
+            new_msg.channel = channel
+            self.ports.send(new_msg)
+    
+    def _note_off(self, note: int, channel: int):
+        if self.voice is not None:
+            self.voice.note_off(note)
+        if self.recorder is not None:
+            self.recorder.record(SEQUENCED, 0x80 | channel, note, 0, time.perf_counter_ns())
+        if self.output_port_names:
+            new_msg = self._note_off_msgs[note]
+            new_msg.channel = channel
+            self.ports.send(new_msg)
+    
+    def run(self, realtime: bool = False, cpu: Optional[int] = None):
+        """Open the ports and process messages until Ctrl-C or stop() (realtime: see realtime.py)"""
+        if self.recorder is not None:
+            # Before enter_realtime(): the file writer keeps normal priority
+            self.recorder.start()
+        self._realtime = realtime
+        if realtime:
+            # Before the ports open, so their callback and sender threads inherit priority and CPU
+            report(enter_realtime(cpu))
         self.connect()
         
         try:
-            for msg in self.input_port:
-                self.process_message(msg)
+            # Messages are handled on the input ports' callback threads
+            while not self._stop.wait(0.5):
+                pass
         except KeyboardInterrupt:
             print("\n\n👋 Shutting down...")
         finally:
-            if self.input_port:
-                self.input_port.close()
-            if self.output_port:
-                self.output_port.close()
+            if self.ports is not None:
+                self.ports.close()
+            if self.scheduler is not None:
+                self.scheduler.stop()
+            if self.voice is not None and hasattr(self.voice, 'close'):
+                self.voice.close()
+            if self.recorder is not None:
+                self.recorder.close()
+                print(f"💾 Captured {self.recorder.recorded} events to {len(self.recorder.files)} file(s) "
+                      f"in {self.recorder.directory} ({self.recorder.dropped} dropped)")
+            if realtime:
+                exit_realtime()
+    
+    def stop(self):
+        self._stop.set()
+
+
+def _port_names(names: Union[str, List[str], None]) -> List[str]:
+    if not names:
+        return []
+    return [names] if isinstance(names, str) else list(names)
 
 
 def main():
@@ -95,17 +292,32 @@ def main():
         INPUT_PORT = "TriggerIO MIDI Out"
         OUTPUT_PORT = "IAC Driver Bus 1"
     
+    parser = argparse.ArgumentParser(description="DDTI MIDI sequencer (low latency)")
+    parser.add_argument('--input', action='append', metavar='PORT',
+                        help=f"MIDI input, repeat to merge several (default: {INPUT_PORT})")
+    parser.add_argument('--output', action='append', metavar='PORT',
+                        help=f"MIDI output, repeat to fan out to several (default: {OUTPUT_PORT})")
+    add_pattern_arg(parser)
+    add_realtime_args(parser)
+    add_clock_args(parser)
+    add_capture_args(parser)
+    args = parser.parse_args()
+    
+    setup_logging(env_prefix="DDTI_LOG_", text_format=MESSAGE_FORMAT)
     print("=" * 60)
     print("⚡ DDTI MIDI Sequencer - LOW LATENCY MODE")
     print("=" * 60)
     
     sequencer = MIDINoteSequencer(
-        sequence=NOTE_SEQUENCE,
-        input_port_name=INPUT_PORT,
-        output_port_name=OUTPUT_PORT
+        sequence=args.pattern or NOTE_SEQUENCE,
+        input_port_name=args.input or INPUT_PORT,
+        output_port_name=args.output or OUTPUT_PORT,
+        ratchet_ms=args.ratchet_ms,
+        capture_dir=args.capture,
+        **clock_options(args)
     )
     
-    sequencer.run()
+    sequencer.run(realtime=args.realtime, cpu=args.cpu)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""
+Pattern language for the sequencer, compiled ahead of time into flat step tables
+
+A pattern is a string of whitespace-separated steps. Each trigger hit plays the next step.
+
+    C1  36  Eb1  F#2     note by name (C1 = 36, as in config.py and Ableton) or number
+    .                    rest: the hit plays nothing (and ends the sounding note)
+    _                    tie: the hit plays nothing and the previous note keeps sounding
+    C1+E1+G1             chord
+    C1|G1@100            velocity layers: C1, or G1 when the hit's velocity is 100 or more
+    C1:10                channel 1-16 for this step (default: the trigger's channel)
+    C1*3                 ratchet: 3 strikes, RATCHET_MS apart
+    E(3,8,C1)            Euclidean fill: 3 hits spread over 8 steps, rests between
+    E(3,8,2,C1)          ... rotated by 2 steps
+
+Suffixes combine in this order: layers, then :channel, then *ratchet, e.g. C1+G1|C2@110:2*2.
+
+compile_pattern() does all parsing up front. Per step, the result holds a kind (note, rest or
+tie), a 128-entry velocity -> layer table, a ratchet count, and the layers as tuples of
+(note, channel) with channel -1 meaning the trigger's channel. A hit then costs one index
+increment and table reads, however elaborate the pattern.
+
+    python3 pattern.py "E(3,8,C1) C1+E1+G1 _ G1|C2@100*2"
+"""
+
+import argparse
+import re
+import sys
+from typing import List, NamedTuple, Sequence, Union
+
+NOTE, REST, TIE = 0, 1, 2
+KIND_NAMES = ('note', 'rest', 'tie')
+RATCHET_MS = 60.0
+MAX_RATCHET = 16
+
+_NOTE_NAMES = {'C': 0, 'D': 2, 'E': 4, 'F': 5, 'G': 7, 'A': 9, 'B': 11}
+_NOTE_RE = re.compile(r'^([A-Ga-g])([#b]?)(-?\d)$')
+_EUCLID_RE = re.compile(r'^E\((\d+),(\d+)(?:,(\d+))?,(.+)\)$')
+_ALL_VELOCITIES = bytes(128)
+
+
+class PatternError(ValueError):
+    pass
+
+
+class CompiledPattern(NamedTuple):
+    kinds: bytes                 # per step: NOTE / REST / TIE
+    vel_index: List[bytes]       # per step: velocity (0-127) -> layer index
+    layers: List[tuple]          # per step: tuple of chords; chord = tuple of (note, channel or -1)
+    ratchets: bytes              # per step: strikes per hit (1 = normal)
+    source: str
+
+    def __len__(self):
+        return len(self.kinds)
+
+    def notes(self) -> set:
+        """Every note the pattern can play (for prebuilding messages)"""
+        return {n for step in self.layers for chord in step for n, _ in chord}
+
+    def describe(self) -> List[str]:
+        lines = []
+        for i, kind in enumerate(self.kinds):
+            if kind != NOTE:
+                lines.append(f"{i + 1:>3}: {KIND_NAMES[kind]}")
+                continue
+            layers = []
+            for j, chord in enumerate(self.layers[i]):
+                low = self.vel_index[i].index(j)
+                notes = '+'.join(note_name(n) + (f":{ch + 1}" if ch >= 0 else '') for n, ch in chord)
+                layers.append(f"{notes} (vel {low}+)" if len(self.layers[i]) > 1 else notes)
+            ratchet = f" x{self.ratchets[i]}" if self.ratchets[i] > 1 else ''
+            lines.append(f"{i + 1:>3}: {' | '.join(layers)}{ratchet}")
+        return lines
+
+
+def note_name(note: int) -> str:
+    names = ['C', 'C#', 'D', 'D#', 'E', 'F', 'F#', 'G', 'G#', 'A', 'A#', 'B']
+    return f"{names[note % 12]}{note // 12 - 2}"
+
+
+def parse_note(text: str) -> int:
+    if text.isdigit():
+        note = int(text)
+    else:
+        m = _NOTE_RE.match(text)
+        if not m:
+            raise PatternError(f"not a note: {text!r}")
+        letter, accidental, octave = m.groups()
+        note = (int(octave) + 2) * 12 + _NOTE_NAMES[letter.upper()] + {'#': 1, 'b': -1, '': 0}[accidental]
+    if not 0 <= note <= 127:
+        raise PatternError(f"note out of range 0-127: {text!r}")
+    return note
+
+
+def euclid(hits: int, steps: int, rotate: int = 0) -> List[bool]:
+    """hits spread as evenly as possible over steps (same rhythms as Bjorklund, up to rotation)"""
+    if not 0 < steps or not 0 <= hits <= steps:
+        raise PatternError(f"Euclidean fill needs 0 <= hits <= steps: E({hits},{steps})")
+    return [((i + rotate) * hits) % steps < hits for i in range(steps)]
+
+
+def _compile_step(token: str):
+    """One note step -> (layers, vel_index, ratchet)"""
+    body, ratchet = token, 1
+    if '*' in body:
+        body, count = body.rsplit('*', 1)
+        if not count.isdigit() or not 1 <= int(count) <= MAX_RATCHET:
+            raise PatternError(f"ratchet must be 1-{MAX_RATCHET}: {token!r}")
+        ratchet = int(count)
+    channel = -1
+    if ':' in body:
+        body, ch = body.rsplit(':', 1)
+        if not ch.isdigit() or not 1 <= int(ch) <= 16:
+            raise PatternError(f"channel must be 1-16: {token!r}")
+        channel = int(ch) - 1
+
+    layers = []  # (min velocity, chord)
+    for layer in body.split('|'):
+        chord_text, min_vel = layer, 0
+        if '@' in layer:
+            chord_text, vel = layer.rsplit('@', 1)
+            if not vel.isdigit() or not 1 <= int(vel) <= 127:
+                raise PatternError(f"layer velocity must be 1-127: {token!r}")
+            min_vel = int(vel)
+        chord = tuple((parse_note(n), channel) for n in chord_text.split('+'))
+        layers.append((min_vel, chord))
+    layers.sort(key=lambda layer: layer[0])
+    layers[0] = (0, layers[0][1])  # the quietest layer covers everything below the next one
+
+    table = bytearray(128)
+    for index, (min_vel, _) in enumerate(layers):
+        table[min_vel:] = bytes([index]) * (128 - min_vel)
+    return tuple(chord for _, chord in layers), bytes(table), ratchet
+
+
+def _expand(tokens: Sequence[str]) -> List[str]:
+    out = []
+    for token in tokens:
+        m = _EUCLID_RE.match(token)
+        if m:
+            hits, steps, rotate, step = m.groups()
+            out.extend(step if hit else '.' for hit in euclid(int(hits), int(steps), int(rotate or 0)))
+        else:
+            out.append(token)
+    return out
+
+
+def compile_pattern(pattern: Union[str, Sequence[int], CompiledPattern]) -> CompiledPattern:
+    """Compile a pattern string, or a flat list of note numbers (NOTE_SEQUENCE), into step tables"""
+    if isinstance(pattern, CompiledPattern):
+        return pattern
+    if isinstance(pattern, str):
+        source = pattern
+        tokens = _expand(pattern.split())
+    else:
+        source = ' '.join(str(n) for n in pattern)
+        tokens = [str(n) for n in pattern]
+    if not tokens:
+        raise PatternError("empty pattern")
+
+    kinds, vel_index, layers, ratchets = bytearray(), [], [], bytearray()
+    for token in tokens:
+        if token in ('.', '_'):
+            kinds.append(REST if token == '.' else TIE)
+            vel_index.append(_ALL_VELOCITIES)
+            layers.append(())
+            ratchets.append(1)
+            continue
+        step_layers, table, ratchet = _compile_step(token)
+        kinds.append(NOTE)
+        vel_index.append(table)
+        layers.append(step_layers)
+        ratchets.append(ratchet)
+    return CompiledPattern(bytes(kinds), vel_index, layers, bytes(ratchets), source)
+
+
+def _pattern_arg(text: str) -> CompiledPattern:
+    try:
+        return compile_pattern(text)
+    except PatternError as e:
+        raise argparse.ArgumentTypeError(str(e))
+
+
+def add_pattern_arg(parser: argparse.ArgumentParser):
+    """Add --pattern / --ratchet-ms (defaults: PATTERN / RATCHET_MS in config.py); compiled while parsing"""
+    try:
+        import config
+    except ImportError:
+        config = None
+    parser.add_argument('--pattern', type=_pattern_arg, default=getattr(config, 'PATTERN', None),
+                        help="pattern string instead of NOTE_SEQUENCE (see pattern.py)")
+    parser.add_argument('--ratchet-ms', type=float, default=getattr(config, 'RATCHET_MS', RATCHET_MS),
+                        help="time between ratchet strikes (ms)")
+
+
+def main():
+    if len(sys.argv) < 2:
+        print(__doc__)
+        return 1
+    try:
+        compiled = compile_pattern(' '.join(sys.argv[1:]))
+    except PatternError as e:
+        print(f"❌ {e}")
+        return 1
+    print(f"📝 {len(compiled)} steps")
+    for line in compiled.describe():
+        print(line)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Real-time mode for the sequencer and synth scripts (--realtime)
+
+A cyclic GC pass in the middle of a drum fill plays as a late note. enter_realtime() is
+called once the voices and prebuilt messages are built, before the MIDI loop starts:
+- gc.collect() + gc.freeze(): everything allocated so far is moved out of the GC's reach
+- gc.disable(): no cyclic collection while playing (reference counting still frees memory)
+- SCHED_FIFO where permitted (Linux, root or CAP_SYS_NICE), otherwise a lower nice value
+- pins the process to one CPU where supported (Linux)
+
+Each step that is not permitted or not supported is skipped and reported; none of them is
+fatal. Scheduling and affinity apply to the calling thread and to threads it starts
+afterwards. So MIDINoteSequencer.run() calls it BEFORE opening its ports: the port callback
+threads, the output sender threads, the port watcher and the PreciseScheduler then inherit
+SCHED_FIFO and the CPU. These objects are created after gc.freeze() with cyclic collection
+off; that is fine because they live until exit and reference counting frees the rest. The
+bass synth scripts call it after opening their input port and simply iterate it on the
+calling thread. The log writer and the capture writer (capture.py) are started before
+enter_realtime() on purpose and keep normal priority.
+
+Jitter test (compares a timed loop before and after enter_realtime, with garbage being made):
+    python3 realtime.py
+    python3 realtime.py --seconds 10 --cpu 1
+"""
+
+import argparse
+import gc
+import os
+import sys
+import time
+
+FIFO_PRIORITY = 10   # low end of SCHED_FIFO: above every normal process, below kernel/audio threads
+NICE_INCREMENT = -10
+
+
+def add_realtime_args(parser: argparse.ArgumentParser):
+    """Add --realtime / --cpu to an entry point's argument parser"""
+    parser.add_argument('--realtime', action='store_true',
+                        help="freeze + disable the GC, request SCHED_FIFO or higher priority, pin to a CPU")
+    parser.add_argument('--cpu', type=int, default=None,
+                        help="CPU to pin to with --realtime (default: the last CPU)")
+
+
+def enter_realtime(cpu=None) -> dict:
+    """Switch the process into real-time mode; returns what was achieved (see report())"""
+    achieved = {}
+
+    gc.collect()
+    gc.freeze()
+    gc.disable()
+    achieved['gc'] = f"frozen ({gc.get_freeze_count()} objects), cyclic collection off"
+
+    achieved['scheduler'] = _raise_priority()
+    achieved['cpu'] = _pin_cpu(cpu)
+    return achieved
+
+
+def exit_realtime():
+    """Turn the GC back on (scheduling is left as is; the process is about to exit)"""
+    gc.unfreeze()
+    gc.enable()
+
+
+def _raise_priority() -> str:
+    if hasattr(os, 'sched_setscheduler'):
+        try:
+            os.sched_setscheduler(0, os.SCHED_FIFO, os.sched_param(FIFO_PRIORITY))
+            return f"SCHED_FIFO priority {FIFO_PRIORITY}"
+        except (PermissionError, OSError):
+            pass
+    try:
+        niceness = os.nice(NICE_INCREMENT)
+        return f"nice {niceness} (SCHED_FIFO not permitted)"
+    except (PermissionError, OSError):
+        return "unchanged (no permission for SCHED_FIFO or negative nice)"
+
+
+def _pin_cpu(cpu) -> str:
+    if not hasattr(os, 'sched_setaffinity'):
+        return "not pinned (CPU affinity not supported on this OS)"
+    available = sorted(os.sched_getaffinity(0))
+    target = available[-1] if cpu is None else cpu
+    if target not in available:
+        return f"not pinned (CPU {target} not in {available})"
+    try:
+        os.sched_setaffinity(0, {target})
+        return f"pinned to CPU {target}"
+    except OSError as e:
+        return f"not pinned ({e})"
+
+
+def report(achieved: dict):
+    print("⏱️  Real-time mode:")
+    for key, value in achieved.items():
+        print(f"   {key}: {value}")
+
+
+def jitter_test(seconds: float = 5.0, interval: float = 0.002, garbage_per_tick: int = 200) -> dict:
+    """
+    Sleep interval repeatedly and measure how late each wake-up is, while making cyclic
+    garbage every tick (as a busy script would). Returns lateness percentiles in ms.
+    """
+    late_ns = []
+    keep = []
+    deadline = time.perf_counter_ns()
+    end = deadline + int(seconds * 1e9)
+    step = int(interval * 1e9)
+    while deadline < end:
+        deadline += step
+        delay = (deadline - time.perf_counter_ns()) / 1e9
+        if delay > 0:
+            time.sleep(delay)
+        late_ns.append(time.perf_counter_ns() - deadline)
+        # Reference cycles: only the cyclic GC frees these, and the GC pass runs on this thread
+        for _ in range(garbage_per_tick):
+            a, b = {}, {}
+            a['b'], b['a'] = b, a
+        keep.append([0] * 8)
+        if len(keep) > 500:
+            keep.clear()
+    late_ns.sort()
+
+    def pct(p):
+        return late_ns[min(len(late_ns) - 1, int(p / 100 * len(late_ns)))] / 1e6
+
+    return {'ticks': len(late_ns), 'p50': pct(50), 'p99': pct(99), 'p99.9': pct(99.9), 'max': late_ns[-1] / 1e6}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Jitter test: timed loop before and after --realtime")
+    parser.add_argument('--seconds', type=float, default=5.0, help="duration of each run")
+    parser.add_argument('--interval', type=float, default=0.002, help="tick interval in seconds")
+    parser.add_argument('--cpu', type=int, default=None, help="CPU to pin to")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("⏱️  Real-time mode jitter test")
+    print("=" * 60)
+    print(f"{'mode':>9} {'ticks':>6} {'p50 ms':>8} {'p99 ms':>8} {'p99.9 ms':>9} {'max ms':>8}")
+    rows = [('normal', jitter_test(args.seconds, args.interval))]
+    achieved = enter_realtime(args.cpu)
+    try:
+        rows.append(('realtime', jitter_test(args.seconds, args.interval)))
+    finally:
+        exit_realtime()
+    for mode, r in rows:
+        print(f"{mode:>9} {r['ticks']:>6} {r['p50']:>8.3f} {r['p99']:>8.3f} {r['p99.9']:>9.3f} {r['max']:>8.3f}")
+    print()
+    report(achieved)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
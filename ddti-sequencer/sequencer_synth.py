@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+DDTI Sequencer + Bass Synth - SINGLE PROCESS
+Sequences the trigger and plays the bass voice in the same process and the same MIDI loop.
+There is no IAC Driver hop and no second script. Optionally mirrors the notes to a MIDI port (for Ableton).
+
+Usage:
+    python3 sequencer_synth.py                      # simple synth (numpy + sounddevice)
+    python3 sequencer_synth.py --engine fluidsynth  # FluidSynth + SoundFont
+    python3 sequencer_synth.py --mirror             # also send notes to OUTPUT_PORT (config.py)
+    python3 sequencer_synth.py --mirror "IAC Driver Bus 2" --mirror "MicroFreak"
+    python3 sequencer_synth.py --input "TriggerIO" --input "FS-1"   # merge several inputs
+    python3 sequencer_synth.py --capture            # record the show to captures/*.mid (capture.py)
+    python3 sequencer_synth.py --realtime           # GC frozen, SCHED_FIFO / nice, CPU pinned (realtime.py)
+"""
+
+import argparse
+import sys
+
+from log_setup import MESSAGE_FORMAT, setup_logging
+from capture import add_capture_args
+from clock_sync import add_clock_args, clock_options
+from midi_sequencer_fast import MIDINoteSequencer
+from pattern import add_pattern_arg, compile_pattern
+from realtime import add_realtime_args
+
+
+def make_voice(engine: str, input_port: str, note_sequence: list):
+    """Build the bass voice (note_on / note_off) for engine; imports only that engine's dependencies."""
+    try:
+        import synth_config
+    except ImportError:
+        synth_config = None
+
+    if engine == 'fluidsynth':
+        from bass_synth_fluidsynth import FluidSynthBass, fluidsynth_options
+        soundfont = getattr(synth_config, 'SOUNDFONT_PATH', "/usr/local/share/soundfonts/default.sf2")
+        return FluidSynthBass(soundfont_path=soundfont, input_port=input_port, note_sequence=note_sequence,
+                              **fluidsynth_options())
+
+    from bass_synth_simple import ADSREnvelope, BassSynthesizer, SimpleBassVoice
+    sample_rate = getattr(synth_config, 'SAMPLE_RATE', 44100)
+    adsr = ADSREnvelope(
+        attack=getattr(synth_config, 'ATTACK', 0.005),
+        decay=getattr(synth_config, 'DECAY', 0.1),
+        sustain=getattr(synth_config, 'SUSTAIN', 0.7),
+        release=getattr(synth_config, 'RELEASE', 0.3),
+        sample_rate=sample_rate
+    )
+    voice = SimpleBassVoice(
+        BassSynthesizer(sample_rate=sample_rate, adsr=adsr),
+        waveform=getattr(synth_config, 'WAVEFORM', 'sine'),
+        note_duration=getattr(synth_config, 'NOTE_DURATION', 0.5),
+        blocksize=getattr(synth_config, 'BLOCK_SIZE', 128)
+    )
+    voice.prepare(note_sequence)
+    return voice
+
+
+def main():
+    # Import config
+    try:
+        import config
+        NOTE_SEQUENCE = config.NOTE_SEQUENCE
+        INPUT_PORT = config.INPUT_PORT
+        OUTPUT_PORT = config.OUTPUT_PORT
+    except ImportError:
+        NOTE_SEQUENCE = [36, 40, 43, 48]  # C1 → E1 → G1 → C2
+        INPUT_PORT = "TriggerIO MIDI Out"
+        OUTPUT_PORT = "IAC Driver Bus 1"
+
+    parser = argparse.ArgumentParser(description="DDTI sequencer with a built-in bass synth")
+    parser.add_argument('--engine', choices=('simple', 'fluidsynth'), default='simple',
+                        help="bass voice engine (default: simple)")
+    parser.add_argument('--mirror', nargs='?', const=OUTPUT_PORT, action='append', metavar='PORT',
+                        help=f"also send the sequenced notes to a MIDI port; repeat for several (default port: {OUTPUT_PORT})")
+    parser.add_argument('--input', action='append', metavar='PORT',
+                        help=f"MIDI input port; repeat to merge several (default: {INPUT_PORT})")
+    add_pattern_arg(parser)
+    add_realtime_args(parser)
+    add_clock_args(parser)
+    add_capture_args(parser)
+    args = parser.parse_args()
+
+    setup_logging(env_prefix="DDTI_LOG_", text_format=MESSAGE_FORMAT)
+
+    print("=" * 60)
+    print(f"⚡ DDTI Sequencer + Bass Synth ({args.engine}) - SINGLE PROCESS")
+    print("=" * 60)
+
+    sequence = args.pattern or NOTE_SEQUENCE
+    inputs = args.input or INPUT_PORT
+    voice = make_voice(args.engine, inputs, sorted(compile_pattern(sequence).notes()))
+    sequencer = MIDINoteSequencer(
+        sequence=sequence,
+        input_port_name=inputs,
+        output_port_name=args.mirror,
+        voice=voice,
+        ratchet_ms=args.ratchet_ms,
+        capture_dir=args.capture,
+        **clock_options(args)
+    )
+    sequencer.run(realtime=args.realtime, cpu=args.cpu)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,9 +2,36 @@
 """
 Setup verification script
 Checks if everything is configured correctly
+
+    python3 setup_check.py                 # packages, ports, config
+    python3 setup_check.py --selftest      # + measured MIDI round trip and audio timing
+
+The self-test sends timestamped probe notes out of a MIDI output and times their return on an
+input. With --loopback OUT IN the probes go through a real loop: a cable from the interface's
+MIDI out to its MIDI in, or an IAC bus on macOS (same name for both). Without it, a virtual
+port is used (Linux/macOS rtmidi), which measures only the Python and driver overhead.
+It then opens a sounddevice output stream at several block sizes. For each it reports the
+stream latency, the callback jitter and any underflows, and recommends a block size. At that
+block size it runs each installed synth engine: it times how long a block with notes sounding
+takes to render, and opens the engine's real output (the simple voice's stream, FluidSynth's
+driver) to read back its buffer latency. The engine with the lower measured total that keeps
+up with the block is recommended.
 """
 
+import argparse
 import sys
+import threading
+import time
+from array import array
+
+PROBE_CHANNEL = 15           # probes are note_ons on channel 16
+PROBE_INTERVAL_SEC = 0.005
+VIRTUAL_PORT = "DDTI Selftest"
+AUDIO_BLOCK_SIZES = (64, 128, 256, 512)
+AUDIO_SECONDS = 2.0
+SKIP_CALLBACKS = 8           # the first callbacks of a new stream come in bursts
+ENGINE_BLOCKS = 500          # blocks rendered per engine when timing it
+ENGINE_NOTES = (36, 40, 43, 48)
 
 def check_dependencies():
     """Check if required Python packages are installed"""
@@ -94,7 +121,291 @@ def check_config():
         print(f"  ❌ Error reading config: {e}")
         return False
 
+def _summary_ms(samples_ns) -> dict:
+    late = sorted(samples_ns)
+    if not late:
+        return {'n': 0, 'p50': 0.0, 'p99': 0.0, 'max': 0.0}
+
+    def pct(p):
+        return late[min(len(late) - 1, int(p / 100 * len(late)))] / 1e6
+
+    return {'n': len(late), 'p50': pct(50), 'p99': pct(99), 'max': late[-1] / 1e6}
+
+def measure_midi_roundtrip(output_name=None, input_name=None, probes: int = 500):
+    """Round trip of probe notes from output_name to input_name (a virtual loop if not given)"""
+    import mido
+    from midi_ports import resolve_port
+    
+    sent = array('q', [0] * probes)
+    received = array('q', [0] * probes)
+    done = threading.Event()
+    
+    def on_message(msg):
+        now = time.perf_counter_ns()
+        if msg.type != 'note_on' or msg.channel != PROBE_CHANNEL:
+            return
+        i = (msg.velocity - 1) * 128 + msg.note
+        if i < probes and not received[i]:
+            received[i] = now
+            if i == probes - 1:
+                done.set()
+    
+    if output_name is None:
+        # The virtual output shows up as an input of the same name (ALSA adds a client prefix)
+        outport = mido.open_output(VIRTUAL_PORT, virtual=True)
+        input_name = next((n for n in mido.get_input_names() if VIRTUAL_PORT in n), None)
+        if input_name is None:
+            outport.close()
+            raise RuntimeError("virtual port not visible as an input")
+        label = "virtual port"
+    else:
+        outport = mido.open_output(resolve_port(output_name, mido.get_output_names()) or output_name)
+        input_name = resolve_port(input_name, mido.get_input_names()) or input_name
+        label = f"{output_name} → {input_name}"
+    inport = mido.open_input(input_name, callback=on_message)
+    
+    try:
+        time.sleep(0.2)
+        msg = mido.Message('note_on', channel=PROBE_CHANNEL)
+        for i in range(probes):
+            msg.note = i % 128
+            msg.velocity = i // 128 + 1
+            sent[i] = time.perf_counter_ns()
+            outport.send(msg)
+            time.sleep(PROBE_INTERVAL_SEC)
+        done.wait(1.0)
+        all_off = mido.Message('control_change', channel=PROBE_CHANNEL, control=123, value=0)
+        outport.send(all_off)
+    finally:
+        inport.close()
+        outport.close()
+    
+    rtt = [received[i] - sent[i] for i in range(probes) if received[i]]
+    result = _summary_ms(rtt)
+    result['lost'] = probes - len(rtt)
+    result['label'] = label
+    return result
+
+def measure_audio(block_sizes=AUDIO_BLOCK_SIZES, seconds: float = AUDIO_SECONDS, sample_rate: int = 44100):
+    """Stream latency, callback jitter and underflows of a sounddevice output per block size"""
+    import sounddevice as sd
+    
+    results = []
+    for block in block_sizes:
+        times = array('q', [0] * (int(seconds * sample_rate / block) + 64))
+        state = {'count': 0, 'underflows': 0}
+        
+        def callback(outdata, frames, time_info, status, times=times, state=state):
+            i = state['count']
+            if i < len(times):
+                times[i] = time.perf_counter_ns()
+            state['count'] = i + 1
+            if status.output_underflow:
+                state['underflows'] += 1
+            outdata.fill(0)
+        
+        try:
+            with sd.OutputStream(samplerate=sample_rate, blocksize=block, channels=1, dtype='float32',
+                                 latency='low', callback=callback) as stream:
+                time.sleep(seconds)
+                latency_ms = stream.latency * 1000
+        except Exception as e:
+            results.append({'block': block, 'error': str(e)})
+            continue
+        
+        n = min(state['count'], len(times))
+        period_ns = block / sample_rate * 1e9
+        jitter = [abs(times[i] - times[i - 1] - period_ns) for i in range(SKIP_CALLBACKS + 1, n)]
+        summary = _summary_ms(jitter)
+        results.append({'block': block, 'block_ms': block / sample_rate * 1000, 'latency_ms': latency_ms,
+                        'jitter_p99': summary['p99'], 'jitter_max': summary['max'],
+                        'underflows': state['underflows']})
+    return results
+
+def recommend_block(audio: list) -> dict:
+    """Smallest block size that kept up (no underflows, jitter under one block)"""
+    usable = [r for r in audio if 'error' not in r]
+    stable = [r for r in usable if not r['underflows'] and r['jitter_p99'] < r['block_ms']]
+    if not usable:
+        return {}
+    best = min(stable, key=lambda r: r['block']) if stable else max(usable, key=lambda r: r['block'])
+    return {'block': best['block'], 'stable': bool(stable)}
+
+def _time_blocks(render, blocks: int) -> dict:
+    """Time render() blocks times; returns _summary_ms of the durations"""
+    durations = array('q', [0] * blocks)
+    for i in range(blocks):
+        t0 = time.perf_counter_ns()
+        render()
+        durations[i] = time.perf_counter_ns() - t0
+    return _summary_ms(durations)
+
+def measure_simple_engine(block: int, sample_rate: int, blocks: int = ENGINE_BLOCKS) -> dict:
+    """Mix time of SimpleBassVoice's callback with ENGINE_NOTES sounding, and its stream latency"""
+    import numpy as np
+    from bass_synth_simple import BassSynthesizer, SimpleBassVoice
+    
+    voice = SimpleBassVoice(BassSynthesizer(sample_rate), blocksize=block)
+    try:
+        latency_ms = voice.stream.latency * 1000
+        # Stopped: the callback is driven from here only, so PortAudio does not run it too
+        voice.stream.stop()
+        voice.prepare(ENGINE_NOTES)
+        for note in ENGINE_NOTES:
+            voice.note_on(note, 100)
+        outdata = np.zeros((block, 1), dtype=np.float32)
+        render = _time_blocks(lambda: voice._callback(outdata, block, None, None), blocks)
+    finally:
+        voice.close()
+    # A trigger is mixed into the next callback (up to one block later) and then plays out of the buffer
+    return {'render_p99': render['p99'], 'buffer_ms': latency_ms, 'wait_ms': block / sample_rate * 1000}
+
+def measure_fluidsynth_engine(block: int, sample_rate: int, blocks: int = ENGINE_BLOCKS) -> dict:
+    """get_samples(block) time with ENGINE_NOTES sounding, and the buffer of the started driver"""
+    import fluidsynth
+    import synth_config
+    from bass_synth_fluidsynth import fluidsynth_options, start_audio
+    
+    options = fluidsynth_options()
+    settings = {
+        'synth.polyphony': options['polyphony'],
+        'synth.reverb.active': int(options['effects']),
+        'synth.chorus.active': int(options['effects']),
+        'audio.period-size': block,
+        'audio.periods': options['periods'],
+    }
+    fs = fluidsynth.Synth(samplerate=float(sample_rate), **settings)
+    try:
+        sfid = fs.sfload(synth_config.SOUNDFONT_PATH)
+        fs.program_select(0, sfid, options['bank'], options['program'])
+        for note in ENGINE_NOTES:
+            fs.noteon(0, note, 100)
+        render = _time_blocks(lambda: fs.get_samples(block), blocks)
+        fs.cc(0, 120, 0)  # All Sound Off before the driver plays anything
+        
+        driver = start_audio(fs, options['driver'], options['device'])
+        get = getattr(fs, 'get_setting', None)
+        period_size = (get('audio.period-size') if get else None) or block
+        periods = (get('audio.periods') if get else None) or options['periods']
+    finally:
+        fs.delete()
+    # FluidSynth renders a whole period ahead, so a note waits for the next period and the buffer
+    return {'render_p99': render['p99'], 'buffer_ms': period_size * periods / sample_rate * 1000,
+            'wait_ms': period_size / sample_rate * 1000, 'driver': driver}
+
+def measure_engines(block: int, sample_rate: int, fluidsynth_ready: bool) -> dict:
+    """Per engine: measured render time, buffer and total latency at block, or the error"""
+    measures = {'simple': measure_simple_engine}
+    if fluidsynth_ready:
+        measures['fluidsynth'] = measure_fluidsynth_engine
+    engines = {}
+    for name, measure in measures.items():
+        try:
+            r = measure(block, sample_rate)
+        except Exception as e:
+            engines[name] = {'error': str(e)}
+            continue
+        r['total_ms'] = r['wait_ms'] + r['render_p99'] + r['buffer_ms']
+        r['keeps_up'] = r['render_p99'] < block / sample_rate * 1000
+        engines[name] = r
+    return engines
+
+def recommend_engine(engines: dict):
+    """The engine with the lowest measured total latency among those that keep up, or None"""
+    usable = {name: r for name, r in engines.items() if r.get('keeps_up')}
+    return min(usable, key=lambda name: usable[name]['total_ms']) if usable else None
+
+def _fluidsynth_ready() -> bool:
+    import os
+    try:
+        import fluidsynth  # noqa: F401
+        import synth_config
+    except ImportError:
+        return False
+    return os.path.exists(getattr(synth_config, 'SOUNDFONT_PATH', ''))
+
+def run_selftest(loopback=None, probes: int = 500, audio_seconds: float = AUDIO_SECONDS) -> bool:
+    """Measured MIDI round trip and audio timing, with recommendations"""
+    ok = True
+    print("\n⏱️  MIDI round trip...")
+    try:
+        midi = measure_midi_roundtrip(*(loopback or (None, None)), probes=probes)
+        print(f"  {midi['label']}: {midi['n']} probes, p50 {midi['p50']:.2f} ms, "
+              f"p99 {midi['p99']:.2f} ms, max {midi['max']:.2f} ms, lost {midi['lost']}")
+        if midi['lost']:
+            print("  ⚠️  Probes were lost: check the loopback cable / port names")
+            ok = False
+        elif midi['p99'] > 5.0:
+            print("  ⚠️  p99 above 5 ms: try another USB port (no hub), and --realtime")
+        else:
+            print("  ✅ MIDI timing OK")
+    except Exception as e:
+        print(f"  ❌ MIDI self-test failed: {e}")
+        if not loopback:
+            print("     Virtual ports need rtmidi on Linux or macOS; otherwise use --loopback OUT IN")
+        ok = False
+    
+    print("\n🔊 Audio output timing...")
+    try:
+        try:
+            import synth_config
+            sample_rate = getattr(synth_config, 'SAMPLE_RATE', 44100)
+        except ImportError:
+            sample_rate = 44100
+        audio = measure_audio(seconds=audio_seconds, sample_rate=sample_rate)
+    except Exception as e:
+        print(f"  ❌ Audio self-test failed: {e}")
+        return False
+    
+    print(f"  {'block':>6} {'block ms':>9} {'latency ms':>11} {'jitter p99':>11} {'max':>7} {'underflows':>11}")
+    for r in audio:
+        if 'error' in r:
+            print(f"  {r['block']:>6}  ❌ {r['error']}")
+            continue
+        print(f"  {r['block']:>6} {r['block_ms']:>9.2f} {r['latency_ms']:>11.2f} {r['jitter_p99']:>11.2f} "
+              f"{r['jitter_max']:>7.2f} {r['underflows']:>11}")
+    
+    rec = recommend_block(audio)
+    if not rec:
+        print("  ❌ No block size worked")
+        return False
+    if not rec['stable']:
+        print("  ⚠️  Every block size had underflows or late callbacks: close other audio apps, try --realtime")
+        ok = False
+    print(f"\n💡 Recommended block size: {rec['block']} (BLOCK_SIZE / FLUIDSYNTH_PERIOD_SIZE in synth_config.py)")
+    
+    print(f"\n🎸 Synth engines at {rec['block']} frames ({len(ENGINE_NOTES)} notes sounding)...")
+    engines = measure_engines(rec['block'], sample_rate, _fluidsynth_ready())
+    print(f"  {'engine':>10} {'render p99':>11} {'buffer ms':>10} {'total ms':>9}")
+    for name, r in engines.items():
+        if 'error' in r:
+            print(f"  {name:>10}  ❌ {r['error']}")
+            continue
+        note = "" if r['keeps_up'] else "  ⚠️  slower than real time"
+        print(f"  {name:>10} {r['render_p99']:>11.3f} {r['buffer_ms']:>10.2f} {r['total_ms']:>9.2f}{note}")
+    if 'fluidsynth' not in engines:
+        print("  (fluidsynth not measured: pyfluidsynth or synth_config.SOUNDFONT_PATH missing)")
+    engine = recommend_engine(engines)
+    if engine is None:
+        print("  ❌ No engine kept up with the block size")
+        return False
+    print(f"💡 Recommended engine: {engine}")
+    print(f"   python3 sequencer_synth.py --engine {engine}")
+    return ok
+
 def main():
+    parser = argparse.ArgumentParser(description="Check the DDTI sequencer setup")
+    parser.add_argument('--selftest', action='store_true',
+                        help="also measure MIDI round trip and audio timing")
+    parser.add_argument('--loopback', nargs=2, metavar=('OUT', 'IN'),
+                        help="with --selftest: MIDI output and input that are connected (cable or IAC bus)")
+    parser.add_argument('--probes', type=int, default=500, help="with --selftest: number of MIDI probes")
+    parser.add_argument('--audio-seconds', type=float, default=AUDIO_SECONDS,
+                        help="with --selftest: time per audio block size")
+    args = parser.parse_args()
+    if not 0 < args.probes <= 127 * 128:
+        parser.error("--probes must be 1-16256")
+    
     print("=" * 60)
     print("🔍 DDTI MIDI Sequencer Setup Check")
     print("=" * 60)
@@ -104,6 +415,8 @@ def main():
         check_midi_ports(),
         check_config()
     ]
+    if args.selftest:
+        checks.append(run_selftest(args.loopback, args.probes, args.audio_seconds))
     
     print("\n" + "=" * 60)
     if all(checks):
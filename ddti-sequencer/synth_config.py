@@ -31,11 +31,24 @@ RELEASE = 0.3    # 300ms tail
 
 # ===== Audio Configuration =====
 SAMPLE_RATE = 44100  # Hz
+BLOCK_SIZE = 128     # simple synth: frames per audio callback (2.9 ms); raise to 256 if you hear clicks
 
 # ===== FluidSynth Configuration =====
 # Path to SoundFont file (.sf2)
 SOUNDFONT_PATH = "/usr/local/share/soundfonts/default.sf2"
 
+# Audio driver: None tries coreaudio (macOS), jack / alsa / pulseaudio (Linux), wasapi / dsound (Windows)
+FLUIDSYNTH_DRIVER = None
+FLUIDSYNTH_DEVICE = None       # None = the driver's default device (e.g. "hw:1" for alsa)
+
+# Buffer = PERIODS x PERIOD_SIZE frames: 2 x 64 @ 44100 Hz = 2.9 ms.
+# Raise PERIOD_SIZE (128, 256) if you hear clicks; setup_check.py --selftest recommends a size.
+FLUIDSYNTH_PERIOD_SIZE = 64
+FLUIDSYNTH_PERIODS = 2
+
+FLUIDSYNTH_POLYPHONY = 16      # a bassline needs few voices; fewer voices = less CPU per block
+FLUIDSYNTH_EFFECTS = False     # FluidSynth's reverb and chorus (extra DSP on every block)
+
 # Bass instrument program number (32-39 are typically bass sounds)
 # 32 = Acoustic Bass
 # 33 = Electric Bass (finger)
@@ -46,6 +59,7 @@ SOUNDFONT_PATH = "/usr/local/share/soundfonts/default.sf2"
 # 38 = Synth Bass 1 (good for electronic music)
 # 39 = Synth Bass 2 (deeper/darker)
 BASS_PROGRAM = 38
+BASS_BANK = 0   # only this preset's samples are loaded (and preloaded before the first hit)
 
 # ===== Preset Configurations =====
 
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Retrigger / crosstalk filter in front of the sequencer's step advance
+
+A piezo trigger can fire twice for one hit, and a hard hit on one pad can make a neighbouring
+pad fire quietly (crosstalk). Either one advances the sequence and puts the bassline out of
+phase. TriggerFilter.accept() runs before get_next_note() and rejects:
+- retrigger: the same pad again within mask_ms, unless it is at least retrigger_ratio times
+  louder than the last accepted hit on that pad (a real, harder second hit)
+- crosstalk: a different pad within crosstalk_ms of the last accepted hit, quieter than
+  crosstalk_ratio times that hit's velocity
+
+State lives in preallocated per-note arrays plus the last accepted hit, so each message is
+O(1) and allocates nothing. Each rejected hit also rejects the next note_off from that pad,
+so that note_off cannot cut off the note that is still sounding.
+
+Settings: TRIGGER_MASK_MS, RETRIGGER_VELOCITY_RATIO, CROSSTALK_MS, CROSSTALK_VELOCITY_RATIO
+in config.py (0 turns a check off). Cost per call:
+    python3 trigger_filter.py
+"""
+
+import sys
+import time
+
+MASK_MS = 30.0
+RETRIGGER_RATIO = 1.5
+CROSSTALK_MS = 15.0
+CROSSTALK_RATIO = 0.5
+
+
+class TriggerFilter:
+    def __init__(self, mask_ms: float = MASK_MS, retrigger_ratio: float = RETRIGGER_RATIO,
+                 crosstalk_ms: float = CROSSTALK_MS, crosstalk_ratio: float = CROSSTALK_RATIO):
+        self.mask_ns = int(mask_ms * 1e6)
+        self.retrigger_ratio = retrigger_ratio
+        self.crosstalk_ns = int(crosstalk_ms * 1e6)
+        self.crosstalk_ratio = crosstalk_ratio
+        # Per note (pad): time of the last hit, velocity of the last accepted hit, note_offs to drop
+        self._last_ns = [0] * 128
+        self._last_vel = [0] * 128
+        self._suppressed = [0] * 128
+        # Last accepted hit on any pad
+        self._peak_ns = 0
+        self._peak_vel = 0
+        self._peak_note = -1
+        self.rejected_retrigger = 0
+        self.rejected_crosstalk = 0
+
+    @classmethod
+    def from_config(cls):
+        """Settings from config.py, with the module defaults for anything missing"""
+        try:
+            import config
+        except ImportError:
+            config = None
+        return cls(
+            mask_ms=getattr(config, 'TRIGGER_MASK_MS', MASK_MS),
+            retrigger_ratio=getattr(config, 'RETRIGGER_VELOCITY_RATIO', RETRIGGER_RATIO),
+            crosstalk_ms=getattr(config, 'CROSSTALK_MS', CROSSTALK_MS),
+            crosstalk_ratio=getattr(config, 'CROSSTALK_VELOCITY_RATIO', CROSSTALK_RATIO),
+        )
+
+    def accept(self, note: int, velocity: int, now_ns: int) -> bool:
+        """note_on (velocity > 0) from pad note at now_ns (perf_counter_ns): True if it is a real hit"""
+        last_ns = self._last_ns[note]
+        # Every hit restarts the mask, so a buzzing pad keeps its own mask open
+        self._last_ns[note] = now_ns
+        if last_ns and now_ns - last_ns < self.mask_ns and velocity < self._last_vel[note] * self.retrigger_ratio:
+            self.rejected_retrigger += 1
+            self._suppressed[note] += 1
+            return False
+        if (self._peak_note != note and now_ns - self._peak_ns < self.crosstalk_ns
+                and velocity < self._peak_vel * self.crosstalk_ratio):
+            self.rejected_crosstalk += 1
+            self._suppressed[note] += 1
+            return False
+        self._last_vel[note] = velocity
+        self._peak_ns = now_ns
+        self._peak_vel = velocity
+        self._peak_note = note
+        return True
+
+    def accept_off(self, note: int) -> bool:
+        """note_off from pad note: False if it belongs to a rejected hit"""
+        if self._suppressed[note]:
+            self._suppressed[note] -= 1
+            return False
+        return True
+
+    def stats(self) -> dict:
+        return {'retrigger': self.rejected_retrigger, 'crosstalk': self.rejected_crosstalk}
+
+
+def main():
+    f = TriggerFilter()
+    n = 200_000
+    notes = [36 + (i % 4) for i in range(n)]
+    t0 = time.perf_counter_ns()
+    step = 100_000_000  # 100 ms apart: every hit is legitimate, the common case
+    for i, note in enumerate(notes):
+        f.accept(note, 100, t0 + i * step)
+    per_call = (time.perf_counter_ns() - t0) / n
+    print(f"TriggerFilter.accept: {per_call:.0f} ns per hit ({n} hits), rejected {f.stats()}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())